@@ -0,0 +1,265 @@
+import argparse
+import itertools
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.density_counter import load_points
+
+
+# Fraction of a tile shared with its neighbour, so people cut by a tile edge are whole in one tile
+TILE_OVERLAP = 0.15
+NMS_IOU = 0.5
+
+
+def ground_truth(data_dir, parts, split, limit):
+    images = []
+    counts = []
+
+    # ShanghaiTech layout: <data_dir>/<part>/<split>/images/*.jpg
+    paths = sorted(path for part in parts for path in (Path(data_dir) / part / split / "images").glob("*.jpg"))
+
+    for path in paths:
+        points = load_points(path)
+        if points is None:
+            continue
+        images.append(path)
+        counts.append(len(points))
+        if limit and len(images) >= limit:
+            break
+
+    return images, np.array(counts, dtype=float)
+
+
+def expand_grid(models, imgsz, conf, tiles, backends):
+    configs = []
+
+    for model, size, threshold, tile, backend in itertools.product(models, imgsz, conf, tiles, backends):
+        if model == "csrnet":
+            # Density regression has no box threshold, tiling or export path; one config per input size
+            if threshold != conf[0] or tile != tiles[0] or backend != backends[0]:
+                continue
+            threshold, tile, backend = None, 1, "pytorch"
+        configs.append({'model': model, 'imgsz': size, 'conf': threshold, 'tiles': tile, 'backend': backend})
+
+    return configs
+
+
+def exported_model(model_name, imgsz, backend, cache_dir):
+    if backend == "pytorch":
+        return model_name
+
+    from ultralytics import YOLO
+
+    # Exports are fixed to one input size, so each (model, imgsz, backend) gets its own file
+    suffix = ".onnx" if backend == "onnx" else f"_{backend}_model"
+    target = Path(cache_dir) / f"{Path(model_name).stem}_{imgsz}{suffix}"
+
+    if not target.exists():
+        target.parent.mkdir(parents=True, exist_ok=True)
+        exported = Path(YOLO(model_name).export(format=backend, imgsz=imgsz))
+        exported.rename(target)
+
+    return str(target)
+
+
+def tile_windows(h, w, tiles):
+    if tiles <= 1:
+        return [(0, 0, w, h)]
+
+    tile_w = int(np.ceil(w / (tiles - (tiles - 1) * TILE_OVERLAP)))
+    tile_h = int(np.ceil(h / (tiles - (tiles - 1) * TILE_OVERLAP)))
+    xs = np.linspace(0, w - tile_w, tiles).astype(int)
+    ys = np.linspace(0, h - tile_h, tiles).astype(int)
+
+    return [(x, y, x + tile_w, y + tile_h) for y in ys for x in xs]
+
+
+def count_tiled(analyzer, image, tiles):
+    if tiles <= 1:
+        boxes, _ = analyzer.detect_persons(image)
+        return len(boxes)
+
+    h, w = image.shape[:2]
+    all_boxes = []
+    all_scores = []
+
+    for x1, y1, x2, y2 in tile_windows(h, w, tiles):
+        boxes, scores = analyzer.detect_persons(image[y1:y2, x1:x2])
+        all_boxes.append(boxes + np.array([x1, y1, x1, y1], dtype=boxes.dtype))
+        all_scores.append(scores)
+
+    boxes = np.concatenate(all_boxes)
+    scores = np.concatenate(all_scores)
+    if len(boxes) == 0:
+        return 0
+
+    # People in the overlap are found twice; NMS keeps one
+    import cv2
+
+    xywh = np.column_stack([boxes[:, :2], boxes[:, 2:] - boxes[:, :2]])
+    keep = cv2.dnn.NMSBoxes(xywh.tolist(), scores.tolist(), 0.0, NMS_IOU)
+    return len(keep)
+
+
+def build_counter(config, csrnet_weights, cache_dir):
+    if config['model'] == "csrnet":
+        from src.density_counter import DensityCounter
+
+        counter = DensityCounter(csrnet_weights, input_size=config['imgsz'])
+        return lambda image: counter.density_map(image).sum()
+
+    from src.frame_analyzer import FrameAnalyzer
+
+    analyzer = FrameAnalyzer(exported_model(config['model'], config['imgsz'], config['backend'], cache_dir))
+    analyzer.configure(imgsz=config['imgsz'], conf=config['conf'])
+    return lambda image: count_tiled(analyzer, image, config['tiles'])
+
+
+def peak_rss_mb():
+    # resource is POSIX-only; Windows reports the peak working set through psutil
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        peak = getattr(psutil.Process().memory_info(), 'peak_wset', None)
+        return peak / 2 ** 20 if peak is not None else None
+
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    scale = 2 ** 20 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def run_config(config, images, csrnet_weights, cache_dir):
+    # Runs in a fresh process, so peak RSS belongs to this config alone
+    import cv2
+
+    count = build_counter(config, csrnet_weights, cache_dir)
+
+    # Weight loading and first-call setup are not part of steady-state throughput
+    count(cv2.imread(str(images[0])))
+
+    predicted = []
+    elapsed = 0.0
+    for path in images:
+        image = cv2.imread(str(path))
+        start = time.perf_counter()
+        predicted.append(float(count(image)))
+        elapsed += time.perf_counter() - start
+
+    peak_gpu_mb = None
+    try:
+        import torch
+        if torch.cuda.is_available():
+            peak_gpu_mb = torch.cuda.max_memory_allocated() / 2 ** 20
+    except ImportError:
+        pass
+
+    return {
+        'predicted': predicted,
+        'seconds': elapsed,
+        'peak_rss_mb': peak_rss_mb(),
+        'peak_gpu_mb': peak_gpu_mb
+    }
+
+
+def pareto_front(mae, throughput):
+    # Non-dominated: no other config is at least as accurate and as fast, and strictly better at one
+    mae = np.asarray(mae)
+    throughput = np.asarray(throughput)
+
+    no_worse = (mae[None, :] <= mae[:, None]) & (throughput[None, :] >= throughput[:, None])
+    better = (mae[None, :] < mae[:, None]) | (throughput[None, :] > throughput[:, None])
+    return ~(no_worse & better).any(axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep detector settings against ShanghaiTech head-count ground truth")
+    # Defaults live under the repo, so the benchmark runs the same from any working directory
+    parser.add_argument("--data-dir", type=Path, default=ROOT / "data" / "videos",
+                        help="ShanghaiTech root holding part_A / part_B")
+    parser.add_argument("--parts", nargs="+", default=["part_A", "part_B"])
+    parser.add_argument("--split", default="test_data")
+    parser.add_argument("--limit", type=int, default=None, help="images per run (default: all)")
+    parser.add_argument("--models", nargs="+", default=["yolov8n.pt", "yolov8l.pt"],
+                        help="YOLO weights, or 'csrnet' for the density counter")
+    parser.add_argument("--imgsz", nargs="+", type=int, default=[640, 1024])
+    parser.add_argument("--conf", nargs="+", type=float, default=[0.1, 0.25])
+    parser.add_argument("--tiles", nargs="+", type=int, default=[1, 2], help="tiles per side")
+    parser.add_argument("--backends", nargs="+", default=["pytorch"],
+                        help="pytorch, or an ultralytics export format such as onnx / openvino")
+    parser.add_argument("--csrnet-weights", default=str(ROOT / "models" / "csrnet_shanghaitech.pth"))
+    parser.add_argument("--cache-dir", default=str(ROOT / "results" / "benchmark_models"))
+    parser.add_argument("--output", default=str(ROOT / "results" / "accuracy_benchmark.csv"))
+    args = parser.parse_args()
+
+    import pandas as pd
+
+    images, truth = ground_truth(args.data_dir, args.parts, args.split, args.limit)
+    if not images:
+        print(f"No ShanghaiTech images with ground truth found under {args.data_dir}")
+        return
+
+    configs = expand_grid(args.models, args.imgsz, args.conf, args.tiles, args.backends)
+    print(f"{len(configs)} configs x {len(images)} images ({', '.join(args.parts)} / {args.split})")
+
+    rows = []
+    ctx = multiprocessing.get_context("spawn")
+
+    for config in configs:
+        label = " ".join(f"{name}={value}" for name, value in config.items())
+
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+            try:
+                run = pool.submit(run_config, config, images, args.csrnet_weights, args.cache_dir).result()
+            except Exception as e:
+                print(f"{label}: FAILED ({type(e).__name__}: {e})")
+                continue
+
+        error = np.array(run['predicted']) - truth
+        row = {
+            **config,
+            'mae': float(np.abs(error).mean()),
+            'rmse': float(np.sqrt((error ** 2).mean())),
+            # Signed: detectors undercount dense crowds, so this is usually negative
+            'bias': float(error.mean()),
+            'images_per_s': len(images) / run['seconds'] if run['seconds'] else float('inf'),
+            'peak_rss_mb': run['peak_rss_mb'],
+            'peak_gpu_mb': run['peak_gpu_mb']
+        }
+        rows.append(row)
+        memory = f"{row['peak_rss_mb']:.0f} MB" if row['peak_rss_mb'] is not None else "memory n/a"
+        print(f"{label}: MAE {row['mae']:.1f}  RMSE {row['rmse']:.1f}  "
+              f"{row['images_per_s']:.2f} img/s  {memory}")
+
+    if not rows:
+        return
+
+    table = pd.DataFrame(rows)
+    table['pareto'] = pareto_front(table['mae'], table['images_per_s'])
+    table = table.sort_values('images_per_s', ascending=False)
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    table.to_csv(output, index=False)
+
+    front = table[table['pareto']].drop(columns='pareto')
+    front.to_csv(output.with_name(f"{output.stem}_pareto.csv"), index=False)
+
+    print(f"\nPareto front (MAE vs images/s), fastest first -> {output.with_name(f'{output.stem}_pareto.csv')}")
+    print(front.to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import argparse
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+MODULES = [
+    "src.video_processor",
+    "src.offline_processor",
+    "src.pipeline_processor",
+    "src.rag_integration",
+]
+
+
+def parse_importtime(stderr):
+    # Lines look like: "import time:  self [us] | cumulative | imported package"
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            self_us = int(parts[0].strip())
+            cumulative_us = int(parts[1].strip())
+        except ValueError:
+            continue
+        # Drop the single separator space; any remaining indentation marks nesting depth
+        rows.append((parts[2][1:].rstrip(), self_us, cumulative_us))
+    return rows
+
+
+def measure(module, repeats):
+    wall_times = []
+    rows = []
+
+    for _ in range(repeats):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True
+        )
+        wall_times.append(time.perf_counter() - start)
+
+        if proc.returncode != 0:
+            error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "unknown error"
+            return None, [], error
+
+        rows = parse_importtime(proc.stderr)
+
+    return min(wall_times), rows, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start import cost of CrowdSpot entry points")
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    for module in args.modules:
+        wall, rows, error = measure(module, args.repeats)
+
+        if error:
+            print(f"{module}: FAILED ({error})")
+            continue
+
+        # Only top-level packages (no leading indentation) add up to the total
+        top_level = [r for r in rows if not r[0].startswith(" ")]
+        total_ms = sum(r[2] for r in top_level) / 1000
+
+        print(f"{module}: {wall * 1000:.0f} ms wall (best of {args.repeats}), {total_ms:.0f} ms in imports")
+
+        # Direct and second-level dependencies show which import to defer next
+        nested = [r for r in rows if 0 < len(r[0]) - len(r[0].lstrip()) <= 4]
+        heaviest = sorted(nested, key=lambda r: r[2], reverse=True)[:args.top]
+        for name, _, cumulative_us in heaviest:
+            print(f"    {cumulative_us / 1000:8.1f} ms  {name.strip()}")
+
+
+if __name__ == "__main__":
+    main()
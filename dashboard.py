@@ -1,32 +1,70 @@
-import streamlit as st
 import json
+
+import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 from pathlib import Path
 
+from src.dashboard_data import AlertStream, deviation_percent, load_timeline, lttb_indices
+from src.rollups import RollupStore
+
+MAX_CHART_POINTS = 2000
+
+TREND_RANGES = {
+    "Last hour": 3600,
+    "Last 24 hours": 24 * 3600,
+    "Last 7 days": 7 * 24 * 3600,
+    "All time": None
+}
+
 st.set_page_config(page_title="CrowdSpot", layout="wide")
 st.title("CrowdSpot - Crowd Intelligence Dashboard")
 
+
+@st.cache_resource
+def get_alert_stream(path):
+    # One tailer per file, shared across reruns so only appended lines get parsed
+    return AlertStream(path)
+
+
+@st.cache_data
+def get_timeline(path, mtime, size):
+    # mtime/size are part of the cache key so a rewritten file is reloaded
+    return load_timeline(path)
+
+
+def downsample(x, y):
+    idx = lttb_indices(x, y, MAX_CHART_POINTS)
+    return x[idx], y[idx]
+
+
 # Load alerts data
 alerts_file = Path("results/alerts_timeline.json")
-if not alerts_file.exists():
-    st.error("alerts_timeline.json not found. Run video processing first.")
-    st.stop()
-
-with open(alerts_file) as f:
-    data = json.load(f)
+stream_file = Path("results/alerts_stream.jsonl")
+dispatch_file = Path("results/dispatch_status.json")
 
-baseline = data.get("baseline", 0)
-peak = data.get("peak", 0)
-alerts = data.get("alerts", [])
+# Prefer the live stream unless a newer finished timeline exists
+use_stream = stream_file.exists() and (
+    not alerts_file.exists() or stream_file.stat().st_mtime >= alerts_file.stat().st_mtime
+)
 
-# Convert to DataFrame for easier manipulation
-alerts_df = pd.DataFrame(alerts)
-if len(alerts_df) > 0:
-    alerts_df["count"] = alerts_df["count"].astype(int)
-    alerts_df["deviation"] = ((alerts_df["count"] - baseline) / baseline * 100).round(2)
+if use_stream:
+    stream = get_alert_stream(str(stream_file))
+    stream.refresh()
+    data = stream.snapshot()
+elif alerts_file.exists():
+    stat = alerts_file.stat()
+    data = get_timeline(str(alerts_file), stat.st_mtime, stat.st_size)
 else:
-    alerts_df = pd.DataFrame()
+    st.error("alerts_timeline.json not found. Run video processing first.")
+    st.stop()
+
+baseline = data["baseline"]
+peak = data["peak"]
+alerts = data["alerts"]
+timestamps = data["timestamps"]
+counts = data["counts"]
+deviations = deviation_percent(counts, baseline)
 
 #Metrics
 st.subheader("Operational Metrics")
@@ -43,9 +81,31 @@ with col3:
     st.metric("Total Alerts", len(alerts))
 
 with col4:
-    avg_count = alerts_df["count"].mean() if len(alerts_df) > 0 else baseline
+    avg_count = counts.mean() if len(counts) > 0 else baseline
     st.metric("Avg Count", f"{avg_count:.0f} people")
 
+# Crowd flow from the tracker: latest snapshot while running, run summary once finished
+flow = data.get("flow")
+if flow:
+    st.subheader(f"Crowd Flow ({flow.get('zone', 'N/A')})")
+    
+    flow_col1, flow_col2, flow_col3, flow_col4 = st.columns(4)
+    
+    with flow_col1:
+        st.metric("Mean Speed", f"{flow.get('mean_speed', 0):.1f} px/s")
+    
+    with flow_col2:
+        st.metric("Stationary", f"{flow.get('stationary_share', 0):.0%}")
+    
+    with flow_col3:
+        st.metric("Longest Dwell", f"{flow.get('max_dwell_s', 0):.1f} s")
+    
+    with flow_col4:
+        st.metric("Congested Cells", flow.get('congested_cells', 0))
+    
+    for line_name, line_counts in flow.get('crossings', {}).items():
+        st.write(f"**{line_name}**: {line_counts['in']} in / {line_counts['out']} out")
+
 st.divider()
 
 #Charts
@@ -55,11 +115,12 @@ chart_col1, chart_col2 = st.columns(2)
 
 # Chart 1: Count over time
 with chart_col1:
-    if len(alerts_df) > 0:
+    if len(counts) > 0:
+        chart_x, chart_y = downsample(timestamps, counts)
         fig1 = go.Figure()
         fig1.add_trace(go.Scatter(
-            x=alerts_df["timestamp"],
-            y=alerts_df["count"],
+            x=chart_x,
+            y=chart_y,
             mode="lines+markers",
             name="Count",
             line=dict(color="blue", width=2),
@@ -79,11 +140,12 @@ with chart_col1:
 
 # Chart 2: Deviation trend
 with chart_col2:
-    if len(alerts_df) > 0:
+    if len(counts) > 0:
+        chart_x, chart_y = downsample(timestamps, deviations)
         fig2 = go.Figure()
         fig2.add_trace(go.Scatter(
-            x=alerts_df["timestamp"],
-            y=alerts_df["deviation"],
+            x=chart_x,
+            y=chart_y,
             fill="tozeroy",
             name="Deviation %",
             line=dict(color="orange"),
@@ -102,6 +164,48 @@ with chart_col2:
 
 st.divider()
 
+#Long-range trends from pre-aggregated rollups
+rollup_store = RollupStore("data/rollups")
+rollup_zones = rollup_store.zones()
+
+if rollup_zones:
+    st.subheader("Long-range Trends")
+    
+    trend_col1, trend_col2 = st.columns(2)
+    with trend_col1:
+        trend_zone = st.selectbox("Zone", list(rollup_zones.values()))
+    with trend_col2:
+        trend_range = st.selectbox("Range", list(TREND_RANGES))
+    
+    range_end = rollup_store.latest(trend_zone)
+    
+    if range_end is not None:
+        span = TREND_RANGES[trend_range]
+        range_start = rollup_store.earliest(trend_zone) if span is None else range_end - span
+        
+        # The rollup resolution is picked so the chart never needs more than MAX_CHART_POINTS rows
+        resolution, rows = rollup_store.query(trend_zone, range_start, range_end, max_points=MAX_CHART_POINTS)
+        
+        if len(rows) > 0:
+            trend_x = pd.to_datetime(rows["start"], unit="s")
+            fig3 = go.Figure()
+            fig3.add_trace(go.Scatter(x=trend_x, y=rows["mean"], name="Mean", line=dict(color="blue")))
+            fig3.add_trace(go.Scatter(x=trend_x, y=rows["p95"], name="P95", line=dict(color="orange", dash="dot")))
+            fig3.add_trace(go.Scatter(x=trend_x, y=rows["max"], name="Max", line=dict(color="red", width=1)))
+            fig3.add_trace(go.Bar(x=trend_x, y=rows["alerts"], name="Alert frames", yaxis="y2", marker_color="rgba(255, 0, 0, 0.3)"))
+            fig3.update_layout(
+                title=f"{trend_zone} - {trend_range} ({resolution} buckets)",
+                xaxis_title="Time",
+                yaxis_title="Count",
+                yaxis2=dict(title="Alert frames", overlaying="y", side="right", showgrid=False),
+                hovermode="x unified"
+            )
+            st.plotly_chart(fig3, use_container_width=True)
+        else:
+            st.info("No rollup data in this range")
+    
+    st.divider()
+
 #Alert Notif
 st.subheader("Alert Notifications")
 
@@ -116,32 +220,42 @@ if len(alerts) > 0:
         with st.container(border=True):
             st.write(f"🚨 **ALERT**")
             st.write(f"Timestamp: {latest_alert['timestamp']:.2f}s")
-            st.write(f"Location: Shibuya Crossing")
+            st.write(f"Location: {latest_alert.get('zone', 'N/A')}")
             st.write(f"Count: {latest_alert['count']} people")
-            st.write(f"Deviation: {((latest_alert['count'] - baseline) / baseline * 100):.2f}%")
+            st.write(f"Deviation: {deviations[0]:.2f}%")
             st.write(f"Status: ⚠️ Monitor")
     
-    # Patrol Unit Notification
+    # Delivery status as last written by the alert dispatcher
     with col2:
-        st.write("**Nearest Patrol Unit Alert**")
+        st.write("**Alert Dispatch**")
         with st.container(border=True):
-            st.write(f"📡 **DISPATCH**")
-            st.write(f"Unit ID: PATROL_001")
-            st.write(f"Location: Shibuya Crossing")
-            st.write(f"Priority: MEDIUM")
-            st.write(f"Action: Investigate crowd surge")
-            st.write(f"ETA: 5 minutes")
+            if dispatch_file.exists():
+                with open(dispatch_file) as f:
+                    dispatch = json.load(f)
+                for sink_name, sink in dispatch["sinks"].items():
+                    st.write(f"📡 **{sink_name}**")
+                    st.write(
+                        f"Delivered: {sink['sent']} | Queued: {sink['queued']} | "
+                        f"Retries: {sink['retries']} | Dead-lettered: {sink['dead_lettered']}"
+                    )
+                    if sink["last_error"]:
+                        st.caption(f"Last error: {sink['last_error']}")
+                st.caption(f"Updated {dispatch['updated']}")
+            else:
+                st.write("No alert dispatcher configured for this run")
 else:
     st.info("No active alerts")
 
 #Alert Timeline
 st.subheader("Alert Timeline")
 
-if len(alerts_df) > 0:
+if len(counts) > 0:
     # Display as table
-    display_df = alerts_df[["timestamp", "count", "deviation"]].copy()
-    display_df["timestamp"] = display_df["timestamp"].round(2)
-    display_df.columns = ["Time (s)", "Count", "Deviation (%)"]
+    display_df = pd.DataFrame({
+        "Time (s)": timestamps.round(2),
+        "Count": counts,
+        "Deviation (%)": deviations
+    })
     
     st.dataframe(display_df, use_container_width=True, hide_index=True)
     
@@ -160,15 +274,17 @@ if len(alerts_df) > 0:
             with col1:
                 st.write(f"**Frame:** {alert['frame']}")
                 st.write(f"**Count:** {alert['count']} people")
-                st.write(f"**Deviation:** {((alert['count'] - baseline) / baseline * 100):.2f}%")
+                st.write(f"**Deviation:** {deviations[idx]:.2f}%")
             
             with col2:
+                # Older timelines repeat the baseline pattern on every alert
                 pattern = alert.get("pattern", {})
-                st.write(f"**Baseline:** {pattern.get('avg_people', 'N/A')}")
-                st.write(f"**Peak:** {pattern.get('peak_people', 'N/A')}")
-                st.write(f"**Source:** {pattern.get('baseline_source', 'N/A')}")
+                st.write(f"**Baseline:** {pattern.get('avg_people', baseline)}")
+                st.write(f"**Peak:** {pattern.get('peak_people', peak)}")
+                st.write(f"**Source:** {pattern.get('baseline_source', 'first 30 frames of video')}")
             
-            st.write(f"**LLM Summary:**")
+            source = "LLM" if alert.get("llm_source", "llm") == "llm" else "Template"
+            st.write(f"**{source} Summary:**")
             st.write(alert.get("llm", "N/A"))
     
     # See more button
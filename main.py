@@ -1,11 +1,37 @@
+import os
+
 from src.video_processor import VideoProcessor
+from src.motion_gate import MotionGate
+from src.episode_index import EpisodeIndex
+from src.rollups import RollupStore
+from src.alert_dispatch import AlertDispatcher, FileSink, SocketSink, WebhookSink
 
 
 def main():
     video_path = r"C:\Users\Kaveri\Downloads\test_video.mp4"
     location = "Shibuya Crossing"
     
-    processor = VideoProcessor(video_path, output_dir="results")
+    motion_gate = MotionGate(threshold=0.01, refresh_every=50)
+    
+    index = EpisodeIndex()
+    rollups = RollupStore()
+    
+    # The file sink always records what was dispatched; endpoints are opt-in
+    sinks = [FileSink("results/dispatched_alerts.jsonl")]
+    if os.getenv("ALERT_WEBHOOK_URL"):
+        sinks.append(WebhookSink(os.getenv("ALERT_WEBHOOK_URL")))
+    if os.getenv("ALERT_SOCKET_PATH"):
+        sinks.append(SocketSink(os.getenv("ALERT_SOCKET_PATH")))
+    dispatcher = AlertDispatcher(sinks, status_path="results/dispatch_status.json")
+    
+    processor = VideoProcessor(
+        video_path,
+        output_dir="results",
+        motion_gate=motion_gate,
+        index=index,
+        rollups=rollups,
+        dispatcher=dispatcher
+    )
     output_video, alerts_log = processor.process_video(location=location)
 
 
@@ -0,0 +1,347 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+
+class FileSink:
+
+    def __init__(self, path, name=None):
+        self.path = Path(path)
+        self.name = name or f"file:{self.path.name}"
+
+    async def send(self, batch):
+        await asyncio.to_thread(self.append, batch)
+
+    def append(self, batch):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a') as f:
+            for alert in batch:
+                f.write(json.dumps(alert, default=str) + "\n")
+
+    async def close(self):
+        pass
+
+
+class WebhookSink:
+
+    def __init__(self, url, timeout=5.0, headers=None, name=None):
+        self.url = url
+        self.timeout = timeout
+        self.headers = headers or {}
+        self.name = name or f"webhook:{url}"
+
+    async def send(self, batch):
+        await asyncio.to_thread(self.post, batch)
+
+    def post(self, batch):
+        import requests
+
+        response = requests.post(
+            self.url,
+            data=json.dumps({'alerts': batch}, default=str),
+            headers={'Content-Type': 'application/json', **self.headers},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+
+    async def close(self):
+        pass
+
+
+class SocketSink:
+
+    def __init__(self, address, timeout=5.0, name=None):
+        # A Unix socket path, or (host, port) for localhost TCP; newline-delimited JSON either way
+        self.address = address
+        self.timeout = timeout
+        self.name = name or f"socket:{address}"
+        self.writer = None
+
+    async def connect(self):
+        if isinstance(self.address, str):
+            return await asyncio.open_unix_connection(self.address)
+        return await asyncio.open_connection(*self.address)
+
+    async def send(self, batch):
+        payload = "".join(json.dumps(alert, default=str) + "\n" for alert in batch).encode()
+
+        try:
+            if self.writer is None:
+                _, self.writer = await asyncio.wait_for(self.connect(), self.timeout)
+            self.writer.write(payload)
+            await asyncio.wait_for(self.writer.drain(), self.timeout)
+        except Exception:
+            # Reconnect on the next attempt
+            await self.close()
+            raise
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except Exception:
+                pass
+            self.writer = None
+
+
+class AlertDispatcher:
+
+    def __init__(self, sinks, batch_size=20, batch_window=0.5, max_queue=1000, max_retries=5,
+                 backoff=0.5, max_backoff=30.0, dead_letter_dir="results/dead_letter", status_path=None):
+        self.sinks = list(sinks)
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.dead_letter_dir = Path(dead_letter_dir)
+        self.status_path = Path(status_path) if status_path else None
+
+        # Delivery runs on its own event loop thread; the frame loop only hands alerts over
+        self.loop = None
+        self.thread = None
+        self.started = threading.Event()
+        self.closed = False
+        self.queues = {}
+        self.tasks = []
+        # Every sink's drain task writes the status file from a worker thread
+        self.status_lock = threading.Lock()
+
+        self.stats = {
+            sink.name: {
+                'queued': 0, 'sent': 0, 'batches': 0, 'retries': 0,
+                'dead_lettered': 0, 'dropped': 0, 'last_error': None
+            }
+            for sink in self.sinks
+        }
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+            self.started.wait()
+
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+        self.queues = {sink.name: asyncio.Queue(maxsize=self.max_queue) for sink in self.sinks}
+        self.tasks = [self.loop.create_task(self.drain(sink)) for sink in self.sinks]
+        self.started.set()
+
+        self.loop.run_forever()
+        self.loop.close()
+
+    def submit(self, alert):
+        # Never blocks: a full sink queue sheds its oldest alert to dead letter instead
+        if self.closed or not self.sinks:
+            return False
+
+        self.start()
+        self.loop.call_soon_threadsafe(self.enqueue, alert)
+        return True
+
+    def enqueue(self, alert):
+        for sink in self.sinks:
+            queue = self.queues[sink.name]
+            stats = self.stats[sink.name]
+
+            if queue.full():
+                oldest = queue.get_nowait()
+                queue.task_done()
+                stats['dropped'] += 1
+                self.write_dead_letter(sink.name, [oldest], "queue full")
+
+            queue.put_nowait(alert)
+            stats['queued'] = queue.qsize()
+
+    async def next_batch(self, queue, batch):
+        batch.append(await queue.get())
+        deadline = self.loop.time() + self.batch_window
+
+        while len(batch) < self.batch_size:
+            remaining = deadline - self.loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+    async def drain(self, sink):
+        queue = self.queues[sink.name]
+        stats = self.stats[sink.name]
+
+        while True:
+            batch = []
+
+            try:
+                await self.next_batch(queue, batch)
+                await self.deliver(sink, batch)
+            except asyncio.CancelledError:
+                # Shutting down mid-batch: keep the alerts rather than lose them
+                if batch:
+                    stats['dead_lettered'] += len(batch)
+                    self.write_dead_letter(sink.name, batch, "shutdown")
+                raise
+            finally:
+                for _ in batch:
+                    queue.task_done()
+                stats['queued'] = queue.qsize()
+
+            try:
+                await asyncio.to_thread(self.write_status)
+            except OSError as e:
+                # A status file problem must not stop delivery
+                print(f"Alert dispatch status: {e}")
+
+    async def deliver(self, sink, batch):
+        stats = self.stats[sink.name]
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                await sink.send(batch)
+                stats['sent'] += len(batch)
+                stats['batches'] += 1
+                return True
+            except Exception as e:
+                stats['last_error'] = f"{type(e).__name__}: {e}"
+
+            if attempt < self.max_retries:
+                stats['retries'] += 1
+                # Exponential backoff with jitter so sinks recovering together are not hit in lockstep
+                delay = min(self.backoff * 2 ** attempt, self.max_backoff)
+                await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+
+        stats['dead_lettered'] += len(batch)
+        await asyncio.to_thread(self.write_dead_letter, sink.name, batch, stats['last_error'])
+        return False
+
+    def write_dead_letter(self, sink_name, batch, reason):
+        self.dead_letter_dir.mkdir(parents=True, exist_ok=True)
+        path = self.dead_letter_dir / f"{sink_name.split(':')[0]}.jsonl"
+
+        with open(path, 'a') as f:
+            f.write(json.dumps({
+                'sink': sink_name,
+                'reason': reason,
+                'failed_at': datetime.now().isoformat(),
+                'alerts': batch
+            }, default=str) + "\n")
+
+    def write_status(self):
+        if self.status_path is None:
+            return
+
+        with self.status_lock:
+            self.status_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.status_path.with_suffix(".tmp")
+            with open(tmp_path, 'w') as f:
+                json.dump({'updated': datetime.now().isoformat(), 'sinks': self.metrics()}, f, indent=2)
+            # Readers never see a half-written file
+            os.replace(tmp_path, self.status_path)
+
+    async def shutdown(self, timeout):
+        try:
+            await asyncio.wait_for(asyncio.gather(*(q.join() for q in self.queues.values())), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+        for sink in self.sinks:
+            queue = self.queues[sink.name]
+            leftover = []
+            while not queue.empty():
+                leftover.append(queue.get_nowait())
+            if leftover:
+                self.stats[sink.name]['dead_lettered'] += len(leftover)
+                self.write_dead_letter(sink.name, leftover, "shutdown")
+            self.stats[sink.name]['queued'] = 0
+            await sink.close()
+
+        self.write_status()
+
+    def close(self, timeout=10.0):
+        # Bounded wait for queued alerts; whatever is left is dead-lettered, not dropped
+        self.closed = True
+        if self.thread is None:
+            return
+
+        future = asyncio.run_coroutine_threadsafe(self.shutdown(timeout), self.loop)
+        try:
+            future.result(timeout + 5)
+        except Exception as e:
+            print(f"Alert dispatch shutdown: {e}")
+
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+
+    def metrics(self):
+        return {name: dict(stats) for name, stats in self.stats.items()}
+
+
+async def receive(http_port=None, socket_path=None):
+    # Local stand-in for the control room / patrol endpoints: prints what arrives
+    def show(source, alert):
+        print(f"[{time.strftime('%H:%M:%S')}] {source}: {alert.get('zone', '?')} "
+              f"count={alert.get('count')} t={alert.get('timestamp')}")
+
+    async def handle_socket(reader, writer):
+        while line := await reader.readline():
+            show("socket", json.loads(line))
+        writer.close()
+
+    async def handle_http(reader, writer):
+        headers = {}
+        await reader.readline()
+        while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+            name, _, value = line.decode().partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        body = await reader.readexactly(int(headers.get('content-length', 0)))
+        for alert in json.loads(body or b"{}").get('alerts', []):
+            show("webhook", alert)
+
+        writer.write(b"HTTP/1.1 204 No Content\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+        await writer.drain()
+        writer.close()
+
+    servers = []
+    if socket_path:
+        servers.append(await asyncio.start_unix_server(handle_socket, socket_path))
+        print(f"Listening on unix socket {socket_path}")
+    if http_port:
+        servers.append(await asyncio.start_server(handle_http, "127.0.0.1", http_port))
+        print(f"Listening on http://127.0.0.1:{http_port}/")
+
+    await asyncio.gather(*(server.serve_forever() for server in servers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in receivers for alert dispatch")
+    parser.add_argument("--http", type=int, default=None, help="port for a webhook receiver")
+    parser.add_argument("--socket", default=None, help="path for a Unix socket receiver")
+    args = parser.parse_args()
+
+    if not args.http and not args.socket:
+        parser.error("give --http and/or --socket")
+
+    try:
+        asyncio.run(receive(args.http, args.socket))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+import argparse
+import csv
+import itertools
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+ANOMALY_GRID = {
+    'k': [1.5, 2.0, 2.5, 3.0],
+    'medium_cut': [1.0, 1.25, 1.5, 1.75],
+    'high_cut': [2.0, 2.5, 3.0],
+    'min_confidence': [0.0, 0.4, 0.6],
+    'medium_factor': [1.1, 1.2, 1.3],
+    'high_factor': [1.3, 1.5, 1.75, 2.0],
+}
+
+# DensityAnalyzer.analyze: levels compare a count to the mean of the last RECENT_FRAMES counts
+RECENT_FRAMES = 10
+LEVEL_WARMUP = 3
+
+PEAK_GRID = {
+    'baseline_frames': [15, 30, 60, 150, 300],
+    'margin': [0, 1, 2, 3, 5],
+}
+
+# Upper bound on (configs x frames) cells evaluated at once
+CHUNK_CELLS = 20_000_000
+
+
+def load_series(path):
+    columns = {'timestamp': [], 'person_count': [], 'global_density': [], 'confidence': []}
+
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            for name in columns:
+                columns[name].append(float(row[name]))
+
+    return {name: np.array(values) for name, values in columns.items()}
+
+
+def expand_grid(grid):
+    names = list(grid)
+    combos = list(itertools.product(*(grid[name] for name in names)))
+    return {name: np.array([c[i] for c in combos], dtype=float) for i, name in enumerate(names)}
+
+
+def unique_rows(*columns):
+    keys, inverse = np.unique(np.column_stack(columns), axis=0, return_inverse=True)
+    return keys, inverse.reshape(-1)
+
+
+class Backtester:
+
+    def __init__(self, series, events=None):
+        self.timestamps = np.asarray(series['timestamp'], dtype=float)
+        self.counts = np.asarray(series['person_count'], dtype=float)
+        self.densities = np.asarray(series['global_density'], dtype=float)
+        self.confidences = np.asarray(series['confidence'], dtype=float)
+        self.frames = len(self.counts)
+
+        # Optional ground-truth events as (start_s, end_s) for time-to-alert
+        self.events = [
+            (int(np.searchsorted(self.timestamps, start)), int(np.searchsorted(self.timestamps, end, side='right')))
+            for start, end in (events or [])
+        ]
+
+    def accumulate(self, alert_fn, n_configs):
+        alert_frames = np.zeros(n_configs, dtype=np.int64)
+        episodes = np.zeros(n_configs, dtype=np.int64)
+        first = np.full(n_configs, -1, dtype=np.int64)
+        prev = np.zeros(n_configs, dtype=bool)
+
+        chunk = max(CHUNK_CELLS // max(n_configs, 1), 1)
+
+        for lo in range(0, self.frames, chunk):
+            hi = min(lo + chunk, self.frames)
+            alerts = alert_fn(lo, hi)
+
+            alert_frames += alerts.sum(axis=1)
+
+            # Rising edges are episode starts; carry the last column across chunks
+            shifted = np.concatenate([prev[:, None], alerts[:, :-1]], axis=1)
+            episodes += (alerts & ~shifted).sum(axis=1)
+
+            has_alert = alerts.any(axis=1)
+            new_first = (first < 0) & has_alert
+            first[new_first] = lo + alerts[new_first].argmax(axis=1)
+
+            prev = alerts[:, -1]
+
+        t0 = self.timestamps[0] if self.frames else 0.0
+        first_alert = np.where(first >= 0, self.timestamps[np.maximum(first, 0)] - t0, np.nan)
+
+        report = {
+            'alert_frames': alert_frames,
+            'alert_rate': alert_frames / max(self.frames, 1),
+            'episodes': episodes,
+            'first_alert_s': first_alert
+        }
+
+        if self.events:
+            detected = np.zeros(n_configs, dtype=np.int64)
+            delays = []
+
+            for start, end in self.events:
+                if end <= start:
+                    continue
+                alerts = alert_fn(start, end)
+                hit = alerts.any(axis=1)
+                delay = self.timestamps[start + alerts.argmax(axis=1)] - self.timestamps[start]
+                detected += hit
+                delays.append(np.where(hit, delay, np.nan))
+
+            report['events_detected'] = detected
+            if delays:
+                with warnings.catch_warnings():
+                    # Configs that never alert inside an event have an all-NaN column
+                    warnings.simplefilter("ignore", category=RuntimeWarning)
+                    report['mean_time_to_alert_s'] = np.nanmean(np.vstack(delays), axis=0)
+
+        return report
+
+    def sweep_anomaly(self, grid=None, baseline_frames=None):
+        params = expand_grid(grid or ANOMALY_GRID)
+        n = len(params['k'])
+
+        # Same statistics as Pipeline.calculate_baseline, optionally on a prefix
+        reference = self.densities[:baseline_frames] if baseline_frames else self.densities
+        mean = float(np.mean(reference))
+        std = float(np.std(reference))
+
+        z = np.zeros_like(self.densities) if std == 0 else (self.densities - mean) / std
+        abs_z = np.abs(z)
+
+        # Alerts depend only on (medium_cut, min_confidence); evaluate each distinct pair once
+        alert_keys, alert_inv = unique_rows(params['medium_cut'], params['min_confidence'])
+        medium_cut = alert_keys[:, 0:1]
+        min_conf = alert_keys[:, 1:2]
+
+        # AnomalyDetector.get_severity + confidence gate + AlertGenerator.should_alert
+        def alert_fn(lo, hi):
+            return (abs_z[None, lo:hi] >= medium_cut) & (self.confidences[None, lo:hi] >= min_conf)
+
+        report = {name: values[alert_inv] for name, values in self.accumulate(alert_fn, len(alert_keys)).items()}
+
+        high_keys, high_inv = unique_rows(params['high_cut'], params['min_confidence'])
+        high = np.zeros(len(high_keys), dtype=np.int64)
+
+        chunk = max(CHUNK_CELLS // max(len(high_keys), 1), 1)
+        for lo in range(0, self.frames, chunk):
+            hi = min(lo + chunk, self.frames)
+            high += (
+                (abs_z[None, lo:hi] >= high_keys[:, 0:1]) &
+                (self.confidences[None, lo:hi] >= high_keys[:, 1:2])
+            ).sum(axis=1)
+
+        # Single-threshold counts come from one sort plus a binary search per config
+        sorted_d = np.sort(self.densities)
+        anomalies = self.frames - np.searchsorted(sorted_d, mean + params['k'] * std, side='right')
+
+        # DensityAnalyzer levels: high if count > recent mean * high_factor, else medium if > * medium_factor
+        sorted_r = np.sort(self.recent_ratios())
+
+        def above(factor):
+            return len(sorted_r) - np.searchsorted(sorted_r, factor, side='right')
+
+        high_level = above(params['high_factor'])
+        medium_level = above(params['medium_factor']) - above(np.maximum(params['medium_factor'], params['high_factor']))
+        low_level = self.frames - high_level - medium_level
+
+        report.update({
+            'anomaly_frames': anomalies,
+            'high_severity_frames': high[high_inv],
+            'low_density_frames': low_level,
+            'high_density_frames': high_level,
+            'medium_density_frames': medium_level
+        })
+
+        return pd.DataFrame({**params, **report})
+
+    def recent_ratios(self):
+        # count / mean of the last RECENT_FRAMES counts (current included), for frames past the warmup
+        cumulative = np.concatenate([[0.0], np.cumsum(self.counts)])
+        idx = np.arange(self.frames)
+        start = np.maximum(idx + 1 - RECENT_FRAMES, 0)
+        recent_mean = (cumulative[idx + 1] - cumulative[start]) / (idx + 1 - start)
+
+        ratios = np.divide(self.counts, recent_mean, out=np.zeros(self.frames), where=recent_mean > 0)
+        return ratios[LEVEL_WARMUP - 1:]
+
+    def sweep_peak(self, grid=None):
+        params = expand_grid(grid or PEAK_GRID)
+        baseline_frames = params['baseline_frames'].astype(np.int64)
+
+        # VideoProcessor sets peak = max of the first N counts once N frames are seen
+        peaks = np.array([
+            self.counts[:n].max() if 0 < n <= self.frames else np.inf
+            for n in baseline_frames
+        ])
+        thresholds = (peaks + params['margin'])[:, None]
+        active_from = (baseline_frames - 1)[:, None]
+
+        def alert_fn(lo, hi):
+            idx = np.arange(lo, hi)[None, :]
+            return (self.counts[None, lo:hi] >= thresholds) & (idx >= active_from)
+
+        report = self.accumulate(alert_fn, len(baseline_frames))
+        report['peak'] = peaks
+
+        return pd.DataFrame({**params, **report})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep alert parameters over stored per-frame series")
+    parser.add_argument("series", nargs="?", default="results/video_frames.csv")
+    parser.add_argument("--rule", choices=["anomaly", "peak"], default="peak")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    backtester = Backtester(load_series(args.series))
+
+    if args.rule == "anomaly":
+        table = backtester.sweep_anomaly()
+    else:
+        table = backtester.sweep_peak()
+
+    output = Path(args.output or f"results/backtest_{args.rule}.csv")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    table.to_csv(output, index=False)
+
+    print(f"{len(table)} configs over {backtester.frames} frames -> {output}")
+    print(table.sort_values("episodes").head(10).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
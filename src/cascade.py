@@ -0,0 +1,133 @@
+from src.frame_analyzer import FrameAnalyzer
+from src.motion_gate import MotionGate
+
+
+REASONS = ("no_threshold", "near_threshold", "low_confidence", "scene_change", "count_jump")
+
+
+class CascadeAnalyzer:
+
+    def __init__(self, fast_model="yolov8n.pt", accurate_model="yolov8l.pt", motion_gate=None,
+                 near_margin=0.15, min_near=2, min_confidence=0.4, scene_change=0.25, count_jump=0.3):
+        # Nano runs on every frame; the large model only when nano's answer could flip the alert
+        self.fast = FrameAnalyzer(fast_model, motion_gate=motion_gate)
+        self.accurate = FrameAnalyzer(accurate_model)
+
+        self.threshold = None
+        self.near_margin = near_margin
+        self.min_near = min_near
+        self.min_confidence = min_confidence
+        self.count_jump = count_jump
+
+        # Frame-to-frame change on the same downscaled grayscale the motion gate uses
+        self.scene = MotionGate(threshold=scene_change)
+        self.scene_change = scene_change
+        self.last_count = None
+        self.last_detection = None
+
+        # The peak is learned from yolov8l counts, and nano undercounts dense crowds. Baseline
+        # frames run both models, which fits a nano -> large ratio for comparing nano to it
+        self.nano_total = 0
+        self.large_total = 0
+
+        self.frames = 0
+        self.escalated = 0
+        self.reasons = dict.fromkeys(REASONS, 0)
+        self.disagreement = 0
+        self.max_disagreement = 0
+
+    def set_threshold(self, threshold):
+        # Alerts fire at count >= threshold (the run's peak)
+        self.threshold = threshold
+
+    @property
+    def nano_scale(self):
+        return self.large_total / self.nano_total if self.nano_total else 1.0
+
+    def configure(self, imgsz=None, conf=None, stride=None):
+        # Stride applies to nano; skipped frames reuse the last result whichever model made it
+        self.fast.configure(imgsz=imgsz, conf=conf, stride=stride)
+        self.accurate.configure(imgsz=imgsz, conf=conf)
+
+    def warmup(self, background=False, imgsz=640):
+        self.fast.warmup(background=background, imgsz=imgsz)
+        return self.accurate.warmup(background=background, imgsz=imgsz)
+
+    def scene_changed(self, frame):
+        small = self.scene.downscale(frame)
+        previous = self.scene.reference
+
+        changed = (
+            previous is not None and previous.shape == small.shape and
+            self.scene.change_ratio(small) >= self.scene_change
+        )
+        self.scene.reference = small
+        return changed
+
+    def escalation_reason(self, frame, detection):
+        # Nano's count in large-model units, like the threshold and last_count
+        count = detection.person_count * self.nano_scale
+        scene_changed = self.scene_changed(frame)
+
+        # Baseline frames set the alert line, so they all get the accurate count
+        if self.threshold is None:
+            return "no_threshold"
+        # At or above the line too: nano's raw count may still sit below it, so only the
+        # accurate count can decide the alert
+        if count >= self.threshold - max(self.min_near, self.near_margin * self.threshold):
+            return "near_threshold"
+        if detection.person_count > 0 and detection.avg_confidence < self.min_confidence:
+            return "low_confidence"
+        if scene_changed:
+            return "scene_change"
+        if self.last_count is not None and abs(count - self.last_count) >= max(3, self.count_jump * self.last_count):
+            return "count_jump"
+        return None
+
+    def analyze_frame(self, frame, frame_idx=0, timestamp=0.0):
+        detection = self.fast.analyze_frame(frame, frame_idx=frame_idx, timestamp=timestamp)
+
+        if detection is None:
+            return None
+
+        self.frames += 1
+
+        # Static scene: keep whichever model produced the last fresh result
+        if detection.reused and self.last_detection is not None:
+            return self.last_detection.at(frame_idx, timestamp, reused=True)
+
+        reason = self.escalation_reason(frame, detection)
+
+        if reason is not None:
+            accurate = self.accurate.analyze_frame(frame, frame_idx=frame_idx, timestamp=timestamp)
+
+            if reason == "no_threshold":
+                self.nano_total += detection.person_count
+                self.large_total += accurate.person_count
+
+            self.escalated += 1
+            self.reasons[reason] += 1
+            gap = abs(accurate.person_count - detection.person_count)
+            self.disagreement += gap
+            self.max_disagreement = max(self.max_disagreement, gap)
+
+            detection = accurate
+            self.last_count = detection.person_count
+        else:
+            self.last_count = detection.person_count * self.nano_scale
+
+        self.last_detection = detection
+        return detection
+
+    def metrics(self):
+        return {
+            'frames': self.frames,
+            'escalated': self.escalated,
+            'escalation_rate': self.escalated / self.frames if self.frames else 0.0,
+            'reasons': dict(self.reasons),
+            # Mean |large - nano| count on escalated frames
+            'mean_disagreement': self.disagreement / self.escalated if self.escalated else 0.0,
+            'max_disagreement': self.max_disagreement,
+            # Large-model people per nano person, fitted on baseline frames
+            'nano_scale': self.nano_scale
+        }
@@ -0,0 +1,159 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+
+def lttb_indices(x, y, n_out):
+    # Largest-Triangle-Three-Buckets: keeps the points that preserve the visual shape
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    prev = 0
+
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], edges[i + 2]
+        else:
+            next_start, next_end = n - 1, n
+
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        bucket_x = x[start:end]
+        bucket_y = y[start:end]
+        area = np.abs(
+            (x[prev] - avg_x) * (bucket_y - y[prev]) -
+            (x[prev] - bucket_x) * (avg_y - y[prev])
+        )
+
+        prev = start + int(np.argmax(area))
+        indices[i + 1] = prev
+
+    return indices
+
+
+def deviation_percent(counts, baseline):
+    counts = np.asarray(counts, dtype=float)
+    if not baseline:
+        return np.zeros_like(counts)
+    return np.round((counts - baseline) / baseline * 100, 2)
+
+
+def load_timeline(path):
+    with open(path) as f:
+        data = json.load(f)
+
+    alerts = data.get("alerts", [])
+
+    return {
+        'baseline': data.get("baseline") or 0,
+        'peak': data.get("peak") or 0,
+        'alerts': alerts,
+        'timestamps': np.array([a['timestamp'] for a in alerts], dtype=float),
+        'counts': np.array([a['count'] for a in alerts], dtype=int),
+        'flow': data.get("flow")
+    }
+
+
+class AlertStream:
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.offset = 0
+        self.header = None
+        self.partial = b""
+
+        self.baseline = 0
+        self.peak = 0
+        self.alerts = []
+        self.alert_index = {}
+        self.timestamps = []
+        self.counts = []
+        self.flow = None
+
+    def read_header(self):
+        with open(self.path, 'rb') as f:
+            return f.readline()
+
+    def refresh(self):
+        with self.lock:
+            try:
+                size = os.stat(self.path).st_size
+            except FileNotFoundError:
+                self.reset()
+                return False
+
+            # A new run truncates the file and writes a fresh header line
+            header = self.read_header()
+            if size < self.offset or (self.header is not None and header != self.header):
+                self.reset()
+
+            if size == self.offset:
+                return False
+
+            with open(self.path, 'rb') as f:
+                f.seek(self.offset)
+                chunk = f.read(size - self.offset)
+
+            self.offset += len(chunk)
+
+            lines = (self.partial + chunk).split(b"\n")
+            # The writer may be mid-line; keep the tail for the next refresh
+            self.partial = lines.pop()
+
+            for line in lines:
+                if line.strip():
+                    self.apply(json.loads(line))
+
+            if self.header is None:
+                self.header = header
+
+            return True
+
+    def apply(self, record):
+        if 'baseline' in record:
+            self.baseline = record['baseline'] or 0
+            self.peak = record['peak'] or 0
+        elif 'alert' in record:
+            alert = record['alert']
+            self.alert_index[alert['frame']] = len(self.alerts)
+            self.alerts.append(alert)
+            self.timestamps.append(alert['timestamp'])
+            self.counts.append(alert['count'])
+        elif 'flow' in record:
+            # Only the newest flow snapshot is shown
+            self.flow = record['flow']
+        elif 'update' in record:
+            # Late LLM text replaces the template summary of an existing alert
+            update = record['update']
+            idx = self.alert_index.get(update['frame'])
+            if idx is not None:
+                self.alerts[idx] = dict(self.alerts[idx], **{k: v for k, v in update.items() if k != 'frame'})
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'baseline': self.baseline,
+                'peak': self.peak,
+                'alerts': list(self.alerts),
+                'timestamps': np.array(self.timestamps, dtype=float),
+                'counts': np.array(self.counts, dtype=int),
+                'flow': self.flow
+            }
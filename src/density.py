@@ -1,19 +1,41 @@
+from collections import deque
+
 import numpy as np
-from scipy.ndimage import gaussian_filter
 
 
 class DensityAnalyzer:
-    def __init__(self, grid_size=5):
+    def __init__(self, grid_size=5, history_window=None):
         self.grid_size = grid_size
-        self.history = []
+        self.recent = deque(maxlen=10)
+        
+        # Z-scores use running sums: all frames by default, or a rolling window of history_window frames
+        self.history_window = history_window
+        self.history = deque(maxlen=history_window) if history_window else None
+        self.frames = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+    
+    def add(self, person_count):
+        if self.history is not None:
+            if len(self.history) == self.history_window:
+                evicted = self.history[0]
+                self.frames -= 1
+                self.total -= evicted
+                self.total_sq -= evicted * evicted
+            self.history.append(person_count)
+        
+        self.frames += 1
+        self.total += person_count
+        self.total_sq += person_count * person_count
+        self.recent.append(person_count)
     
     def analyze(self, person_count):
-        self.history.append(person_count)
+        self.add(person_count)
         
-        if len(self.history) < 3:
+        if self.frames < 3:
             return "low"
         
-        avg = sum(self.history[-10:]) / len(self.history[-10:])
+        avg = sum(self.recent) / len(self.recent)
         
         if person_count > avg * 1.5:
             return "high"
@@ -23,11 +45,11 @@ class DensityAnalyzer:
             return "low"
     
     def calculate_z_score(self, person_count):
-        if len(self.history) < 2:
+        if self.frames < 2:
             return 0
         
-        mean = sum(self.history) / len(self.history)
-        variance = sum((x - mean) ** 2 for x in self.history) / len(self.history)
+        mean = self.total / self.frames
+        variance = max(self.total_sq / self.frames - mean ** 2, 0.0)
         std = variance ** 0.5
         
         if std == 0:
@@ -40,7 +62,12 @@ class DensityAnalyzer:
         area = h * w
         return person_count / area
     
-    def spatial_map(self, centroids, image_shape):
+    def spatial_map(self, centroids, image_shape, density_map=None):
+        if density_map is not None:
+            return self.density_grid(density_map)
+        
+        from scipy.ndimage import gaussian_filter
+        
         h, w = image_shape
         grid = np.zeros((self.grid_size, self.grid_size))
         
@@ -55,16 +82,25 @@ class DensityAnalyzer:
         
         return gaussian_filter(grid, sigma=0.5)
     
+    def density_grid(self, density_map):
+        # Sum a per-pixel density map into grid cells; cell values are person counts
+        h, w = density_map.shape
+        rows = np.linspace(0, h, self.grid_size + 1).astype(int)
+        cols = np.linspace(0, w, self.grid_size + 1).astype(int)
+        
+        row_sums = np.add.reduceat(density_map, rows[:-1], axis=0)
+        return np.add.reduceat(row_sums, cols[:-1], axis=1).astype(np.float64)
+    
     def hot_cells(self, grid, threshold=0.5):
         hot_count = int(np.sum(grid > threshold))
         max_density = float(np.max(grid))
         return hot_count, max_density
     
-    def process(self, person_count, centroids, image_shape):
+    def process(self, person_count, centroids, image_shape, density_map=None):
         global_dens = self.global_density(person_count, image_shape)
         density_level = self.analyze(person_count)
         
-        spatial = self.spatial_map(centroids, image_shape)
+        spatial = self.spatial_map(centroids, image_shape, density_map=density_map)
         hot_count, max_dens = self.hot_cells(spatial)
         
         return {
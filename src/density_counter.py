@@ -0,0 +1,173 @@
+import cv2
+import threading
+import numpy as np
+from pathlib import Path
+
+from src.frame_record import Detection, EMPTY_BOXES, EMPTY_SCORES
+
+
+FRONTEND = [64, 64, 'M', 128, 128, 'M', 256, 256, 256, 'M', 512, 512, 512]
+BACKEND = [512, 512, 512, 256, 128, 64]
+
+IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+
+def build_csrnet():
+    import torch.nn as nn
+
+    def make_layers(cfg, in_channels, dilation=1):
+        layers = []
+        for v in cfg:
+            if v == 'M':
+                layers.append(nn.MaxPool2d(kernel_size=2, stride=2))
+            else:
+                layers.append(nn.Conv2d(in_channels, v, kernel_size=3, padding=dilation, dilation=dilation))
+                layers.append(nn.ReLU(inplace=True))
+                in_channels = v
+        return nn.Sequential(*layers)
+
+    # Layer names match the public CSRNet checkpoints so their weights load as-is
+    class CSRNet(nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.frontend = make_layers(FRONTEND, 3)
+            self.backend = make_layers(BACKEND, 512, dilation=2)
+            self.output_layer = nn.Conv2d(64, 1, kernel_size=1)
+
+        def forward(self, x):
+            return self.output_layer(self.backend(self.frontend(x)))
+
+    return CSRNet()
+
+
+def load_points(image_path):
+    # ShanghaiTech keeps head points in ground_truth/GT_<name>.mat next to images/
+    from scipy.io import loadmat
+
+    image_path = Path(image_path)
+    gt_path = image_path.parent.parent / "ground_truth" / f"GT_{image_path.stem}.mat"
+
+    if not gt_path.exists():
+        return None
+
+    mat = loadmat(str(gt_path))
+    return np.asarray(mat["image_info"][0, 0][0, 0][0], dtype=np.float32).reshape(-1, 2)
+
+
+def points_to_density(points, image_shape, sigma=4.0):
+    h, w = image_shape
+    density = np.zeros((h, w), dtype=np.float32)
+
+    if points is None or len(points) == 0:
+        return density
+
+    xs = np.clip(points[:, 0].astype(int), 0, w - 1)
+    ys = np.clip(points[:, 1].astype(int), 0, h - 1)
+    np.add.at(density, (ys, xs), 1.0)
+
+    # Gaussian blur keeps the integral at the number of points, minus mass spilling past the border
+    return cv2.GaussianBlur(density, (0, 0), sigma, borderType=cv2.BORDER_CONSTANT)
+
+
+class DensityCounter:
+
+    def __init__(self, weights_path, input_size=512, peak_threshold=0.005, device="cpu"):
+        self.weights_path = weights_path
+        self.input_size = input_size
+        self.peak_threshold = peak_threshold
+        self.device = device
+        self._model = None
+        self._warmup_thread = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            import torch
+
+            model = build_csrnet()
+            checkpoint = torch.load(self.weights_path, map_location=self.device)
+            state_dict = checkpoint.get("state_dict", checkpoint)
+            model.load_state_dict(state_dict)
+            model.to(self.device).eval()
+            self._model = model
+        return self._model
+
+    def warmup(self, background=False):
+        if background:
+            if self._warmup_thread is None:
+                self._warmup_thread = threading.Thread(target=self.warmup, daemon=True)
+                self._warmup_thread.start()
+            return self._warmup_thread
+
+        self.density_map(np.zeros((self.input_size, self.input_size, 3), dtype=np.uint8))
+        return None
+
+    def preprocess(self, frame):
+        h, w = frame.shape[:2]
+        # One downscaled pass; dimensions snap to multiples of 8 to match the network stride
+        scale = min(self.input_size / max(h, w), 1.0)
+        size = (max(int(w * scale) // 8 * 8, 8), max(int(h * scale) // 8 * 8, 8))
+
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB).astype(np.float32) / 255.0
+        return ((rgb - IMAGENET_MEAN) / IMAGENET_STD).transpose(2, 0, 1)
+
+    def wait_for_warmup(self):
+        # Inference waits for a background warmup instead of running beside it
+        thread = self._warmup_thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+            self._warmup_thread = None
+
+    def density_map(self, frame):
+        import torch
+
+        self.wait_for_warmup()
+
+        tensor = torch.from_numpy(self.preprocess(frame))[None].to(self.device)
+
+        with torch.inference_mode():
+            output = self.model(tensor)
+
+        return np.maximum(output[0, 0].cpu().numpy(), 0)
+
+    def find_peaks(self, density, frame_shape, limit):
+        h, w = frame_shape
+        dh, dw = density.shape
+
+        # Local maxima of the map stand in for person positions for tracking and overlays
+        dilated = cv2.dilate(density, np.ones((3, 3), dtype=np.uint8))
+        ys, xs = np.nonzero((density == dilated) & (density > self.peak_threshold))
+
+        order = np.argsort(density[ys, xs])[::-1][:limit]
+        xs = (xs[order] + 0.5) * w / dw
+        ys = (ys[order] + 0.5) * h / dh
+
+        return np.column_stack([xs, ys]).astype(np.float32)
+
+    def analyze_frame(self, frame, frame_idx=0, timestamp=0.0):
+        if frame is None:
+            return None
+
+        h, w = frame.shape[:2]
+
+        density = self.density_map(frame)
+        count_estimate = float(density.sum())
+        person_count = int(round(count_estimate))
+
+        centroids = self.find_peaks(density, (h, w), person_count)
+
+        return Detection(
+            frame_idx=frame_idx,
+            timestamp=timestamp,
+            person_count=person_count,
+            boxes=EMPTY_BOXES,
+            confidences=EMPTY_SCORES,
+            centroids=centroids,
+            # Density regression has no per-box score; 1.0 keeps confidence gates open
+            avg_confidence=1.0,
+            frame_shape=(h, w),
+            density_map=density,
+            count_estimate=count_estimate
+        )
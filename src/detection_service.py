@@ -0,0 +1,303 @@
+import argparse
+import os
+import queue
+import secrets
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+
+import numpy as np
+
+
+DEFAULT_ADDRESS = ("127.0.0.1", 8765)
+
+# The listener unpickles what clients send, so there is no built-in key: each service run
+# generates one (or takes it from the environment) and only processes holding it may connect
+AUTHKEY_ENV = "CROWDSPOT_DETECTION_KEY"
+DEFAULT_KEY_FILE = "data/detection_service.key"
+
+# The model runs at the lowest confidence any client asks for; each reply is filtered to its own
+MIN_CONFIDENCE = 0.1
+
+
+def parse_address(value):
+    # "host:port" for localhost TCP, anything else is a Unix socket path
+    host, sep, port = value.rpartition(":")
+    if sep and port.isdigit():
+        return (host or "127.0.0.1", int(port))
+    return value
+
+
+def resolve_authkey(authkey=None, key_file=DEFAULT_KEY_FILE):
+    # Explicit key, then the environment (hex), then the key file the running service wrote
+    if authkey:
+        return authkey if isinstance(authkey, bytes) else bytes.fromhex(authkey)
+
+    if os.getenv(AUTHKEY_ENV):
+        return bytes.fromhex(os.getenv(AUTHKEY_ENV))
+
+    path = Path(key_file)
+    if path.exists():
+        return bytes.fromhex(path.read_text().strip())
+
+    return None
+
+
+def write_key_file(authkey, key_file=DEFAULT_KEY_FILE):
+    path = Path(key_file)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Owner-only from the moment it exists
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        f.write(authkey.hex())
+    os.chmod(path, 0o600)
+    return path
+
+
+class DetectionServer:
+
+    def __init__(self, model_name="yolov8l.pt", address=DEFAULT_ADDRESS, authkey=None,
+                 max_batch=8, max_latency_ms=20, imgsz=640, person_class=0):
+        self.model_name = model_name
+        self.address = address
+        # A fresh random key per run unless the caller shares one
+        self.authkey = authkey or secrets.token_bytes(32)
+        self.max_batch = max_batch
+        self.max_latency = max_latency_ms / 1000.0
+        self.imgsz = imgsz
+        self.person_class = person_class
+
+        self.model = None
+        self.requests = queue.Queue()
+        self.listener = None
+        self.stopping = threading.Event()
+
+        self.batches = 0
+        self.frames = 0
+        self.clients = 0
+        self.rejected = 0
+
+    def load(self):
+        from ultralytics import YOLO
+
+        self.model = YOLO(self.model_name)
+        self.model(np.zeros((self.imgsz, self.imgsz, 3), dtype=np.uint8), verbose=False, imgsz=self.imgsz)
+
+    def serve_client(self, conn):
+        # Replies from the batch thread and this reader share the connection
+        send_lock = threading.Lock()
+
+        try:
+            while not self.stopping.is_set():
+                request = conn.recv()
+                self.requests.put((conn, send_lock, request))
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+
+    def next_batch(self):
+        batch = [self.requests.get()]
+        # The first frame in sets the deadline; later arrivals ride along until it passes
+        deadline = time.monotonic() + self.max_latency
+
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return [item for item in batch if item is not None]
+
+    def check_request(self, request):
+        # Anything wrong here is one client's mistake and must not reach the batch
+        if not isinstance(request, dict):
+            raise ValueError(f"expected a dict, got {type(request).__name__}")
+
+        frame = request.get('frame')
+        if not isinstance(frame, np.ndarray) or frame.ndim != 3 or frame.shape[2] != 3:
+            raise ValueError("'frame' must be an HxWx3 image array")
+
+        return frame, float(request.get('conf', MIN_CONFIDENCE))
+
+    def reply(self, conn, send_lock, reply):
+        try:
+            with send_lock:
+                conn.send(reply)
+        except OSError:
+            # Client went away mid-batch; its reader thread cleans up
+            pass
+
+    def person_arrays(self, result, min_confidence):
+        boxes = result.boxes
+        xyxy = boxes.xyxy.cpu().numpy().astype(np.float32)
+        confidences = boxes.conf.cpu().numpy().astype(np.float32)
+        keep = (boxes.cls.cpu().numpy().astype(int) == self.person_class) & (confidences >= min_confidence)
+        return xyxy[keep], confidences[keep]
+
+    def run_batches(self):
+        while not self.stopping.is_set():
+            batch = self.next_batch()
+            if not batch:
+                continue
+
+            frames, senders = [], []
+            for conn, send_lock, request in batch:
+                try:
+                    frame, conf = self.check_request(request)
+                except (TypeError, ValueError) as e:
+                    self.rejected += 1
+                    self.reply(conn, send_lock, {'error': f"bad request: {e}"})
+                    continue
+                frames.append(frame)
+                senders.append((conn, send_lock, conf))
+
+            if not frames:
+                continue
+
+            try:
+                results = self.model(frames, verbose=False, conf=MIN_CONFIDENCE, imgsz=self.imgsz)
+                replies = [self.person_arrays(result, conf) for result, (_, _, conf) in zip(results, senders)]
+            except Exception as e:
+                replies = [{'error': str(e)}] * len(senders)
+
+            self.batches += 1
+            self.frames += len(frames)
+
+            for (conn, send_lock, _), reply in zip(senders, replies):
+                self.reply(conn, send_lock, reply)
+
+    def serve_forever(self):
+        if self.model is None:
+            self.load()
+
+        self.listener = Listener(self.address, authkey=self.authkey)
+        threading.Thread(target=self.run_batches, daemon=True).start()
+
+        print(f"Detection service: {self.model_name} on {self.listener.address} "
+              f"(batch <= {self.max_batch}, latency budget {self.max_latency * 1000:.0f} ms)")
+
+        try:
+            while not self.stopping.is_set():
+                try:
+                    conn = self.listener.accept()
+                except AuthenticationError:
+                    # A wrong key costs that caller its connection, not everyone the service
+                    print("Detection service: rejected a client with the wrong key")
+                    continue
+                self.clients += 1
+                threading.Thread(target=self.serve_client, args=(conn,), daemon=True).start()
+        except (KeyboardInterrupt, OSError):
+            pass
+        finally:
+            self.close()
+
+    def close(self):
+        self.stopping.set()
+        self.requests.put(None)
+        if self.listener is not None:
+            self.listener.close()
+            self.listener = None
+
+        print(f"Detection service: {self.frames} frames in {self.batches} batches "
+              f"(avg {self.metrics()['avg_batch']:.1f}) from {self.clients} clients")
+
+    def metrics(self):
+        return {
+            'frames': self.frames,
+            'batches': self.batches,
+            'avg_batch': self.frames / self.batches if self.batches else 0.0,
+            'clients': self.clients,
+            'rejected': self.rejected
+        }
+
+
+class DetectionClient:
+
+    def __init__(self, address=DEFAULT_ADDRESS, authkey=None, conf=MIN_CONFIDENCE, key_file=DEFAULT_KEY_FILE,
+                 timeout=30.0):
+        self.address = address
+        self.authkey = resolve_authkey(authkey, key_file)
+        if self.authkey is None:
+            raise ValueError(
+                f"No detection service key: pass authkey, set {AUTHKEY_ENV}, "
+                f"or start the service, which writes {key_file}"
+            )
+        self.conf = conf
+        # Seconds to wait for a reply; a stalled service fails the caller instead of hanging it
+        self.timeout = timeout
+        self.conn = None
+        self.lock = threading.Lock()
+
+    def connect(self):
+        if self.conn is None:
+            self.conn = Client(self.address, authkey=self.authkey)
+        return self.conn
+
+    def detect(self, frame, conf=None):
+        # One request in flight per connection; the server batches across connections
+        with self.lock:
+            conn = self.connect()
+            conn.send({'frame': np.ascontiguousarray(frame), 'conf': self.conf if conf is None else conf})
+            if not conn.poll(self.timeout):
+                # A late reply would answer the next request, so this connection is done
+                conn.close()
+                self.conn = None
+                raise TimeoutError(f"Detection service did not reply within {self.timeout:.0f} s")
+            reply = conn.recv()
+
+        if isinstance(reply, dict):
+            raise RuntimeError(f"Detection service error: {reply['error']}")
+
+        return reply
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+    def __getstate__(self):
+        # Each process opens its own connection after unpickling
+        return {'address': self.address, 'authkey': self.authkey, 'conf': self.conf, 'timeout': self.timeout}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve batched person detection to local processes")
+    parser.add_argument("--model", default="yolov8l.pt")
+    parser.add_argument("--address", default="127.0.0.1:8765", help="host:port, or a Unix socket path")
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--max-latency-ms", type=float, default=20)
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--key-file", default=DEFAULT_KEY_FILE,
+                        help=f"where to write this run's client key (ignored when {AUTHKEY_ENV} is set)")
+    args = parser.parse_args()
+
+    if os.getenv(AUTHKEY_ENV):
+        authkey = bytes.fromhex(os.getenv(AUTHKEY_ENV))
+    else:
+        authkey = secrets.token_bytes(32)
+        print(f"Detection service key written to {write_key_file(authkey, args.key_file)}")
+
+    server = DetectionServer(
+        args.model,
+        address=parse_address(args.address),
+        authkey=authkey,
+        max_batch=args.max_batch,
+        max_latency_ms=args.max_latency_ms,
+        imgsz=args.imgsz
+    )
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,21 @@
 import cv2
-from ultralytics import YOLO
 from pathlib import Path
 
 
 class PersonDetector:
-    def __init__(self, model_name="yolov8n.pt"):
-        self.model = YOLO(model_name)
+    def __init__(self, model_name="yolov8n.pt", service=None):
+        self.model_name = model_name
+        # A DetectionClient; the service's model is used instead of loading model_name here
+        self.service = service
         self.person_class = 0
+        self._model = None
+    
+    @property
+    def model(self):
+        if self._model is None:
+            from ultralytics import YOLO
+            self._model = YOLO(self.model_name)
+        return self._model
     
     def detect(self, image):
         results = self.model(image, verbose=False)
@@ -41,12 +50,19 @@ class PersonDetector:
             return None
         
         h, w = image.shape[:2]
-        results = self.detect(image)
-        persons = self.extract_persons(results)
-        centroids, confidences = self.get_centroids(persons)
+        
+        if self.service is not None:
+            # ultralytics' default confidence, which local detection uses too
+            boxes, scores = self.service.detect(image, conf=0.25)
+            centroids = [((x1 + x2) / 2, (y1 + y2) / 2) for x1, y1, x2, y2 in boxes.tolist()]
+            confidences = scores.tolist()
+        else:
+            results = self.detect(image)
+            persons = self.extract_persons(results)
+            centroids, confidences = self.get_centroids(persons)
         
         return {
-            'person_count': len(persons),
+            'person_count': len(centroids),
             'centroids': centroids,
             'confidences': confidences,
             'image_shape': (h, w),
@@ -0,0 +1,239 @@
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+
+# peak count, mean count, duration (s), peak deviation (%), hour of day (sin, cos)
+FEATURE_WEIGHTS = np.array([1.0, 1.0, 0.5, 1.0, 0.5, 0.5], dtype=np.float32)
+
+
+def hour_features(when):
+    angle = 2 * np.pi * (when.hour + when.minute / 60) / 24
+    return np.sin(angle), np.cos(angle)
+
+
+def episode_features(peak_count, mean_count, duration, peak_deviation, when):
+    hour_sin, hour_cos = hour_features(when)
+    return np.array(
+        [peak_count, mean_count, duration, peak_deviation, hour_sin, hour_cos],
+        dtype=np.float32
+    )
+
+
+def count_stats(counts):
+    counts = np.asarray(counts, dtype=np.float64)
+
+    if len(counts) == 0:
+        return {'frames': 0, 'sum': 0.0, 'sum_sq': 0.0, 'min': None, 'max': None}
+
+    return {
+        'frames': int(len(counts)),
+        'sum': float(counts.sum()),
+        'sum_sq': float((counts ** 2).sum()),
+        'min': float(counts.min()),
+        'max': float(counts.max())
+    }
+
+
+class EpisodeTracker:
+
+    def __init__(self, gap_seconds=2.0):
+        # Consecutive alert frames closer than gap_seconds belong to the same episode.
+        # Only per-episode running stats are kept, never the alerts themselves
+        self.gap_seconds = gap_seconds
+        self.closed = []
+        self.current = None
+
+    def add(self, timestamp, count):
+        if self.current is not None and timestamp - self.current['end'] > self.gap_seconds:
+            self.closed.append(self.current)
+            self.current = None
+
+        if self.current is None:
+            self.current = {'start': timestamp, 'end': timestamp, 'peak': count, 'sum': 0.0, 'frames': 0}
+
+        self.current['end'] = timestamp
+        self.current['peak'] = max(self.current['peak'], count)
+        self.current['sum'] += count
+        self.current['frames'] += 1
+
+    def episodes(self):
+        return self.closed + ([self.current] if self.current is not None else [])
+
+
+def build_episodes(alerts, gap_seconds=2.0):
+    tracker = EpisodeTracker(gap_seconds)
+    for alert in alerts:
+        tracker.add(alert['timestamp'], alert['count'])
+    return tracker.episodes()
+
+
+class EpisodeIndex:
+
+    def __init__(self, index_dir="data/episode_index", patterns_path="data/historical_patterns.json"):
+        self.index_dir = Path(index_dir)
+        self.patterns_path = Path(patterns_path)
+
+        self.features = np.zeros((0, len(FEATURE_WEIGHTS)), dtype=np.float32)
+        self.episodes = []
+        self.zones = {}
+
+        self.load()
+
+    def load(self):
+        features_path = self.index_dir / "features.npy"
+        episodes_path = self.index_dir / "episodes.json"
+
+        if features_path.exists() and episodes_path.exists():
+            self.features = np.load(features_path)
+            with open(episodes_path) as f:
+                self.episodes = json.load(f)
+
+        if self.patterns_path.exists() and self.patterns_path.stat().st_size > 0:
+            with open(self.patterns_path) as f:
+                self.zones = json.load(f).get("zones", {})
+
+    def save(self):
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        np.save(self.index_dir / "features.npy", self.features)
+
+        with open(self.index_dir / "episodes.json", 'w') as f:
+            json.dump(self.episodes, f)
+
+        self.patterns_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.patterns_path, 'w') as f:
+            json.dump({'zones': self.zones}, f, indent=2)
+
+    def add_episode(self, zone, episode, baseline, started_at):
+        start = episode['start']
+        end = episode['end']
+        peak = float(episode['peak'])
+        mean = episode['sum'] / episode['frames']
+        peak_deviation = (peak - baseline) / baseline * 100 if baseline else 0.0
+        when = started_at + timedelta(seconds=start)
+
+        vector = episode_features(peak, mean, end - start, peak_deviation, when)
+        self.features = np.vstack([self.features, vector[None, :]])
+
+        self.episodes.append({
+            'zone': zone,
+            'time': when.isoformat(timespec='seconds'),
+            'start': start,
+            'end': end,
+            'peak_count': peak,
+            'mean_count': float(mean),
+            'baseline': baseline,
+            'peak_deviation': peak_deviation,
+            'frames': episode['frames']
+        })
+
+    def update_zone(self, zone, counts, episode_count=0):
+        # Accepts raw counts or the running sums a long run keeps instead of every frame
+        if not isinstance(counts, dict):
+            counts = count_stats(counts)
+
+        # Running sums keep zone statistics mergeable across runs without old frames
+        stats = self.zones.setdefault(zone, {
+            'frames': 0, 'sum': 0.0, 'sum_sq': 0.0,
+            'min': None, 'max': None, 'episodes': 0, 'runs': 0
+        })
+        stats['episodes'] += episode_count
+        stats['runs'] += 1
+
+        if counts['frames'] == 0:
+            return
+
+        stats['frames'] += int(counts['frames'])
+        stats['sum'] += float(counts['sum'])
+        stats['sum_sq'] += float(counts['sum_sq'])
+        stats['min'] = float(counts['min']) if stats['min'] is None else min(stats['min'], float(counts['min']))
+        stats['max'] = float(counts['max']) if stats['max'] is None else max(stats['max'], float(counts['max']))
+
+    def zone_stats(self, zone):
+        stats = self.zones.get(zone)
+        if not stats or stats['frames'] == 0:
+            return None
+
+        mean = stats['sum'] / stats['frames']
+        variance = max(stats['sum_sq'] / stats['frames'] - mean ** 2, 0.0)
+
+        return {
+            'mean': mean,
+            'std': variance ** 0.5,
+            'min': stats['min'],
+            'max': stats['max'],
+            'frames': stats['frames'],
+            'episodes': stats['episodes'],
+            'runs': stats['runs']
+        }
+
+    def add_run(self, zone, episodes, counts, baseline, started_at=None):
+        # episodes as built by EpisodeTracker / build_episodes
+        started_at = started_at or datetime.now()
+        episodes = episodes if baseline else []
+
+        for episode in episodes:
+            self.add_episode(zone, episode, baseline, started_at)
+
+        self.update_zone(zone, counts, len(episodes))
+        return len(episodes)
+
+    def query(self, count, baseline, zone=None, when=None, k=3):
+        if len(self.episodes) == 0:
+            return []
+
+        when = when or datetime.now()
+        deviation = (count - baseline) / baseline * 100 if baseline else 0.0
+        target = episode_features(count, count, 0.0, deviation, when)
+
+        candidates = np.arange(len(self.episodes))
+        if zone is not None:
+            same_zone = np.array([e['zone'] == zone for e in self.episodes])
+            if same_zone.any():
+                candidates = candidates[same_zone]
+
+        # Standardise each feature so counts and percentages weigh comparably
+        scale = self.features.std(axis=0)
+        scale[scale == 0] = 1.0
+
+        diff = (self.features[candidates] - target) / scale * FEATURE_WEIGHTS
+        distances = np.sqrt((diff ** 2).sum(axis=1))
+
+        k = min(k, len(candidates))
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.argsort(distances[nearest])]
+
+        return [dict(self.episodes[candidates[i]], distance=float(distances[i])) for i in nearest]
+
+    def context_text(self, zone, count, baseline, when=None, k=3):
+        lines = []
+
+        stats = self.zone_stats(zone)
+        if stats is not None:
+            lines.append(
+                f"Zone history: mean {stats['mean']:.0f}, max {stats['max']:.0f} "
+                f"over {stats['runs']} runs, {stats['episodes']} past alert episodes"
+            )
+
+        for episode in self.query(count, baseline, zone=zone, when=when, k=k):
+            lines.append(
+                f"Similar episode {episode['time']}: peak {episode['peak_count']:.0f} "
+                f"({episode['peak_deviation']:+.0f}%) for {episode['end'] - episode['start']:.1f}s"
+            )
+
+        return "\n".join(lines)
+
+    def ingest_timeline(self, timeline_path, zone, started_at=None):
+        # One-off backfill from older alerts_timeline.json files
+        with open(timeline_path) as f:
+            data = json.load(f)
+
+        # Footage time when the timeline has it; older ones only know when they were processed
+        stamp = data.get('recorded_at') or data.get('processed')
+        if started_at is None and stamp:
+            started_at = datetime.fromisoformat(stamp)
+
+        # Old timelines only hold alert frames, so they add episodes but not count statistics
+        return self.add_run(zone, build_episodes(data.get('alerts', [])), [], data.get('baseline'), started_at)
@@ -0,0 +1,169 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(slots=True)
+class FlowSnapshot:
+    velocity: np.ndarray     # (grid, grid, 2) smoothed px/s per cell
+    crossings: dict          # line name -> {'in': n, 'out': n}, cumulative
+    mean_speed: float        # px/s over tracks matched to the previous frame
+    stationary_share: float
+    max_dwell_s: float
+    congested_cells: int
+
+    def to_record(self):
+        # JSON-friendly, for the alerts stream and the run summary
+        return {
+            'mean_speed': round(self.mean_speed, 2),
+            'stationary_share': round(self.stationary_share, 3),
+            'max_dwell_s': round(self.max_dwell_s, 2),
+            'congested_cells': self.congested_cells,
+            'crossings': self.crossings,
+            'velocity': np.round(self.velocity, 2).tolist()
+        }
+
+
+def cross(a, b):
+    return a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0]
+
+
+class FlowAnalyzer:
+
+    def __init__(self, frame_shape, fps=30.0, grid_size=5, lines=None, smoothing=0.2,
+                 stationary_speed=1.0, congestion_people=3):
+        h, w = frame_shape[:2]
+        self.h, self.w = max(h, 1), max(w, 1)
+        self.fps = fps or 30.0
+        self.grid_size = grid_size
+        self.smoothing = smoothing
+        # px/frame below which a track counts as standing still
+        self.stationary_speed = stationary_speed
+        self.congestion_people = congestion_people
+
+        # Counting lines as {'name', 'start': (x, y), 'end': (x, y)} in pixels.
+        # 'in' is a crossing onto the side where cross(end - start, p - start) > 0; swap start/end to flip
+        lines = lines or []
+        self.line_names = [line.get('name', f"line_{i}") for i, line in enumerate(lines)]
+        self.starts = np.array([line['start'] for line in lines], dtype=np.float64).reshape(-1, 2)
+        self.ends = np.array([line['end'] for line in lines], dtype=np.float64).reshape(-1, 2)
+        self.crossings = np.zeros((len(lines), 2), dtype=np.int64)
+
+        self.velocity = np.zeros((grid_size * grid_size, 2))
+
+        # Previous frame's tracks, as aligned arrays
+        self.prev_ids = np.zeros(0, dtype=np.int64)
+        self.prev_points = np.zeros((0, 2))
+        self.prev_still = np.zeros(0, dtype=np.int64)
+
+        # Run-level aggregates for summary()
+        self.frames = 0
+        self.speed_total = 0.0
+        self.peak_dwell_s = 0.0
+        self.peak_congested = 0
+        self.last = None
+
+    def cells(self, points):
+        g = self.grid_size
+        cx = np.clip((points[:, 0] / self.w * g).astype(np.int64), 0, g - 1)
+        cy = np.clip((points[:, 1] / self.h * g).astype(np.int64), 0, g - 1)
+        return cy * g + cx
+
+    def count_crossings(self, p0, p1):
+        if len(self.line_names) == 0 or len(p0) == 0:
+            return
+
+        # (tracks, lines): the step p0 -> p1 and the line segment must straddle each other
+        direction = (self.ends - self.starts)[None]
+        side0 = cross(direction, p0[:, None] - self.starts[None])
+        side1 = cross(direction, p1[:, None] - self.starts[None])
+
+        step = (p1 - p0)[:, None]
+        end0 = cross(step, self.starts[None] - p0[:, None])
+        end1 = cross(step, self.ends[None] - p0[:, None])
+
+        # Points exactly on the line count as the 'out' side, so touching it then moving on counts once
+        inward_side0 = side0 > 0
+        inward_side1 = side1 > 0
+        crossed = (inward_side0 != inward_side1) & (end0 * end1 <= 0)
+        inward = crossed & inward_side1
+
+        self.crossings[:, 0] += inward.sum(axis=0)
+        self.crossings[:, 1] += (crossed & ~inward).sum(axis=0)
+
+    def update(self, tracks, frames=1):
+        # frames: video frames since the previous update, when reused detections were skipped
+        n_cells = self.grid_size * self.grid_size
+        frames = max(frames, 1)
+
+        ids = np.fromiter(tracks.keys(), dtype=np.int64, count=len(tracks))
+        points = np.asarray(list(tracks.values()), dtype=np.float64).reshape(-1, 2)
+
+        # Tracks present in both frames give one displacement each
+        _, cur, prev = np.intersect1d(ids, self.prev_ids, assume_unique=True, return_indices=True)
+        p0 = self.prev_points[prev]
+        p1 = points[cur]
+        delta = (p1 - p0) / frames
+        speed = np.hypot(delta[:, 0], delta[:, 1])
+
+        if len(cur):
+            cells = self.cells(p1)
+            counts = np.bincount(cells, minlength=n_cells)
+            sums = np.column_stack([
+                np.bincount(cells, weights=delta[:, 0], minlength=n_cells),
+                np.bincount(cells, weights=delta[:, 1], minlength=n_cells)
+            ])
+            # Cells with movement this frame pull their smoothed vector toward the new mean
+            moving = counts > 0
+            frame_velocity = sums[moving] / counts[moving, None] * self.fps
+            self.velocity[moving] += self.smoothing * (frame_velocity - self.velocity[moving])
+
+        self.count_crossings(p0, p1)
+
+        # Consecutive slow frames per track; new tracks start at zero
+        still = np.zeros(len(ids), dtype=np.int64)
+        still[cur] = np.where(speed < self.stationary_speed, self.prev_still[prev] + frames, 0)
+
+        self.prev_ids = ids
+        self.prev_points = points
+        self.prev_still = still
+
+        # Congested: enough people in a cell and most of them standing still
+        occupied = self.cells(points)
+        occupancy = np.bincount(occupied, minlength=n_cells)
+        stationary = np.bincount(occupied, weights=(still > 0).astype(np.float64), minlength=n_cells)
+        congested = (occupancy >= self.congestion_people) & (stationary * 2 >= occupancy)
+
+        snapshot = FlowSnapshot(
+            velocity=self.velocity.reshape(self.grid_size, self.grid_size, 2).copy(),
+            crossings=self.crossing_counts(),
+            mean_speed=float(speed.mean() * self.fps) if len(speed) else 0.0,
+            stationary_share=float((still[cur] > 0).mean()) if len(cur) else 0.0,
+            max_dwell_s=float(still.max() / self.fps) if len(still) else 0.0,
+            congested_cells=int(congested.sum())
+        )
+
+        self.frames += 1
+        self.speed_total += snapshot.mean_speed
+        self.peak_dwell_s = max(self.peak_dwell_s, snapshot.max_dwell_s)
+        self.peak_congested = max(self.peak_congested, snapshot.congested_cells)
+        self.last = snapshot
+
+        return snapshot
+
+    def summary(self):
+        # The latest snapshot plus whole-run aggregates
+        latest = self.last.to_record() if self.last is not None else {'crossings': self.crossing_counts()}
+        return {
+            **latest,
+            'frames': self.frames,
+            'avg_speed': round(self.speed_total / self.frames, 2) if self.frames else 0.0,
+            'peak_dwell_s': round(self.peak_dwell_s, 2),
+            'peak_congested_cells': self.peak_congested
+        }
+
+    def crossing_counts(self):
+        return {
+            name: {'in': int(counts[0]), 'out': int(counts[1])}
+            for name, counts in zip(self.line_names, self.crossings)
+        }
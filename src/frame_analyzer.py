@@ -1,40 +1,86 @@
-import cv2
-from ultralytics import YOLO
+import threading
+
 import numpy as np
 
+from src.frame_record import Detection
+
 
 class FrameAnalyzer:
-    def __init__(self, model_name="yolov8l.pt"):
-        self.model = YOLO(model_name)
+    def __init__(self, model_name="yolov8l.pt", motion_gate=None, service=None):
+        self.model_name = model_name
+        # A DetectionClient; when set, the model lives in the shared detection service instead
+        self.service = service
         self.person_class = 0
+        self.motion_gate = motion_gate
+        self.last_result = None
+        
+        # Live quality knobs, see configure()
+        self.imgsz = 640
+        self.conf = 0.1
+        self.stride = 1
+        self.since_detect = 0
+        
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._warmup_thread = None
+    
+    @property
+    def model(self):
+        # ultralytics pulls in torch, so it is only imported once a frame needs it
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from ultralytics import YOLO
+                    self._model = YOLO(self.model_name)
+        return self._model
+    
+    def warmup(self, background=False, imgsz=640):
+        if background:
+            if self._warmup_thread is None:
+                self._warmup_thread = threading.Thread(target=self.warmup, kwargs={'imgsz': imgsz}, daemon=True)
+                self._warmup_thread.start()
+            return self._warmup_thread
+        
+        if self.service is not None:
+            self.service.connect()
+            return None
+        
+        # One dummy inference pays for weight loading and first-call setup up front
+        self.model(np.zeros((imgsz, imgsz, 3), dtype=np.uint8), verbose=False)
+        return None
+    
+    def configure(self, imgsz=None, conf=None, stride=None):
+        if imgsz is not None:
+            self.imgsz = imgsz
+        if conf is not None:
+            self.conf = conf
+        if stride is not None:
+            self.stride = max(int(stride), 1)
+    
+    def wait_for_warmup(self):
+        # A background warmup runs on the same predictor; it is not safe to share mid-call
+        thread = self._warmup_thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+            self._warmup_thread = None
     
     def detect_frame(self, frame):
-        results = self.model(frame, verbose=False, conf=0.1)
+        self.wait_for_warmup()
+        results = self.model(frame, verbose=False, conf=self.conf, imgsz=self.imgsz)
         return results[0]
     
-    def extract_persons(self, detection_result):
-        persons = []
-        for box in detection_result.boxes:
-            if int(box.cls[0]) == self.person_class:
-                persons.append(box)
-        return persons
-    
-    def get_centroids(self, persons):
-        centroids = []
-        confidences = []
-        bboxes = []
-        
-        for person in persons:
-            x1, y1, x2, y2 = person.xyxy[0].cpu().numpy()
-            cx = (x1 + x2) / 2
-            cy = (y1 + y2) / 2
-            conf = float(person.conf[0])
-            
-            centroids.append((cx, cy))
-            confidences.append(conf)
-            bboxes.append((int(x1), int(y1), int(x2), int(y2)))
-        
-        return centroids, confidences, bboxes
+    def detect_persons(self, frame):
+        if self.service is not None:
+            return self.service.detect(frame, conf=self.conf)
+        return self.person_arrays(self.detect_frame(frame))
+    
+    def person_arrays(self, detection_result):
+        # Pull boxes off the device once as arrays; the Box objects are not kept
+        boxes = detection_result.boxes
+        xyxy = boxes.xyxy.cpu().numpy()
+        confidences = boxes.conf.cpu().numpy()
+        keep = boxes.cls.cpu().numpy().astype(int) == self.person_class
+        return xyxy[keep], confidences[keep]
     
     def analyze_frame(self, frame, frame_idx=0, timestamp=0.0):
         if frame is None:
@@ -42,21 +88,22 @@ class FrameAnalyzer:
         
         h, w = frame.shape[:2]
         
-        detection_result = self.detect_frame(frame)
-        persons = self.extract_persons(detection_result)
-        centroids, confidences, bboxes = self.get_centroids(persons)
-        
-        person_count = len(persons)
-        avg_confidence = sum(confidences) / len(confidences) if confidences else 0.0
-        
-        return {
-            'frame_idx': frame_idx,
-            'timestamp': timestamp,
-            'person_count': person_count,
-            'centroids': centroids,
-            'confidences': confidences,
-            'bboxes': bboxes,
-            'avg_confidence': avg_confidence,
-            'frame_shape': (h, w),
-            'raw_detections': persons
-        }
\ No newline at end of file
+        # Detection stride: in between, the last detections stand in
+        self.since_detect += 1
+        if self.stride > 1 and self.since_detect < self.stride and self.last_result is not None:
+            if self.last_result.frame_shape == (h, w):
+                return self.last_result.at(frame_idx, timestamp, reused=True)
+        
+        # Static scene: reuse the previous detections instead of running the model
+        if self.motion_gate is not None and not self.motion_gate.should_detect(frame):
+            if self.last_result is not None and self.last_result.frame_shape == (h, w):
+                self.motion_gate.record_skip()
+                return self.last_result.at(frame_idx, timestamp, reused=True)
+            self.motion_gate.reset()
+        
+        boxes, confidences = self.detect_persons(frame)
+        self.since_detect = 0
+        
+        self.last_result = Detection.from_boxes(boxes, confidences, (h, w), frame_idx=frame_idx, timestamp=timestamp)
+        
+        return self.last_result
@@ -0,0 +1,111 @@
+import numpy as np
+import multiprocessing
+from multiprocessing import shared_memory
+
+
+def _attach(name):
+    # Attaching processes must not register the block with their resource
+    # tracker, otherwise it gets unlinked when the first of them exits
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedFrameBuffer:
+
+    def __init__(self, slots, frame_shape, dtype=np.uint8, ctx=None):
+        ctx = ctx or multiprocessing.get_context("spawn")
+
+        self.slots = slots
+        self.frame_shape = tuple(frame_shape)
+        self.dtype = np.dtype(dtype)
+        self.slot_bytes = int(np.prod(self.frame_shape)) * self.dtype.itemsize
+
+        self.frames_shm = shared_memory.SharedMemory(create=True, size=self.slot_bytes * slots)
+        self.owned_shm = shared_memory.SharedMemory(create=True, size=np.dtype(np.int32).itemsize * slots)
+        self.owner = True
+
+        self.lock = ctx.Lock()
+        self.free_slots = ctx.Queue()
+
+        self._map_arrays()
+        self.owned[:] = 0
+
+        for slot in range(slots):
+            self.free_slots.put(slot)
+
+    def _map_arrays(self):
+        self.frames = np.ndarray(
+            (self.slots,) + self.frame_shape,
+            dtype=self.dtype,
+            buffer=self.frames_shm.buf
+        )
+        self.owned = np.ndarray((self.slots,), dtype=np.int32, buffer=self.owned_shm.buf)
+
+    def __getstate__(self):
+        # Only names and sync primitives travel to child processes, never pixels
+        return {
+            'slots': self.slots,
+            'frame_shape': self.frame_shape,
+            'dtype': self.dtype.str,
+            'slot_bytes': self.slot_bytes,
+            'frames_name': self.frames_shm.name,
+            'owned_name': self.owned_shm.name,
+            'lock': self.lock,
+            'free_slots': self.free_slots
+        }
+
+    def __setstate__(self, state):
+        self.slots = state['slots']
+        self.frame_shape = state['frame_shape']
+        self.dtype = np.dtype(state['dtype'])
+        self.slot_bytes = state['slot_bytes']
+        self.lock = state['lock']
+        self.free_slots = state['free_slots']
+
+        self.frames_shm = _attach(state['frames_name'])
+        self.owned_shm = _attach(state['owned_name'])
+        self.owner = False
+
+        self._map_arrays()
+
+    def acquire(self, timeout=None):
+        # Blocks while every slot is in flight, which throttles the producer
+        slot = self.free_slots.get(timeout=timeout)
+        with self.lock:
+            self.owned[slot] = 1
+        return slot
+
+    def release(self, slot):
+        # Each slot has a single owner at a time: decoder, then inference, then the encoder.
+        # No reference counts: the one consumer that keeps frames past write() is the clip
+        # pre-roll ring, and letting it hold slots would pin pre_roll * fps of them (30 at
+        # 30 fps, more than the default pool), stalling the decoder unless the pool grows by
+        # as much memory as the copies take. ClipOutput copies those frames instead; full
+        # and preview outputs write straight from the slot
+        with self.lock:
+            if not self.owned[slot]:
+                raise ValueError(f"Slot {slot} released more times than acquired")
+            self.owned[slot] = 0
+
+        self.free_slots.put(slot)
+
+    def view(self, slot):
+        # Zero-copy view into shared memory; valid until the slot is released
+        return self.frames[slot]
+
+    def in_use(self):
+        with self.lock:
+            return int(np.count_nonzero(self.owned))
+
+    def close(self):
+        self.frames = None
+        self.owned = None
+        self.frames_shm.close()
+        self.owned_shm.close()
+
+    def unlink(self):
+        if self.owner:
+            self.frames_shm.unlink()
+            self.owned_shm.unlink()
@@ -0,0 +1,70 @@
+from dataclasses import dataclass, replace
+
+import numpy as np
+
+
+EMPTY_BOXES = np.zeros((0, 4), dtype=np.float32)
+EMPTY_SCORES = np.zeros(0, dtype=np.float32)
+
+
+@dataclass(slots=True)
+class Detection:
+    # Plain contiguous arrays only, so a detection pickles cheaply and holds no model tensors
+    frame_idx: int
+    timestamp: float
+    person_count: int
+    boxes: np.ndarray        # (N, 4) float32, xyxy
+    confidences: np.ndarray  # (N,) float32
+    centroids: np.ndarray    # (N, 2) float32
+    avg_confidence: float
+    frame_shape: tuple
+    density_map: np.ndarray = None
+    count_estimate: float = None
+    reused: bool = False
+
+    @classmethod
+    def from_boxes(cls, boxes, confidences, frame_shape, frame_idx=0, timestamp=0.0):
+        boxes = np.ascontiguousarray(boxes, dtype=np.float32).reshape(-1, 4)
+        confidences = np.ascontiguousarray(confidences, dtype=np.float32).reshape(-1)
+        centroids = np.ascontiguousarray((boxes[:, :2] + boxes[:, 2:]) / 2)
+
+        return cls(
+            frame_idx=frame_idx,
+            timestamp=timestamp,
+            person_count=len(boxes),
+            boxes=boxes,
+            confidences=confidences,
+            centroids=centroids,
+            avg_confidence=float(confidences.mean()) if len(confidences) else 0.0,
+            frame_shape=tuple(frame_shape)
+        )
+
+    @property
+    def bboxes(self):
+        return self.boxes.astype(np.int32)
+
+    def at(self, frame_idx, timestamp, **changes):
+        # Arrays are shared, not copied; records are treated as immutable once built
+        return replace(self, frame_idx=frame_idx, timestamp=timestamp, **changes)
+
+
+@dataclass(slots=True)
+class FrameResult:
+    detection: Detection
+    density_level: str
+    z_score: float
+    pattern: dict = None
+    llm: str = None
+    tracks: dict = None
+    spatial_map: np.ndarray = None
+    hot_cells: int = None
+    max_local_density: float = None
+    flow: object = None
+
+    @property
+    def person_count(self):
+        return self.detection.person_count
+
+    @property
+    def timestamp(self):
+        return self.detection.timestamp
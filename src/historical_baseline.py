@@ -1,19 +1,43 @@
 class HistoricalBaseline:
-    def __init__(self):
+    def __init__(self, baseline_frames=30):
         self.baseline = None
         self.peak = None
+        self.baseline_frames = baseline_frames
+        # Only the frames the baseline is built from are kept; later counts go into running stats
         self.history = []
+        
+        self.frames = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.min = None
+        self.max = None
     
     def add_frame_data(self, person_count):
-        self.history.append(person_count)
+        if len(self.history) < self.baseline_frames:
+            self.history.append(person_count)
+        
+        self.frames += 1
+        self.total += person_count
+        self.total_sq += person_count * person_count
+        self.min = person_count if self.min is None else min(self.min, person_count)
+        self.max = person_count if self.max is None else max(self.max, person_count)
     
     def establish_baseline(self, first_n_frames=30):
-        if len(self.history) >= first_n_frames:
+        if first_n_frames <= len(self.history):
             self.baseline = sum(self.history[:first_n_frames]) / first_n_frames
-            self.peak = max(self.history)
+            self.peak = max(self.history[:first_n_frames])
             return True
         return False
     
+    def count_stats(self):
+        return {
+            'frames': self.frames,
+            'sum': self.total,
+            'sum_sq': self.total_sq,
+            'min': self.min,
+            'max': self.max
+        }
+    
     def get_pattern(self, current_count):
         if self.baseline is None:
             return None
@@ -26,4 +50,4 @@ class HistoricalBaseline:
             "current_people": current_count,
             "deviation_percent": deviation,
             "baseline_source": "first 30 frames of video"
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,148 @@
+from collections import deque
+
+
+# Quality ladder, best first. Each step trades some accuracy or polish for per-frame time.
+# Polish and stride go first: they keep counts comparable with the baseline. Input size and
+# confidence, which lower counts, only change once those are used up
+QUALITY_LEVELS = (
+    {'imgsz': 640, 'conf': 0.10, 'stride': 1, 'heatmap_scale': 1.0, 'overlay': True},
+    {'imgsz': 640, 'conf': 0.10, 'stride': 1, 'heatmap_scale': 0.5, 'overlay': True},
+    {'imgsz': 640, 'conf': 0.10, 'stride': 2, 'heatmap_scale': 0.25, 'overlay': True},
+    {'imgsz': 640, 'conf': 0.10, 'stride': 3, 'heatmap_scale': 0.25, 'overlay': False},
+    {'imgsz': 512, 'conf': 0.15, 'stride': 3, 'heatmap_scale': 0.25, 'overlay': False},
+    {'imgsz': 416, 'conf': 0.20, 'stride': 4, 'heatmap_scale': 0.25, 'overlay': False},
+    {'imgsz': 320, 'conf': 0.25, 'stride': 4, 'heatmap_scale': 0.25, 'overlay': False},
+)
+
+
+def counts_comparable(levels, level):
+    # Smaller inputs and higher thresholds find fewer people, so counts only compare
+    # with the level-0 baseline and peak when the detector knobs are unchanged
+    return all(levels[level][knob] == levels[0][knob] for knob in ('imgsz', 'conf'))
+
+
+class LatencyController:
+
+    def __init__(self, fps, target_ms=None, realtime_factor=1.0, levels=QUALITY_LEVELS,
+                 smoothing=0.1, degrade_after=5, recover_after=60, headroom=0.7, max_level=None):
+        # Per-frame budget: explicit, or whatever keeps up with the video at realtime_factor
+        self.budget_ms = target_ms or 1000.0 / ((fps or 30.0) * realtime_factor)
+        self.levels = levels
+        self.smoothing = smoothing
+        # Lowest level the controller may reach; cap it where counts stop being comparable
+        # to keep the alert threshold meaningful at the cost of falling behind
+        self.max_level = len(levels) - 1 if max_level is None else min(max_level, len(levels) - 1)
+
+        # Hysteresis: step down quickly when over budget, step up only after a long
+        # stretch comfortably under it, so the level does not oscillate
+        self.degrade_after = degrade_after
+        self.recover_after = recover_after
+        self.headroom = headroom
+
+        self.level = 0
+        self.latency_ms = None
+        self.over = 0
+        self.under = 0
+
+        self.frames = 0
+        self.over_budget = 0
+        self.frames_per_level = [0] * len(levels)
+        self.count_per_level = [0] * len(levels)
+        self.records_per_level = [0] * len(levels)
+        self.alerts_per_level = [0] * len(levels)
+        self.adjustments = deque(maxlen=100)
+        self.adjustment_count = 0
+
+    @property
+    def settings(self):
+        return self.levels[self.level]
+
+    @property
+    def comparable(self):
+        return counts_comparable(self.levels, self.level)
+
+    def observe(self, elapsed_ms, frame_idx):
+        self.frames += 1
+        self.frames_per_level[self.level] += 1
+        if elapsed_ms > self.budget_ms:
+            self.over_budget += 1
+
+        if self.latency_ms is None:
+            self.latency_ms = elapsed_ms
+        else:
+            self.latency_ms += self.smoothing * (elapsed_ms - self.latency_ms)
+
+        if self.latency_ms > self.budget_ms:
+            self.over += 1
+            self.under = 0
+        elif self.latency_ms < self.budget_ms * self.headroom:
+            self.under += 1
+            self.over = 0
+        else:
+            self.over = 0
+            self.under = 0
+
+        if self.over >= self.degrade_after and self.level < self.max_level:
+            return self.step(+1, frame_idx)
+        if self.under >= self.recover_after and self.level > 0:
+            return self.step(-1, frame_idx)
+        return None
+
+    def step(self, direction, frame_idx):
+        previous = self.level
+        self.level += direction
+        self.over = 0
+        self.under = 0
+        latency_ms = self.latency_ms
+        # The average so far describes the old level; the new one is judged on its own frames only,
+        # otherwise a lagging average keeps stepping down past the level that already fits
+        self.latency_ms = None
+
+        adjustment = {
+            'frame': frame_idx,
+            'from': previous,
+            'to': self.level,
+            'latency_ms': round(latency_ms, 2),
+            'budget_ms': round(self.budget_ms, 2),
+            'settings': dict(self.settings),
+            'counts_comparable': self.comparable
+        }
+        self.adjustments.append(adjustment)
+        self.adjustment_count += 1
+        return adjustment
+
+    def record(self, person_count, is_alert):
+        # Per-level count totals make a drop in counts (and alerts) after degrading visible
+        self.count_per_level[self.level] += person_count
+        self.records_per_level[self.level] += 1
+        self.alerts_per_level[self.level] += int(is_alert)
+
+    def apply(self, analyzer, output):
+        settings = self.settings
+
+        if hasattr(analyzer, 'configure'):
+            analyzer.configure(imgsz=settings['imgsz'], conf=settings['conf'], stride=settings['stride'])
+
+        overlay = getattr(output, 'overlay', None)
+        if overlay is not None:
+            overlay.enabled = settings['overlay']
+            overlay.heatmap_scale = settings['heatmap_scale']
+
+    def metrics(self):
+        return {
+            'budget_ms': self.budget_ms,
+            'latency_ms': self.latency_ms,
+            'level': self.level,
+            'frames': self.frames,
+            'over_budget': self.over_budget,
+            'max_level': self.max_level,
+            'frames_per_level': list(self.frames_per_level),
+            'mean_count_per_level': [
+                round(total / frames, 2) if frames else None
+                for total, frames in zip(self.count_per_level, self.records_per_level)
+            ],
+            'alerts_per_level': list(self.alerts_per_level),
+            'comparable_levels': [counts_comparable(self.levels, level) for level in range(len(self.levels))],
+            'adjustments': self.adjustment_count,
+            'recent_adjustments': list(self.adjustments)
+        }
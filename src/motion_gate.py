@@ -0,0 +1,71 @@
+import cv2
+import numpy as np
+
+
+class MotionGate:
+
+    def __init__(self, threshold=0.01, pixel_delta=15, scale_width=160, refresh_every=50):
+        # threshold: fraction of downscaled pixels that must change to rerun detection
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.scale_width = scale_width
+        self.refresh_every = refresh_every
+
+        self.reference = None
+        self.frames_since_refresh = 0
+        self.total_frames = 0
+        self.skipped_frames = 0
+        self.last_change = 0.0
+
+    def downscale(self, frame):
+        h, w = frame.shape[:2]
+        scale_height = max(int(h * self.scale_width / w), 1)
+        small = cv2.resize(frame, (self.scale_width, scale_height), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def change_ratio(self, small):
+        diff = cv2.absdiff(small, self.reference)
+        return float(np.count_nonzero(diff > self.pixel_delta)) / diff.size
+
+    def should_detect(self, frame):
+        self.total_frames += 1
+        small = self.downscale(frame)
+
+        if self.reference is None or self.reference.shape != small.shape:
+            changed = True
+            self.last_change = 1.0
+        elif self.frames_since_refresh + 1 >= self.refresh_every:
+            # Force a refresh so slow drift never goes undetected for long
+            changed = True
+            self.last_change = self.change_ratio(small)
+        else:
+            self.last_change = self.change_ratio(small)
+            changed = self.last_change >= self.threshold
+
+        if changed:
+            # Compare against the frame detection last ran on, not the previous frame,
+            # so gradual changes still accumulate past the threshold
+            self.reference = small
+            self.frames_since_refresh = 0
+        else:
+            self.frames_since_refresh += 1
+
+        return changed
+
+    def record_skip(self):
+        # Called by the analyzer only when a cached result actually stood in for detection
+        self.skipped_frames += 1
+
+    def reset(self):
+        self.reference = None
+        self.frames_since_refresh = 0
+
+    def metrics(self):
+        skip_rate = self.skipped_frames / self.total_frames if self.total_frames else 0.0
+        return {
+            'frames': self.total_frames,
+            'detected': self.total_frames - self.skipped_frames,
+            'skipped': self.skipped_frames,
+            'skip_rate': skip_rate
+        }
@@ -0,0 +1,187 @@
+import cv2
+import os
+import shutil
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from src.frame_analyzer import FrameAnalyzer
+from src.video_processor import VideoProcessor
+
+
+# One analyzer per worker process, loaded once by the pool initializer
+_worker_analyzer = None
+
+
+def _init_worker(model_name, threads_per_worker, service=None):
+    global _worker_analyzer
+
+    # Keep workers from oversubscribing the cores between them
+    cv2.setNumThreads(1)
+    try:
+        import torch
+        torch.set_num_threads(threads_per_worker)
+    except ImportError:
+        pass
+
+    _worker_analyzer = FrameAnalyzer(model_name, service=service)
+    _worker_analyzer.warmup()
+
+
+def _process_segment(args):
+    video_path, start, end, fps = args
+
+    cap = cv2.VideoCapture(video_path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+
+    detections = []
+    frame_idx = start
+
+    while end is None or frame_idx < end:
+        ret, frame = cap.read()
+
+        if not ret:
+            break
+
+        try:
+            detection = _worker_analyzer.analyze_frame(frame, frame_idx=frame_idx, timestamp=frame_idx / fps)
+        except Exception as e:
+            print(f"Error processing frame {frame_idx}: {e}")
+            detection = None
+
+        detections.append(detection)
+        frame_idx += 1
+
+    cap.release()
+    return start, detections
+
+
+def find_keyframes(video_path, fps):
+    if shutil.which("ffprobe") is None:
+        return []
+
+    cmd = [
+        "ffprobe", "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0",
+        str(video_path)
+    ]
+
+    try:
+        output = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return []
+
+    keyframes = []
+    for line in output.splitlines():
+        parts = line.strip().split(",")
+        if len(parts) < 2 or "K" not in parts[1]:
+            continue
+        try:
+            keyframes.append(int(round(float(parts[0]) * fps)))
+        except ValueError:
+            continue
+
+    return sorted(set(keyframes))
+
+
+def split_segments(frame_count, target_length, keyframes=None):
+    if frame_count <= 0 or target_length <= 0:
+        return [(0, None)]
+
+    keyframes = sorted(keyframes or [])
+    starts = [0]
+    next_cut = target_length
+
+    while next_cut < frame_count:
+        # Snap each cut forward to the next keyframe so segments seek cleanly
+        if keyframes:
+            cut = next((k for k in keyframes if k >= next_cut), None)
+            if cut is None or cut >= frame_count:
+                break
+        else:
+            cut = next_cut
+
+        if cut > starts[-1]:
+            starts.append(cut)
+        next_cut = cut + target_length
+
+    segments = []
+    for i, start in enumerate(starts):
+        end = starts[i + 1] if i + 1 < len(starts) else None
+        segments.append((start, end))
+
+    return segments
+
+
+class OfflineVideoProcessor(VideoProcessor):
+    # Alerts-only batch mode: writes alerts_timeline.json and the streams but no annotated
+    # video, and only alert frames get a summary (non-alert ones were never kept anyway)
+    load_model = False
+
+    def __init__(self, video_path, output_dir="results", workers=None,
+                 segment_seconds=30, model_name="yolov8l.pt", index=None, service=None,
+                 counting_lines=None, rollups=None, recorded_at=None):
+        super().__init__(video_path, output_dir=output_dir, index=index, counting_lines=counting_lines,
+                         rollups=rollups, recorded_at=recorded_at)
+        self.cap.release()
+
+        self.workers = workers or os.cpu_count() or 1
+        self.segment_seconds = segment_seconds
+        self.model_name = model_name
+        # With a DetectionClient, workers send frames to one shared model instead of loading their own
+        self.service = service
+
+    def plan_segments(self):
+        target_length = max(int(self.segment_seconds * self.fps), 1)
+        keyframes = find_keyframes(self.video_path, self.fps)
+        segments = split_segments(self.frame_count, target_length, keyframes)
+
+        print(f"Segments: {len(segments)} ({'keyframe-aligned' if keyframes else 'fixed-length'})")
+        return segments
+
+    def detect_all(self):
+        segments = self.plan_segments()
+        workers = min(self.workers, len(segments))
+        threads_per_worker = max((os.cpu_count() or 1) // workers, 1)
+
+        tasks = [(str(self.video_path), start, end, self.fps) for start, end in segments]
+
+        print(f"Detecting with {workers} workers...")
+
+        # spawn keeps each worker's torch/decoder state independent of the parent
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(self.model_name, threads_per_worker, self.service)
+        ) as pool:
+            # map() yields in submission order, so concatenation restores the timeline
+            for start, detections in pool.map(_process_segment, tasks):
+                for offset, detection in enumerate(detections):
+                    yield start + offset, detection
+
+    def process_video(self, location="Shibuya Crossing"):
+        alerts_path = self.output_dir / "alerts_timeline.json"
+
+        self.open_stream()
+
+        print("Processing frames (offline)...")
+
+        # Stateful stages replay sequentially over the stitched timeline
+        for frame_idx, detection in self.detect_all():
+            if detection is None:
+                continue
+
+            timestamp = frame_idx / self.fps
+            result = self.rag.process_detection(detection, location, timestamp, summarize=False)
+            self.update_state(frame_idx, timestamp, result, location)
+
+            self.print_progress(frame_idx)
+
+        print("Done!")
+
+        print("Offline mode: no annotated video written")
+        self.save_summary(alerts_path, location, extra={'mode': 'offline', 'video': None})
+
+        return None, str(alerts_path)
@@ -0,0 +1,234 @@
+import cv2
+import queue
+import multiprocessing
+
+import numpy as np
+
+from src.frame_analyzer import FrameAnalyzer
+from src.frame_buffer import SharedFrameBuffer
+from src.video_processor import VideoProcessor
+
+
+def _put(target_queue, item, stop):
+    # Bounded waits, so a full queue whose consumer died cannot block past stop
+    while True:
+        try:
+            target_queue.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            if stop.is_set():
+                return False
+
+
+def _decode_worker(video_path, buffer, infer_queue, infer_workers, stop):
+    cap = cv2.VideoCapture(video_path)
+    frame_idx = 0
+
+    while not stop.is_set():
+        # Bounded waits, so a coordinator that gave up (and will never release slots) can stop us
+        try:
+            slot = buffer.acquire(timeout=0.5)
+        except queue.Empty:
+            continue
+
+        # Decode straight into the shared slot instead of a fresh array
+        view = buffer.view(slot)
+        ret, frame = cap.read(view)
+
+        if not ret:
+            buffer.release(slot)
+            break
+
+        # OpenCV allocates a new array when it cannot decode into `view`; the slot would keep stale pixels
+        if not np.shares_memory(frame, view):
+            if frame.shape != view.shape:
+                raise ValueError(f"Decoded frame {frame.shape} does not fit the shared slot {view.shape} "
+                                 f"(rotated source, or container dimensions that differ from the stream)")
+            np.copyto(view, frame)
+
+        if not _put(infer_queue, (frame_idx, slot), stop):
+            break
+        frame_idx += 1
+
+    cap.release()
+
+    for _ in range(infer_workers):
+        _put(infer_queue, None, stop)
+
+
+def _infer_worker(model_name, fps, buffer, infer_queue, result_queue, service=None):
+    cv2.setNumThreads(1)
+    analyzer = FrameAnalyzer(model_name, service=service)
+    analyzer.warmup()
+
+    while True:
+        item = infer_queue.get()
+
+        if item is None:
+            result_queue.put(None)
+            break
+
+        frame_idx, slot = item
+
+        try:
+            detection = analyzer.analyze_frame(buffer.view(slot), frame_idx=frame_idx, timestamp=frame_idx / fps)
+        except Exception as e:
+            print(f"Error processing frame {frame_idx}: {e}")
+            detection = None
+
+        result_queue.put((frame_idx, slot, detection))
+
+
+def _encode_worker(make_output, buffer, encode_queue, metrics_queue):
+    output = make_output()
+
+    while True:
+        item = encode_queue.get()
+
+        if item is None:
+            break
+
+        frame_idx, slot, detection, is_alert = item
+        output.write(buffer.view(slot), detection, is_alert, frame_idx)
+        buffer.release(slot)
+
+    output.close()
+    metrics_queue.put(output.metrics())
+
+
+class PipelinedVideoProcessor(VideoProcessor):
+    load_model = False
+
+    def __init__(self, video_path, output_dir="results", infer_workers=2,
+                 slots=16, model_name="yolov8l.pt", index=None,
+                 output_mode="full", output_options=None, service=None, counting_lines=None,
+                 rollups=None, recorded_at=None):
+        super().__init__(
+            video_path,
+            output_dir=output_dir,
+            index=index,
+            output_mode=output_mode,
+            output_options=output_options,
+            counting_lines=counting_lines,
+            rollups=rollups,
+            recorded_at=recorded_at
+        )
+        self.cap.release()
+
+        self.infer_workers = infer_workers
+        self.slots = max(slots, infer_workers + 2)
+        self.model_name = model_name
+        # With a DetectionClient, workers send frames to one shared model instead of loading their own
+        self.service = service
+
+    def process_video(self, location="Shibuya Crossing"):
+        alerts_path = self.output_dir / "alerts_timeline.json"
+
+        ctx = multiprocessing.get_context("spawn")
+        buffer = SharedFrameBuffer(self.slots, (self.height, self.width, 3), ctx=ctx)
+
+        infer_queue = ctx.Queue(maxsize=self.slots)
+        result_queue = ctx.Queue()
+        encode_queue = ctx.Queue()
+        metrics_queue = ctx.Queue()
+
+        stop = ctx.Event()
+
+        processes = [
+            ctx.Process(
+                target=_decode_worker,
+                args=(str(self.video_path), buffer, infer_queue, self.infer_workers, stop),
+                name="decoder"
+            ),
+            # Slots are recycled after release, so any output that holds frames must copy them.
+            # Only clip mode does (its pre-roll ring); see SharedFrameBuffer.release for why
+            # the ring copies rather than holding slots
+            ctx.Process(
+                target=_encode_worker,
+                args=(self.output_factory(copy_frames=True), buffer, encode_queue, metrics_queue),
+                name="encoder"
+            )
+        ]
+        for i in range(self.infer_workers):
+            processes.append(ctx.Process(
+                target=_infer_worker,
+                args=(self.model_name, self.fps, buffer, infer_queue, result_queue, self.service),
+                name=f"inference-{i}"
+            ))
+
+        for process in processes:
+            process.start()
+
+        self.open_stream()
+
+        print(f"Processing frames ({self.infer_workers} inference workers, {self.slots} shared slots)...")
+
+        # Inference workers finish out of order; hold results until their turn
+        pending = {}
+        next_idx = 0
+        finished = 0
+
+        try:
+            while finished < self.infer_workers:
+                try:
+                    item = result_queue.get(timeout=1.0)
+                except queue.Empty:
+                    # A worker that died never sends its results or sentinel
+                    self.check_workers(processes)
+                    continue
+
+                if item is None:
+                    finished += 1
+                    continue
+
+                frame_idx, slot, detection = item
+                pending[frame_idx] = (slot, detection)
+
+                while next_idx in pending:
+                    slot, detection = pending.pop(next_idx)
+                    self.handle_frame(next_idx, slot, detection, buffer, encode_queue, location)
+                    next_idx += 1
+        finally:
+            # After a coordinator error the decoder may be waiting for slots that are never
+            # released; stopping it also sends the inference workers their sentinels
+            stop.set()
+            encode_queue.put(None)
+            try:
+                self.output_metrics = metrics_queue.get(timeout=60)
+            except queue.Empty:
+                self.output_metrics = None
+
+            for process in processes:
+                process.join(timeout=10)
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+
+            buffer.close()
+            buffer.unlink()
+
+        print("Done!")
+
+        self.save_summary(alerts_path, location, extra={'mode': 'pipelined'})
+
+        output_path = self.output_metrics.get('path') if self.output_metrics else None
+        return output_path, str(alerts_path)
+
+    def check_workers(self, processes):
+        failed = [f"{p.name} (exit code {p.exitcode})" for p in processes if p.exitcode not in (None, 0)]
+        if failed:
+            raise RuntimeError(f"Pipeline worker failed: {', '.join(failed)}")
+
+    def handle_frame(self, frame_idx, slot, detection, buffer, encode_queue, location):
+        if detection is None:
+            buffer.release(slot)
+            return
+
+        timestamp = frame_idx / self.fps
+        result = self.rag.process_detection(detection, location, timestamp, summarize=False)
+        is_alert = self.update_state(frame_idx, timestamp, result, location)
+
+        # The encoder takes over this slot's reference and releases it after writing
+        encode_queue.put((frame_idx, slot, result.detection, is_alert))
+
+        self.print_progress(frame_idx)
@@ -1,30 +1,28 @@
-import requests
+import json
 import os
-from dotenv import load_dotenv
+import re
+
+from src.template_summary import deviation_label
 
-load_dotenv()
 
 class RAGSummary:
     def __init__(self, api_key=None):
         if api_key is None:
-            api_key = os.getenv("OPENROUTER_API_KEY")
+            try:
+                from dotenv import load_dotenv
 
-        if not api_key:
-            raise ValueError("OPENROUTER_API_KEY not provided")
+                load_dotenv()
+            except ImportError:
+                pass
+            api_key = os.getenv("OPENROUTER_API_KEY")
 
+        # A missing key only matters once a summary is actually requested
         self.api_key = api_key
         self.base_url = "https://openrouter.ai/api/v1"
         self.model = "deepseek/deepseek-chat"
 
     def _deviation_label(self, z_score):
-        z = abs(z_score)
-
-        if z < 1:
-            return "within normal range"
-        elif z < 3:
-            return "moderately above normal"
-        else:
-            return "significantly above normal"
+        return deviation_label(z_score)
 
     def generate_summary(
         self,
@@ -33,18 +31,41 @@ class RAGSummary:
         density_level,
         baseline_mean,
         baseline_std,
-        z_score
+        z_score,
+        context=None,
+        fallback=True
     ):
+        # With fallback=False failures return None so callers can keep their own text
+        if not self.api_key:
+            return "LLM unavailable: OPENROUTER_API_KEY not provided" if fallback else None
+
         deviation_text = self._deviation_label(z_score)
+        context_block = f"Context:\n{context}\n" if context else ""
 
         prompt = f"""Zone: {zone}
 Observed count: {int(person_count)}
 Density: {density_level}
 Deviation: {deviation_text}
-
+{context_block}
 Write a 1-2 sentence summary for patrol supervisor. Be factual, calm, operational.
 Output ONLY the summary text."""
 
+        return self._complete(prompt, max_tokens=50, fallback=fallback)
+
+    def generate_digest(self, zones, fallback=False):
+        # One request for every zone's state; returns {zone: text} for the zones that got a line
+        if not self.api_key or not zones:
+            return None
+
+        prompt = digest_prompt(zones)
+        wanted = sum(1 for state in zones if state.get('alerts'))
+        text = self._complete(prompt, max_tokens=min(40 * wanted + 20, 800), fallback=fallback)
+
+        if not text:
+            return None
+        return parse_digest(text, [state['zone'] for state in zones])
+
+    def _complete(self, prompt, max_tokens, fallback=True):
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
@@ -55,10 +76,12 @@ Output ONLY the summary text."""
             "messages": [
                 {"role": "user", "content": prompt}
             ],
-            "max_tokens": 50
+            "max_tokens": max_tokens
         }
 
         try:
+            import requests
+
             response = requests.post(
                 f"{self.base_url}/chat/completions",
                 headers=headers,
@@ -70,7 +93,57 @@ Output ONLY the summary text."""
                 result = response.json()
                 return result["choices"][0]["message"]["content"]
             else:
-                return f"Error {response.status_code}"
+                return f"Error {response.status_code}" if fallback else None
 
         except Exception as e:
-            return f"LLM unavailable: {str(e)}"
+            return f"LLM unavailable: {str(e)}" if fallback else None
+
+
+def digest_prompt(zones):
+    # Short ids instead of zone names keep the reply small and unambiguous to parse
+    rows = []
+    for i, state in enumerate(zones, 1):
+        baseline = state.get('baseline_mean')
+        rows.append(" | ".join([
+            f"Z{i}",
+            state['zone'],
+            str(int(state['person_count'])),
+            f"{baseline:.0f}" if baseline else "-",
+            state['density_level'],
+            deviation_label(state['z_score']),
+            str(state.get('alerts', 0))
+        ]))
+
+    table = "\n".join(rows)
+    return f"""Crowd situation report, {len(zones)} zones.
+id | zone | count | baseline | density | deviation | alerts since last report
+{table}
+
+For each zone with alerts, write 1 sentence for the patrol supervisor. Be factual, calm, operational.
+Output ONLY a JSON object mapping zone id to sentence, e.g. {{"Z1": "..."}}."""
+
+
+def parse_digest(text, zone_names):
+    ids = {f"Z{i}": zone for i, zone in enumerate(zone_names, 1)}
+    text = text.strip()
+
+    # Models often wrap JSON in a code fence or a sentence; take the outermost object
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        try:
+            parsed = json.loads(text[start:end + 1])
+            return {
+                ids[key.strip().upper()]: str(value).strip()
+                for key, value in parsed.items()
+                if key.strip().upper() in ids and str(value).strip()
+            }
+        except (json.JSONDecodeError, AttributeError):
+            pass
+
+    # Otherwise accept "Z1: sentence" lines
+    parts = {}
+    for match in re.finditer(r"^\W*(Z\d+)\W*[:|\-]\s*(.+)$", text, re.MULTILINE | re.IGNORECASE):
+        key = match.group(1).upper()
+        if key in ids:
+            parts[ids[key]] = match.group(2).strip().strip('"')
+    return parts
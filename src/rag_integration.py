@@ -1,33 +1,82 @@
+from datetime import timedelta
+
 from src.frame_analyzer import FrameAnalyzer
 from src.density import DensityAnalyzer
+from src.frame_record import FrameResult
 from src.historical_baseline import HistoricalBaseline
 from src.rag import RAGSummary
+from src.template_summary import TemplateSummary
 
 
 class RAGIntegration:
-    def __init__(self):
-        self.analyzer = FrameAnalyzer()
-        self.density = DensityAnalyzer()
+    def __init__(self, motion_gate=None, load_model=True, index=None, analyzer=None, history_window=None,
+                 recorded_at=None):
+        # Offline workers run detection in their own processes, so the
+        # coordinating process can skip loading the model
+        if analyzer is not None:
+            self.analyzer = analyzer
+        elif load_model:
+            self.analyzer = FrameAnalyzer(motion_gate=motion_gate)
+        else:
+            self.analyzer = None
+        self.density = DensityAnalyzer(history_window=history_window)
         self.baseline = HistoricalBaseline()
-        self.rag = RAGSummary()
+        self.index = index
+        # Footage time of frame 0, so history lookups match on when the scene happened
+        self.recorded_at = recorded_at
+        self.template = TemplateSummary()
+        self._rag = None
+    
+    @property
+    def rag(self):
+        # Runs that never hit an alert never need the LLM client
+        if self._rag is None:
+            self._rag = RAGSummary()
+        return self._rag
     
-    def process_frame(self, frame, location, timestamp):
+    def process_frame(self, frame, location, timestamp, summarize=True):
         detection = self.analyzer.analyze_frame(frame, timestamp=timestamp)
         
         if detection is None:
             return None
         
-        person_count = detection['person_count']
+        return self.process_detection(detection, location, timestamp, summarize=summarize)
+    
+    def process_detection(self, detection, location, timestamp, summarize=True):
+        person_count = detection.person_count
+        detection.timestamp = timestamp
         
         # Add to history
         self.baseline.add_frame_data(person_count)
         
-        # Get density
-        density_level = self.density.analyze(person_count)
-        z_score = self.density.calculate_z_score(person_count)
+        # Density level, z-score and the real baseline pattern
+        result = FrameResult(
+            detection=detection,
+            density_level=self.density.analyze(person_count),
+            z_score=self.density.calculate_z_score(person_count),
+            pattern=self.baseline.get_pattern(person_count)
+        )
+        
+        # Density-map engines give a spatial grid directly, no centroid binning needed
+        if detection.density_map is not None:
+            result.spatial_map = self.density.spatial_map(None, None, density_map=detection.density_map)
+            result.hot_cells, result.max_local_density = self.density.hot_cells(result.spatial_map)
         
-        # Get real baseline pattern
-        pattern = self.baseline.get_pattern(person_count)
+        if summarize:
+            result.llm = self.summarize(result, location)
+        
+        return result
+    
+    def summarize(self, result, location):
+        # Local template text is available immediately; the LLM can replace it later
+        inputs = self.summary_inputs(result, location)
+        if result.pattern is None:
+            inputs['baseline_mean'] = None
+        return self.template.generate_summary(**inputs)
+    
+    def summary_inputs(self, result, location):
+        person_count = result.person_count
+        pattern = result.pattern
         
         if pattern is None:
             baseline_mean = person_count
@@ -40,29 +89,19 @@ class RAGIntegration:
                 f"Peak: {pattern['peak_people']}"
             )
         
-        # Generate LLM summary with context
-        llm_summary = self.rag.generate_summary(
-            zone=location,
-            person_count=person_count,
-            density_level=density_level,
-            baseline_mean=baseline_mean,
-            baseline_std=10,
-            z_score=z_score
-        )
+        # Past episodes come from the local index, not from rescanning old results
+        if self.index is not None:
+            when = self.recorded_at + timedelta(seconds=result.timestamp) if self.recorded_at else None
+            history_text = self.index.context_text(location, person_count, baseline_mean, when=when)
+            if history_text:
+                context_text = f"{context_text}\n{history_text}"
         
         return {
-            'detection': {
-                'person_count': person_count,
-                'centroids': detection['centroids'],
-                'bboxes': detection['bboxes'],
-                'confidences': detection['confidences'],
-                'avg_confidence': detection['avg_confidence']
-            },
-            'density': {
-                'level': density_level,
-                'z_score': z_score
-            },
-            'pattern': pattern,
-            'llm': llm_summary,
-            'timestamp': timestamp
-        }
\ No newline at end of file
+            'zone': location,
+            'person_count': person_count,
+            'density_level': result.density_level,
+            'baseline_mean': baseline_mean,
+            'baseline_std': 10,
+            'z_score': result.z_score,
+            'context': context_text
+        }
@@ -0,0 +1,248 @@
+import json
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+
+
+RESOLUTIONS = (('1s', 1), ('1min', 60), ('15min', 900), ('1h', 3600))
+LEVELS = ('low', 'medium', 'high')
+
+# Fixed-width rows appended in time order, so a range query is a binary search on a memmap.
+# Several writers on one zone (or a re-run of older footage) can interleave; the writer that
+# notices leaves a <res>.unsorted marker, and only marked files are sorted on read
+ROLLUP_DTYPE = np.dtype([
+    ('start', 'f8'),
+    ('frames', 'i4'),
+    ('min', 'f4'),
+    ('mean', 'f4'),
+    ('max', 'f4'),
+    ('p95', 'f4'),
+    ('alerts', 'i4'),
+    ('low', 'i4'),
+    ('medium', 'i4'),
+    ('high', 'i4'),
+])
+
+# Counts above this share the top histogram bin; mean still uses the exact value
+MAX_COUNT = 4096
+
+
+def zone_slug(zone):
+    return re.sub(r'[^A-Za-z0-9_-]+', '_', zone).strip('_') or 'zone'
+
+
+def choose_resolution(span_seconds, max_points=2000):
+    # Finest resolution that keeps the chart under max_points
+    for name, seconds in RESOLUTIONS:
+        if span_seconds / seconds <= max_points:
+            return name
+    return RESOLUTIONS[-1][0]
+
+
+class Bucket:
+    __slots__ = ('seconds', 'start', 'hist', 'frames', 'total', 'alerts', 'levels')
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.start = None
+        self.hist = np.zeros(64, dtype=np.int64)
+        self.reset(None)
+
+    def reset(self, start):
+        self.start = start
+        self.hist[:] = 0
+        self.frames = 0
+        self.total = 0.0
+        self.alerts = 0
+        self.levels = [0, 0, 0]
+
+    def add(self, count, level, is_alert):
+        # Integer counts make a histogram exact for min/max/p95 and cheap to update
+        slot = min(int(count), MAX_COUNT - 1)
+        if slot >= len(self.hist):
+            size = min(max(slot + 1, len(self.hist) * 2), MAX_COUNT)
+            self.hist = np.concatenate([self.hist, np.zeros(size - len(self.hist), dtype=np.int64)])
+        self.hist[slot] += 1
+
+        self.frames += 1
+        self.total += count
+        self.alerts += int(is_alert)
+        if level in LEVELS:
+            self.levels[LEVELS.index(level)] += 1
+
+    def record(self):
+        present = np.nonzero(self.hist)[0]
+        cumulative = np.cumsum(self.hist)
+        p95 = int(np.searchsorted(cumulative, np.ceil(0.95 * self.frames)))
+
+        row = np.zeros(1, dtype=ROLLUP_DTYPE)
+        row[0] = (
+            self.start, self.frames, present[0], self.total / self.frames, present[-1], p95,
+            self.alerts, *self.levels
+        )
+        return row
+
+
+class ZoneRollup:
+
+    def __init__(self, zone_dir):
+        self.zone_dir = Path(zone_dir)
+        self.zone_dir.mkdir(parents=True, exist_ok=True)
+        self.buckets = [Bucket(seconds) for _, seconds in RESOLUTIONS]
+        self.paths = [self.zone_dir / f"{name}.bin" for name, _ in RESOLUTIONS]
+        self.files = [open(path, 'ab') for path in self.paths]
+
+    def add(self, when, count, level, is_alert):
+        for bucket, f, path in zip(self.buckets, self.files, self.paths):
+            start = when // bucket.seconds * bucket.seconds
+
+            if bucket.start != start:
+                if bucket.frames:
+                    self.write(bucket, f, path)
+                bucket.reset(start)
+
+            bucket.add(count, level, is_alert)
+
+    def write(self, bucket, f, path):
+        before = os.fstat(f.fileno()).st_size
+        bucket.record().tofile(f)
+        # Closed buckets become visible to readers right away
+        f.flush()
+        check_order(path, before)
+
+    def close(self):
+        for bucket, f, path in zip(self.buckets, self.files, self.paths):
+            if bucket.frames:
+                self.write(bucket, f, path)
+                bucket.reset(None)
+            f.close()
+
+
+def unsorted_marker(path):
+    return Path(path).with_suffix(".unsorted")
+
+
+def check_order(path, before):
+    # Only the rows appended since `before`, plus the one preceding them, can break the order:
+    # any other writer's row that landed in between is in the same window
+    size = ROLLUP_DTYPE.itemsize
+    offset = max(before // size - 1, 0) * size
+
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read()
+
+    rows = np.frombuffer(data[:len(data) // size * size], dtype=ROLLUP_DTYPE)
+    if np.any(np.diff(rows['start']) < 0):
+        unsorted_marker(path).touch()
+
+
+class RollupStore:
+
+    def __init__(self, root="data/rollups"):
+        self.root = Path(root)
+        self.writers = {}
+
+    def zones(self):
+        path = self.root / "zones.json"
+        if not path.exists():
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def register(self, zone):
+        zones = self.zones()
+        slug = zone_slug(zone)
+        if zones.get(slug) != zone:
+            zones[slug] = zone
+            self.root.mkdir(parents=True, exist_ok=True)
+            with open(self.root / "zones.json", 'w') as f:
+                json.dump(zones, f, indent=2)
+        return slug
+
+    def add(self, zone, when, count, level, is_alert):
+        writer = self.writers.get(zone)
+        if writer is None:
+            writer = self.writers[zone] = ZoneRollup(self.root / self.register(zone))
+        writer.add(when, count, level, is_alert)
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
+        self.writers = {}
+
+    def table(self, zone, resolution):
+        path = self.root / zone_slug(zone) / f"{resolution}.bin"
+        if not path.exists() or path.stat().st_size < ROLLUP_DTYPE.itemsize:
+            return np.zeros(0, dtype=ROLLUP_DTYPE)
+
+        rows = path.stat().st_size // ROLLUP_DTYPE.itemsize
+        table = np.memmap(path, dtype=ROLLUP_DTYPE, mode='r', shape=(rows,))
+
+        # Sorted files stay a memmap and are never scanned; only marked ones are sorted in memory
+        if unsorted_marker(path).exists():
+            return np.array(table[np.argsort(table['start'], kind='stable')])
+        return table
+
+    def compact(self, zone):
+        # Rewrite marked files sorted and merged. Run it when no writer has the zone open
+        for name, _ in RESOLUTIONS:
+            path = self.root / zone_slug(zone) / f"{name}.bin"
+            if not unsorted_marker(path).exists():
+                continue
+
+            rows = merge_rows(np.array(self.table(zone, name)))
+            tmp_path = path.with_suffix(".tmp")
+            rows.tofile(tmp_path)
+            os.replace(tmp_path, path)
+            unsorted_marker(path).unlink()
+
+    def earliest(self, zone):
+        table = self.table(zone, RESOLUTIONS[-1][0])
+        return float(table['start'][0]) if len(table) else None
+
+    def latest(self, zone):
+        # End of the newest 1 s bucket written for this zone
+        table = self.table(zone, RESOLUTIONS[0][0])
+        return float(table['start'][-1]) + 1 if len(table) else None
+
+    def query(self, zone, start=None, end=None, resolution=None, max_points=2000):
+        if resolution is None:
+            if start is None or end is None:
+                resolution = RESOLUTIONS[-1][0]
+            else:
+                resolution = choose_resolution(end - start, max_points)
+
+        table = self.table(zone, resolution)
+        lo = 0 if start is None else int(np.searchsorted(table['start'], start, side='left'))
+        hi = len(table) if end is None else int(np.searchsorted(table['start'], end, side='left'))
+
+        return resolution, merge_rows(np.array(table[lo:hi]))
+
+
+def merge_rows(rows):
+    # A run that ends mid-bucket and a later run that resumes it both write that bucket.
+    # np.unique also sorts, so unordered rows come back in time order
+    if len(rows) < 2 or np.all(np.diff(rows['start']) > 0):
+        return rows
+
+    starts, inverse = np.unique(rows['start'], return_inverse=True)
+    merged = np.zeros(len(starts), dtype=ROLLUP_DTYPE)
+    merged['start'] = starts
+
+    frames = np.bincount(inverse, weights=rows['frames'])
+    merged['frames'] = frames
+    merged['mean'] = np.bincount(inverse, weights=rows['mean'] * rows['frames']) / frames
+
+    for name in ('alerts', 'low', 'medium', 'high'):
+        merged[name] = np.bincount(inverse, weights=rows[name])
+
+    merged['min'] = np.inf
+    np.minimum.at(merged['min'], inverse, rows['min'])
+    np.maximum.at(merged['max'], inverse, rows['max'])
+    # Percentiles do not merge exactly; the larger p95 is the conservative choice
+    np.maximum.at(merged['p95'], inverse, rows['p95'])
+
+    return merged
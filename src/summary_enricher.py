@@ -0,0 +1,292 @@
+import threading
+import time
+from collections import deque
+
+
+class LLMEnricher:
+
+    def __init__(self, get_llm, on_summary, max_per_minute=20, max_pending=100):
+        # get_llm builds the client on first use, so runs without alerts never load it
+        self.get_llm = get_llm
+        self._llm = None
+        self.on_summary = on_summary
+        self.min_interval = 60.0 / max_per_minute
+        # When the backlog is full the oldest request is dropped; its alert keeps the template text
+        self.pending = deque(maxlen=max_pending)
+
+        self.condition = threading.Condition()
+        self.thread = None
+        self.stopping = False
+        self.last_request = 0.0
+
+        self.submitted = 0
+        self.enriched = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.discarded = 0
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            self._llm = self.get_llm()
+        return self._llm
+
+    @property
+    def available(self):
+        return bool(getattr(self.llm, 'api_key', None))
+
+    def submit(self, alert, summary_inputs):
+        if not self.available:
+            return False
+
+        with self.condition:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+
+            self.pending.append((alert, summary_inputs))
+            self.submitted += 1
+            self.condition.notify()
+
+        return True
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.stopping:
+                    self.condition.wait()
+
+                if not self.pending:
+                    return
+
+                alert, summary_inputs = self.pending.popleft()
+                self.in_flight += 1
+
+            # Rate limit: space requests at least min_interval apart
+            wait = self.last_request + self.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self.last_request = time.monotonic()
+
+            text = self.llm.generate_summary(**summary_inputs, fallback=False)
+
+            with self.condition:
+                self.in_flight -= 1
+                if self.stopping:
+                    # close() gave up on this request; the alert is already written out
+                    self.discarded += 1
+                elif text:
+                    # Applied under the lock so close() cannot return mid-update
+                    self.on_summary(alert, text.strip())
+                    self.enriched += 1
+                else:
+                    self.failed += 1
+                self.condition.notify_all()
+
+    def close(self, timeout=10.0):
+        # Give queued requests a bounded chance to finish, then abandon the rest;
+        # answers arriving after this are discarded, never applied
+        deadline = time.monotonic() + timeout
+
+        with self.condition:
+            while (self.pending or self.in_flight) and self.thread is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+
+            self.pending.clear()
+            self.stopping = True
+            self.condition.notify_all()
+
+        if self.thread is not None:
+            self.thread.join(timeout=max(deadline - time.monotonic(), 0.1))
+
+    def metrics(self):
+        with self.condition:
+            return {
+                'submitted': self.submitted,
+                'enriched': self.enriched,
+                'failed': self.failed,
+                'discarded': self.discarded,
+                'dropped': (self.submitted - self.enriched - self.failed - self.discarded
+                            - len(self.pending) - self.in_flight)
+            }
+
+
+class DigestEnricher:
+
+    def __init__(self, llm, interval=60.0, max_alerts_per_zone=200):
+        # One LLM request per interval for all zones, however many cameras share this instance
+        self.llm = llm
+        self.interval = interval
+        self.max_alerts_per_zone = max_alerts_per_zone
+
+        # Latest state and last-seen time per zone, and alerts waiting for the next digest as (alert, on_summary)
+        self.states = {}
+        self.seen = {}
+        self.pending = {}
+
+        self.condition = threading.Condition()
+        self.thread = None
+        self.stopping = False
+        self.abandoned = False
+        self.flush_requested = False
+        self.in_flight = 0
+
+        # Tickets: submit() numbers alerts in order; every alert up to `completed` has had its digest
+        self.completed = 0
+
+        self.digests = 0
+        self.failed_digests = 0
+        self.submitted = 0
+        self.enriched = 0
+        self.failed = 0
+        self.dropped = 0
+        self.discarded = 0
+        self.evicted = 0
+
+    @property
+    def available(self):
+        return bool(getattr(self.llm, 'api_key', None))
+
+    def update(self, state):
+        # Called every frame; only the newest state per zone is kept
+        with self.condition:
+            self.states[state['zone']] = state
+            self.seen[state['zone']] = time.monotonic()
+
+    def submit(self, alert, state, on_summary):
+        # Returns a ticket for flush(), or False when there is no LLM
+        if not self.available:
+            return False
+
+        with self.condition:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+
+            self.states[state['zone']] = state
+            self.seen[state['zone']] = time.monotonic()
+            alerts = self.pending.setdefault(state['zone'], deque())
+            if len(alerts) >= self.max_alerts_per_zone:
+                # The oldest alert keeps its template text
+                alerts.popleft()
+                self.dropped += 1
+            alerts.append((alert, on_summary))
+            self.submitted += 1
+
+            return self.submitted
+
+    def evict_idle(self):
+        # Cameras that stopped reporting drop out of the digest prompt
+        cutoff = time.monotonic() - self.interval
+        for zone in [zone for zone, seen in self.seen.items() if seen < cutoff and zone not in self.pending]:
+            del self.states[zone]
+            del self.seen[zone]
+            self.evicted += 1
+
+    def run(self):
+        while True:
+            with self.condition:
+                deadline = time.monotonic() + self.interval
+                while not self.stopping and not self.flush_requested:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+
+                stopping = self.stopping
+                self.flush_requested = False
+
+                # Before the swap, so zones whose alerts are about to be sent are kept
+                self.evict_idle()
+                pending, self.pending = self.pending, {}
+                taken = self.submitted
+                zones = [
+                    {**state, 'alerts': len(pending.get(zone, ()))}
+                    for zone, state in self.states.items()
+                ]
+                self.in_flight += 1
+
+            if pending:
+                self.send(zones, pending)
+
+            with self.condition:
+                self.in_flight -= 1
+                self.completed = taken
+                self.condition.notify_all()
+
+            if stopping:
+                return
+
+    def send(self, zones, pending):
+        parts = self.llm.generate_digest(zones)
+
+        with self.condition:
+            self.digests += 1
+            if parts is None:
+                self.failed_digests += 1
+            parts = parts or {}
+
+            for zone, alerts in pending.items():
+                text = parts.get(zone)
+                for alert, on_summary in alerts:
+                    if self.abandoned:
+                        # close() gave up on this digest; the alerts are already written out
+                        self.discarded += 1
+                    elif text:
+                        # Applied under the lock so close() cannot return mid-update
+                        on_summary(alert, text)
+                        self.enriched += 1
+                    else:
+                        self.failed += 1
+
+    def flush(self, ticket=None, timeout=10.0):
+        # Send now instead of at the end of the interval, and wait only until the digest
+        # covering `ticket` (default: everything submitted so far) is back. Other cameras
+        # submitting meanwhile do not extend the wait
+        deadline = time.monotonic() + timeout
+
+        with self.condition:
+            if ticket is None:
+                ticket = self.submitted
+            if self.thread is None or self.completed >= ticket:
+                return True
+
+            self.flush_requested = True
+            self.condition.notify_all()
+
+            while self.completed < ticket and not self.stopping:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+
+            return self.completed >= ticket
+
+    def close(self, timeout=10.0):
+        # A last digest for whatever is pending, bounded by timeout; a reply after that is discarded
+        with self.condition:
+            self.stopping = True
+            self.condition.notify_all()
+
+        if self.thread is not None:
+            self.thread.join(timeout=timeout)
+
+        with self.condition:
+            self.abandoned = True
+
+    def metrics(self):
+        with self.condition:
+            return {
+                'zones': len(self.states),
+                'digests': self.digests,
+                'failed_digests': self.failed_digests,
+                'submitted': self.submitted,
+                'enriched': self.enriched,
+                'failed': self.failed,
+                'dropped': self.dropped,
+                'discarded': self.discarded,
+                'evicted': self.evicted
+            }
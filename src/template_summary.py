@@ -0,0 +1,44 @@
+def deviation_label(z_score):
+    z = abs(z_score)
+
+    if z < 1:
+        return "within normal range"
+    elif z < 3:
+        return "moderately above normal"
+    else:
+        return "significantly above normal"
+
+
+class TemplateSummary:
+
+    def __init__(self):
+        self.actions = {
+            "within normal range": "Continue routine monitoring.",
+            "moderately above normal": "Maintain observation of the zone; no intervention indicated.",
+            "significantly above normal": "Recommend supervisor review of current deployment at this zone."
+        }
+
+    def generate_summary(
+        self,
+        zone,
+        person_count,
+        density_level,
+        baseline_mean,
+        baseline_std,
+        z_score,
+        context=None
+    ):
+        label = deviation_label(z_score)
+        count = int(person_count)
+
+        if baseline_mean:
+            deviation = (person_count - baseline_mean) / baseline_mean * 100
+            baseline_text = f"{deviation:+.0f}% vs baseline {baseline_mean:.0f}"
+        else:
+            baseline_text = "baseline not yet established"
+
+        return (
+            f"{zone}: {count} people observed ({baseline_text}), "
+            f"{str(density_level).lower()} density, {label}. "
+            f"{self.actions[label]}"
+        )
@@ -0,0 +1,186 @@
+import cv2
+from collections import deque
+from dataclasses import replace
+from pathlib import Path
+
+from src.video_overlay import VideoOverlay
+
+
+OUTPUT_MODES = ("none", "full", "preview", "clips")
+
+
+def annotate(overlay, frame, detection, is_alert, frame_idx):
+    try:
+        return overlay.annotate_frame(frame, detection, is_alert=is_alert)
+    except Exception as e:
+        print(f"Error annotating frame {frame_idx}: {e}")
+        return frame
+
+
+class NullOutput:
+
+    def __init__(self):
+        self.path = None
+
+    def write(self, frame, detection, is_alert, frame_idx):
+        return None
+
+    def close(self):
+        pass
+
+    def metrics(self):
+        return {'mode': 'none', 'path': None, 'written': 0}
+
+
+class FullOutput:
+
+    def __init__(self, path, fps, frame_size):
+        width, height = frame_size
+        self.path = Path(path)
+        self.overlay = VideoOverlay((height, width))
+        self.writer = cv2.VideoWriter(str(self.path), cv2.VideoWriter_fourcc(*'XVID'), fps, (width, height))
+        self.written = 0
+
+    def write(self, frame, detection, is_alert, frame_idx):
+        self.writer.write(annotate(self.overlay, frame, detection, is_alert, frame_idx))
+        self.written += 1
+        return str(self.path)
+
+    def close(self):
+        self.writer.release()
+
+    def metrics(self):
+        return {'mode': 'full', 'path': str(self.path), 'written': self.written}
+
+
+class PreviewOutput:
+
+    def __init__(self, path, fps, frame_size, scale=0.5, frame_step=5):
+        width, height = frame_size
+        self.path = Path(path)
+        self.scale = scale
+        self.frame_step = max(int(frame_step), 1)
+        self.size = (max(int(width * scale), 1), max(int(height * scale), 1))
+
+        # Annotate at preview size so skipped pixels never get drawn on
+        self.overlay = VideoOverlay((self.size[1], self.size[0]))
+        self.writer = cv2.VideoWriter(
+            str(self.path),
+            cv2.VideoWriter_fourcc(*'XVID'),
+            fps / self.frame_step,
+            self.size
+        )
+        self.written = 0
+
+    def scale_detection(self, detection):
+        s = self.scale
+        return replace(detection, boxes=detection.boxes * s, centroids=detection.centroids * s)
+
+    def write(self, frame, detection, is_alert, frame_idx):
+        if frame_idx % self.frame_step != 0:
+            return None
+
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        self.writer.write(annotate(self.overlay, small, self.scale_detection(detection), is_alert, frame_idx))
+        self.written += 1
+        return str(self.path)
+
+    def close(self):
+        self.writer.release()
+
+    def metrics(self):
+        return {'mode': 'preview', 'path': str(self.path), 'written': self.written, 'scale': self.scale, 'frame_step': self.frame_step}
+
+
+class ClipOutput:
+
+    def __init__(self, clips_dir, fps, frame_size, pre_roll=1.0, post_roll=2.0, copy_frames=False):
+        self.clips_dir = Path(clips_dir)
+        self.clips_dir.mkdir(parents=True, exist_ok=True)
+        self.path = self.clips_dir
+
+        self.fps = fps
+        self.frame_size = frame_size
+        self.post_roll_frames = max(int(post_roll * fps), 0)
+        # Recycled buffers (e.g. shared-memory slots) must be copied before they are held
+        self.copy_frames = copy_frames
+
+        # Raw frames only; annotation happens once a frame is known to be written
+        self.ring = deque(maxlen=max(int(pre_roll * fps), 0))
+
+        width, height = frame_size
+        self.overlay = VideoOverlay((height, width))
+
+        self.writer = None
+        self.current = None
+        self.post_remaining = 0
+        self.clips = []
+        self.written = 0
+
+    def open_clip(self, frame_idx):
+        path = self.clips_dir / f"alert_{frame_idx:08d}.avi"
+        self.writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'XVID'), self.fps, self.frame_size)
+        self.current = {'path': str(path), 'start_frame': frame_idx, 'end_frame': frame_idx}
+        self.clips.append(self.current)
+
+    def close_clip(self):
+        if self.writer is not None:
+            self.writer.release()
+        self.writer = None
+        self.current = None
+
+    def emit(self, frame, detection, is_alert, frame_idx):
+        self.writer.write(annotate(self.overlay, frame, detection, is_alert, frame_idx))
+        self.current['end_frame'] = frame_idx
+        self.written += 1
+
+    def write(self, frame, detection, is_alert, frame_idx):
+        # Post-roll: keep writing for a while after the last alert frame
+        if self.writer is not None and not is_alert:
+            if self.post_remaining == 0:
+                self.close_clip()
+            else:
+                self.post_remaining -= 1
+
+        if self.writer is None and is_alert:
+            start = self.ring[0][3] if self.ring else frame_idx
+            self.open_clip(start)
+
+            # Pre-roll: frames from before the alert, annotated only now
+            while self.ring:
+                self.emit(*self.ring.popleft())
+
+        if self.writer is not None:
+            path = self.current['path']
+            self.emit(frame, detection, is_alert, frame_idx)
+
+            if is_alert:
+                self.post_remaining = self.post_roll_frames
+
+            return path
+
+        self.ring.append((frame.copy() if self.copy_frames else frame, detection, is_alert, frame_idx))
+        return None
+
+    def close(self):
+        self.close_clip()
+        self.ring.clear()
+
+    def metrics(self):
+        return {'mode': 'clips', 'path': str(self.path), 'written': self.written, 'clips': self.clips}
+
+
+def make_output(mode, output_dir, fps, frame_size, preview_scale=0.5, preview_step=5,
+                pre_roll=1.0, post_roll=2.0, copy_frames=False):
+    output_dir = Path(output_dir)
+
+    if mode == "none":
+        return NullOutput()
+    if mode == "full":
+        return FullOutput(output_dir / "video_output.avi", fps, frame_size)
+    if mode == "preview":
+        return PreviewOutput(output_dir / "video_preview.avi", fps, frame_size, preview_scale, preview_step)
+    if mode == "clips":
+        return ClipOutput(output_dir / "clips", fps, frame_size, pre_roll, post_roll, copy_frames)
+
+    raise ValueError(f"Unknown output mode: {mode} (expected one of {', '.join(OUTPUT_MODES)})")
@@ -6,10 +6,13 @@ class VideoOverlay:
 
     def __init__(self, frame_shape):
         self.h, self.w = frame_shape[:2]
+        # Live quality knobs: frames pass through untouched when disabled
+        self.enabled = True
+        self.heatmap_scale = 1.0
 
     def draw_bounding_boxes(self, frame, bboxes, color=(0, 255, 0), thickness=2):
         for x1, y1, x2, y2 in bboxes:
-            cv2.rectangle(frame, (x1, y1), (x2, y2), color, thickness)
+            cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), color, thickness)
         return frame
 
     def draw_centroids(self, frame, centroids, color=(0, 255, 255), radius=5):
@@ -18,13 +21,18 @@ class VideoOverlay:
         return frame
 
     def draw_density_heatmap(self, frame, centroids, grid_size=100, alpha=0.3):
-        if not centroids:
+        if len(centroids) == 0:
             return frame
 
-        heatmap = np.zeros((self.h, self.w), dtype=np.float32)
+        # Rasterise at reduced resolution when asked to, then upsample once
+        s = self.heatmap_scale
+        heatmap = np.zeros((max(int(self.h * s), 1), max(int(self.w * s), 1)), dtype=np.float32)
 
         for cx, cy in centroids:
-            cv2.circle(heatmap, (int(cx), int(cy)), grid_size // 2, 1.0, -1)
+            cv2.circle(heatmap, (int(cx * s), int(cy * s)), max(int(grid_size * s) // 2, 1), 1.0, -1)
+
+        if s != 1.0:
+            heatmap = cv2.resize(heatmap, (self.w, self.h), interpolation=cv2.INTER_LINEAR)
 
         heatmap = cv2.normalize(heatmap, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
         heatmap_color = cv2.applyColorMap(heatmap, cv2.COLORMAP_JET)
@@ -32,6 +40,17 @@ class VideoOverlay:
         result = cv2.addWeighted(frame, 1 - alpha, heatmap_color, alpha, 0)
         return result
 
+    def draw_density_map(self, frame, density_map, alpha=0.3):
+        if density_map is None or density_map.max() <= 0:
+            return frame
+
+        heatmap = cv2.resize(density_map, (self.w, self.h), interpolation=cv2.INTER_LINEAR)
+        heatmap = cv2.normalize(heatmap, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+        heatmap_color = cv2.applyColorMap(heatmap, cv2.COLORMAP_JET)
+
+        result = cv2.addWeighted(frame, 1 - alpha, heatmap_color, alpha, 0)
+        return result
+
     def draw_count_text(self, frame, count, pos=(10, 30), font_scale=1.0, color=(0, 255, 0)):
         font = cv2.FONT_HERSHEY_SIMPLEX
         cv2.putText(frame, f"Count: {count}", pos, font, font_scale, color, 2)
@@ -45,13 +64,19 @@ class VideoOverlay:
         return frame
 
     def annotate_frame(self, frame, detection, is_alert=False):
+        if not self.enabled:
+            return frame
+
         frame_copy = frame.copy()
 
-        frame_copy = self.draw_density_heatmap(frame_copy, detection['centroids'])
-        frame_copy = self.draw_bounding_boxes(frame_copy, detection['bboxes'])
-        frame_copy = self.draw_centroids(frame_copy, detection['centroids'])
-        frame_copy = self.draw_count_text(frame_copy, detection['person_count'])
-        frame_copy = self.draw_timestamp(frame_copy, detection['timestamp'])
+        if detection.density_map is not None:
+            frame_copy = self.draw_density_map(frame_copy, detection.density_map)
+        else:
+            frame_copy = self.draw_density_heatmap(frame_copy, detection.centroids)
+        frame_copy = self.draw_bounding_boxes(frame_copy, detection.bboxes)
+        frame_copy = self.draw_centroids(frame_copy, detection.centroids)
+        frame_copy = self.draw_count_text(frame_copy, detection.person_count)
+        frame_copy = self.draw_timestamp(frame_copy, detection.timestamp)
 
         if is_alert:
             h, w = frame_copy.shape[:2]
@@ -1,15 +1,40 @@
 import cv2
+import csv
 import json
+import threading
+import time
+from collections import deque
+from functools import partial
 from pathlib import Path
 from datetime import datetime
 
+from src.dashboard_data import AlertStream
+from src.episode_index import EpisodeTracker
+from src.flow import FlowAnalyzer
+from src.latency_controller import LatencyController
 from src.rag_integration import RAGIntegration
-from src.video_overlay import VideoOverlay
+from src.summary_enricher import LLMEnricher
+from src.video_output import make_output
 from src.video_tracker import CentroidTracker
 
 
+FRAME_FIELDS = ('frame', 'timestamp', 'person_count', 'global_density', 'confidence')
+
+
+def recording_start(video_path, duration_s):
+    # A recorder finishes writing the file at the end of the footage, so mtime - duration
+    # approximates the first frame's wall time and stays fixed across re-runs
+    return datetime.fromtimestamp(Path(video_path).stat().st_mtime - duration_s)
+
+
 class VideoProcessor:
-    def __init__(self, video_path, output_dir="results"):
+    load_model = True
+    
+    def __init__(self, video_path, output_dir="results", motion_gate=None, background_warmup=True, index=None,
+                 llm_enrichment=True, llm_per_minute=20, analyzer=None,
+                 output_mode="full", output_options=None, history_window=None, alert_window=None,
+                 counting_lines=None, latency_target_ms=None, realtime_factor=None, latency_max_level=None,
+                 rollups=None, dispatcher=None, digest=None, recorded_at=None):
         self.video_path = Path(video_path)
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
@@ -27,32 +52,328 @@ class VideoProcessor:
         print(f"Video: {self.video_path}")
         print(f"FPS: {self.fps}, Frames: {self.frame_count}, Size: {self.width}x{self.height}")
         
-        self.rag = RAGIntegration()
-        self.overlay = VideoOverlay((self.height, self.width))
+        self.motion_gate = motion_gate
+        self.index = index
+        # Per-zone 1 s / 1 min / 15 min / 1 h aggregates for long-range views, see src/rollups.py
+        self.rollups = rollups
+        # Delivers alerts to control room / patrol sinks off the frame loop, see src/alert_dispatch.py
+        self.dispatcher = dispatcher
+        # Footage time of frame 0; rollup buckets are keyed on it so re-processing lands in the same buckets
+        self.recorded_at = recorded_at or recording_start(self.video_path, self.frame_count / self.fps if self.fps else 0.0)
+        self.rag = RAGIntegration(
+            motion_gate=motion_gate,
+            load_model=self.load_model,
+            index=index,
+            analyzer=analyzer,
+            history_window=history_window,
+            recorded_at=self.recorded_at
+        )
+        
+        # Load the model while the rest of the setup runs
+        if self.rag.analyzer is not None and background_warmup:
+            self.rag.analyzer.warmup(background=True)
+        
+        # Alerts always get template text; the LLM, if reachable, upgrades it asynchronously
+        self.enricher = None
+        # A DigestEnricher, usually shared by every camera, replaces per-alert requests with one per interval
+        self.digest = digest
+        # Ticket of this run's newest digest submission, so save_summary waits for its own alerts only
+        self.digest_ticket = 0
+        if llm_enrichment and digest is None:
+            self.enricher = LLMEnricher(lambda: self.rag.rag, self.apply_enrichment, max_per_minute=llm_per_minute)
+        
+        # none | full | preview | clips, see src/video_output.py
+        self.output_mode = output_mode
+        self.output_options = output_options or {}
+        self.output_metrics = None
         self.tracker = CentroidTracker(max_distance=50)
+        self.flow = FlowAnalyzer((self.height, self.width), fps=self.fps, lines=counting_lines)
+        # Flow goes to the stream once per second of footage; the grid is too big for every frame
+        self.flow_every = max(int(round(self.fps or 1)), 1)
+        self.tracks = {}
+        self.flow_frame = None
+        
+        # Optional latency SLO: quality knobs step down under load and back up with headroom
+        self.controller = None
+        if latency_target_ms or realtime_factor:
+            self.controller = LatencyController(self.fps, target_ms=latency_target_ms, realtime_factor=realtime_factor or 1.0,
+                                                max_level=latency_max_level)
         
         self.baseline = None
         self.peak = None
-        self.alerts = []
+        self.baseline_set = False
+        # Only the newest alert_window alerts stay in memory; alerts_stream.jsonl has all of them,
+        # and episodes for the history index are grouped as alerts arrive
+        self.alerts = deque(maxlen=alert_window)
+        self.episodes = EpisodeTracker()
+        self.alert_count = 0
+        self.frame_log = None
+        self.frame_writer = None
+        self.stream = None
+        self.stream_lock = threading.Lock()
     
-    def process_video(self, location="Shibuya Crossing"):
-        output_video_path = self.output_dir / "video_output.avi"
-        alerts_path = self.output_dir / "alerts_timeline.json"
+    def open_stream(self):
+        # Append-only log the dashboard can tail while processing is still running
+        self.stream = open(self.output_dir / "alerts_stream.jsonl", 'w')
+        self.write_stream({'run': datetime.now().isoformat(), 'video': str(self.video_path)})
+        
+        # Per-frame series for offline parameter backtests, written as it goes rather than held
+        self.frame_log = open(self.output_dir / "video_frames.csv", 'w', newline="")
+        self.frame_writer = csv.writer(self.frame_log)
+        self.frame_writer.writerow(FRAME_FIELDS)
+    
+    def write_stream(self, record):
+        with self.stream_lock:
+            if self.stream is None:
+                return
+            self.stream.write(json.dumps(record) + "\n")
+            self.stream.flush()
+    
+    def close_stream(self):
+        with self.stream_lock:
+            if self.stream is not None:
+                self.stream.close()
+                self.stream = None
+        
+        if self.frame_log is not None:
+            self.frame_log.close()
+            self.frame_log = None
+            self.frame_writer = None
+    
+    def apply_enrichment(self, alert, text):
+        alert['llm'] = text
+        alert['llm_source'] = 'llm'
+        self.write_stream({'update': {'frame': alert['frame'], 'llm': text, 'llm_source': 'llm'}})
+    
+    def update_state(self, frame_idx, timestamp, result, location):
+        # Establish baseline on first 30 frames
+        if not self.baseline_set and len(self.rag.baseline.history) >= 30:
+            self.rag.baseline.establish_baseline(first_n_frames=30)
+            self.baseline_set = True
+            
+            self.baseline = self.rag.baseline.baseline
+            self.peak = self.rag.baseline.peak
+            print(f"Baseline: {self.baseline:.0f} | Peak: {self.peak}")
+            
+            # Threshold-aware analyzers (the model cascade) escalate near the alert line
+            if hasattr(self.rag.analyzer, 'set_threshold'):
+                self.rag.analyzer.set_threshold(self.peak)
+            self.write_stream({'baseline': self.baseline, 'peak': self.peak})
+        
+        detection = result.detection
+        if detection.reused and self.flow.last is not None:
+            # Motion-gate and stride reuse repeat old positions; motion is measured at the next fresh detection
+            result.tracks = self.tracks
+            result.flow = self.flow.last
+        else:
+            self.tracks = result.tracks = self.tracker.track(detection.centroids)
+            elapsed = frame_idx - self.flow_frame if self.flow_frame is not None else 1
+            result.flow = self.flow.update(result.tracks, frames=elapsed)
+            self.flow_frame = frame_idx
+        if frame_idx % self.flow_every == 0:
+            self.write_stream({'flow': {'zone': location, 'frame': frame_idx, 'timestamp': timestamp, **result.flow.to_record()}})
+        
+        person_count = detection.person_count
+        
+        digest_state = None
+        if self.digest is not None:
+            digest_state = {
+                'zone': location,
+                'person_count': person_count,
+                'baseline_mean': self.baseline,
+                'density_level': result.density_level,
+                'z_score': result.z_score
+            }
+            self.digest.update(digest_state)
+        
+        if self.frame_writer is not None:
+            self.frame_writer.writerow((
+                frame_idx,
+                timestamp,
+                person_count,
+                person_count / (self.width * self.height) if self.width and self.height else 0.0,
+                detection.avg_confidence
+            ))
+        
+        # Alert if count reaches peak
+        is_alert = False
+        if self.baseline_set and person_count >= self.peak:
+            is_alert = True
+            
+            # Only alert frames need a summary
+            if result.llm is None:
+                result.llm = self.rag.summarize(result, location)
+            
+            alert = {
+                'zone': location,
+                'timestamp': timestamp,
+                'frame': frame_idx,
+                'count': person_count,
+                'llm': result.llm,
+                'llm_source': 'template',
+                # Baseline and peak are run-level; only the deviation varies per alert
+                'deviation_percent': (person_count - self.baseline) / self.baseline * 100 if self.baseline else 0.0
+            }
+            if self.controller is not None:
+                # The peak was learned at full quality; degraded levels undercount against it
+                alert['quality_level'] = self.controller.level
+                alert['counts_comparable'] = self.controller.comparable
+            self.alerts.append(alert)
+            self.alert_count += 1
+            self.episodes.add(timestamp, person_count)
+            self.write_stream({'alert': alert})
+            
+            if self.dispatcher is not None:
+                # A copy, since the enricher may still rewrite the summary in place
+                self.dispatcher.submit(dict(alert))
+            
+            if self.enricher is not None:
+                self.enricher.submit(alert, self.rag.summary_inputs(result, location))
+            if self.digest is not None:
+                self.digest_ticket = self.digest.submit(alert, digest_state, self.apply_enrichment) or self.digest_ticket
+            print(f"ALERT at {timestamp:.1f}s: {person_count} people")
+        
+        if self.controller is not None:
+            self.controller.record(person_count, is_alert)
+        
+        if self.rollups is not None:
+            self.rollups.add(location, self.recorded_at.timestamp() + timestamp, person_count, result.density_level, is_alert)
+        
+        return is_alert
+    
+    def print_progress(self, frame_idx):
+        if (frame_idx + 1) % 30 == 0:
+            progress = (frame_idx + 1) / max(self.frame_count, 1) * 100
+            print(f"  {frame_idx + 1}/{self.frame_count} ({progress:.0f}%)")
+    
+    def record_history(self, location):
+        if self.index is None:
+            return
         
-        fourcc = cv2.VideoWriter_fourcc(*'XVID')
-        out = cv2.VideoWriter(
-            str(output_video_path),
-            fourcc,
+        episodes = self.index.add_run(
+            location,
+            self.episodes.episodes(),
+            self.rag.baseline.count_stats(),
+            self.baseline,
+            started_at=self.recorded_at
+        )
+        self.index.save()
+        print(f"History index: added {episodes} episodes for {location}")
+    
+    def all_alerts(self):
+        # The finished timeline lists every alert, with LLM updates applied, not just the in-memory window
+        stream_path = self.output_dir / "alerts_stream.jsonl"
+        if self.alerts.maxlen is None or not stream_path.exists():
+            return list(self.alerts)
+        
+        stream = AlertStream(stream_path)
+        stream.refresh()
+        return stream.alerts
+    
+    def save_summary(self, alerts_path, location, extra=None):
+        if self.enricher is not None:
+            self.enricher.close()
+        if self.digest is not None:
+            # Shared with other cameras, so only this run's pending alerts are pushed out
+            self.digest.flush(self.digest_ticket)
+        
+        self.close_stream()
+        if self.dispatcher is not None:
+            self.dispatcher.close()
+        if self.rollups is not None:
+            self.rollups.close()
+        self.record_history(location)
+        print(f"Total alerts: {self.alert_count}")
+        
+        summary = {
+            'baseline': self.baseline,
+            'peak': self.peak,
+            'alerts': self.all_alerts(),
+            'alert_count': self.alert_count,
+            'processed': datetime.now().isoformat(),
+            'recorded_at': self.recorded_at.isoformat()
+        }
+        
+        if self.motion_gate is not None:
+            gate_metrics = self.motion_gate.metrics()
+            summary['motion_gate'] = gate_metrics
+            print(f"Motion gate: skipped {gate_metrics['skipped']}/{gate_metrics['frames']} frames ({gate_metrics['skip_rate']:.0%})")
+        
+        if hasattr(self.rag.analyzer, 'metrics'):
+            analyzer_metrics = self.rag.analyzer.metrics()
+            summary['analyzer'] = analyzer_metrics
+            if 'escalation_rate' in analyzer_metrics:
+                print(f"Cascade: escalated {analyzer_metrics['escalated']}/{analyzer_metrics['frames']} frames "
+                      f"({analyzer_metrics['escalation_rate']:.0%}), mean count disagreement {analyzer_metrics['mean_disagreement']:.1f}")
+        
+        if self.enricher is not None:
+            summary['llm_enrichment'] = self.enricher.metrics()
+        if self.digest is not None:
+            summary['llm_digest'] = self.digest.metrics()
+        
+        summary['flow'] = {'zone': location, **self.flow.summary()}
+        if self.flow.line_names:
+            summary['line_crossings'] = self.flow.crossing_counts()
+        
+        if self.dispatcher is not None:
+            summary['dispatch'] = self.dispatcher.metrics()
+        
+        if self.controller is not None:
+            summary['latency_controller'] = self.controller.metrics()
+        
+        if self.output_metrics is not None:
+            summary['output'] = self.output_metrics
+        
+        if extra:
+            summary.update(extra)
+        
+        with open(alerts_path, 'w') as f:
+            json.dump(summary, f, indent=2)
+        
+        print(f"Alerts: {alerts_path}")
+    
+    def adapt_quality(self, elapsed_ms, frame_idx, output):
+        adjustment = self.controller.observe(elapsed_ms, frame_idx)
+        
+        if adjustment is None:
+            return
+        
+        self.controller.apply(self.rag.analyzer, output)
+        print(f"Quality level {adjustment['from']} -> {adjustment['to']} at frame {frame_idx} "
+              f"(latency {adjustment['latency_ms']:.0f} ms, budget {adjustment['budget_ms']:.0f} ms)")
+        if not adjustment['counts_comparable']:
+            print("Warning: counts at this quality level run below the baseline; alerts may be missed")
+        self.write_stream({'quality': adjustment})
+    
+    def output_factory(self, copy_frames=False):
+        # A picklable factory, so the writer can also be built inside an encoder process.
+        # copy_frames is bound here only, so output_options may set it without a clash
+        options = dict(self.output_options)
+        options['copy_frames'] = copy_frames or options.get('copy_frames', False)
+        return partial(
+            make_output,
+            self.output_mode,
+            self.output_dir,
             self.fps,
-            (self.width, self.height)
+            (self.width, self.height),
+            **options
         )
+    
+    def process_video(self, location="Shibuya Crossing"):
+        alerts_path = self.output_dir / "alerts_timeline.json"
+        
+        output = self.output_factory()()
         
         frame_idx = 0
-        baseline_set = False
+        self.open_stream()
+        
+        if self.controller is not None:
+            self.controller.apply(self.rag.analyzer, output)
         
         print("Processing frames...")
         
         while True:
+            started = time.perf_counter()
             ret, frame = self.cap.read()
             
             if not ret:
@@ -71,66 +392,27 @@ class VideoProcessor:
                 frame_idx += 1
                 continue
             
-            # Establish baseline on first 30 frames
-            if not baseline_set and len(self.rag.baseline.history) >= 30:
-                self.rag.baseline.establish_baseline(first_n_frames=30)
-                baseline_set = True
-                
-                self.baseline = self.rag.baseline.baseline
-                self.peak = self.rag.baseline.peak
-                print(f"Baseline: {self.baseline:.0f} | Peak: {self.peak}")
-            
-            person_count = result['detection']['person_count']
+            is_alert = self.update_state(frame_idx, timestamp, result, location)
             
-            # Alert if count reaches peak
-            is_alert = False
-            if baseline_set and person_count >= self.peak:
-                is_alert = True
-                alert = {
-                    'timestamp': timestamp,
-                    'frame': frame_idx,
-                    'count': person_count,
-                    'llm': result['llm'],
-                    'pattern': result['pattern']
-                }
-                self.alerts.append(alert)
-                print(f"ALERT at {timestamp:.1f}s: {person_count} people")
-            
-            # Annotate frame
-            try:
-                result['detection']['timestamp'] = timestamp
-                annotated = self.overlay.annotate_frame(
-                    frame,
-                    result['detection'],
-                    is_alert=is_alert
-                )
-            except Exception as e:
-                print(f"Error annotating frame {frame_idx}: {e}")
-                annotated = frame
+            # Frames the output mode drops are never annotated
+            output.write(frame, result.detection, is_alert, frame_idx)
             
-            out.write(annotated)
+            # Baseline frames run at full quality and stay out of the latency average: the first
+            # includes model warmup, and the peak must be learned from comparable counts
+            if self.controller is not None and self.baseline_set:
+                self.adapt_quality((time.perf_counter() - started) * 1000, frame_idx, output)
             
-            if (frame_idx + 1) % 30 == 0:
-                progress = (frame_idx + 1) / self.frame_count * 100
-                print(f"  {frame_idx + 1}/{self.frame_count} ({progress:.0f}%)")
+            self.print_progress(frame_idx)
             
             frame_idx += 1
         
         self.cap.release()
-        out.release()
+        output.close()
+        self.output_metrics = output.metrics()
         
         print("Done!")
-        print(f"Video: {output_video_path}")
-        print(f"Total alerts: {len(self.alerts)}")
-        
-        with open(alerts_path, 'w') as f:
-            json.dump({
-                'baseline': self.baseline,
-                'peak': self.peak,
-                'alerts': self.alerts,
-                'processed': datetime.now().isoformat()
-            }, f, indent=2)
+        print(f"Video ({self.output_mode}): {output.path}")
         
-        print(f"Alerts: {alerts_path}")
+        self.save_summary(alerts_path, location)
         
-        return str(output_video_path), str(alerts_path)
\ No newline at end of file
+        return str(output.path) if output.path else None, str(alerts_path)
@@ -0,0 +1,77 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+import numpy as np
+from scipy.io import savemat
+
+ROOT = Path(__file__).resolve().parent.parent
+
+spec = importlib.util.spec_from_file_location("accuracy_benchmark", ROOT / "benchmarks" / "accuracy_benchmark.py")
+accuracy_benchmark = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(accuracy_benchmark)
+
+
+def write_sample(data_dir, part, split, name, heads):
+    images = data_dir / part / split / "images"
+    truth = data_dir / part / split / "ground_truth"
+    images.mkdir(parents=True, exist_ok=True)
+    truth.mkdir(parents=True, exist_ok=True)
+
+    (images / f"{name}.jpg").write_bytes(b"")
+    info = np.empty((1, 1), dtype=object)
+    info[0, 0] = {'location': np.arange(heads * 2, dtype=float).reshape(-1, 2), 'number': heads}
+    savemat(truth / f"GT_{name}.mat", {'image_info': info})
+
+
+def test_ground_truth_reads_data_dir_from_any_cwd(tmp_path, monkeypatch):
+    data_dir = tmp_path / "shanghaitech"
+    write_sample(data_dir, "part_A", "test_data", "IMG_1", 5)
+    write_sample(data_dir, "part_A", "train_data", "IMG_2", 7)
+    write_sample(data_dir, "part_B", "test_data", "IMG_3", 3)
+    (data_dir / "part_B" / "test_data" / "images" / "IMG_4.jpg").write_bytes(b"")
+
+    monkeypatch.chdir(tmp_path)
+    images, counts = accuracy_benchmark.ground_truth(data_dir, ["part_A", "part_B"], "test_data", None)
+
+    assert [path.name for path in images] == ["IMG_1.jpg", "IMG_3.jpg"]
+    assert counts.tolist() == [5.0, 3.0]
+
+    images, _ = accuracy_benchmark.ground_truth(data_dir, ["part_A", "part_B"], "test_data", 1)
+    assert len(images) == 1
+
+
+def test_expand_grid_collapses_csrnet():
+    configs = accuracy_benchmark.expand_grid(["yolov8n.pt", "csrnet"], [640], [0.1, 0.25], [1, 2], ["pytorch"])
+
+    assert sum(c['model'] == "yolov8n.pt" for c in configs) == 4
+    assert [c for c in configs if c['model'] == "csrnet"] == [
+        {'model': "csrnet", 'imgsz': 640, 'conf': None, 'tiles': 1, 'backend': "pytorch"}
+    ]
+
+
+def test_tile_windows_cover_the_image_with_overlap():
+    windows = accuracy_benchmark.tile_windows(100, 200, 2)
+
+    assert len(windows) == 4
+    assert min(w[0] for w in windows) == 0 and max(w[2] for w in windows) >= 200
+    assert min(w[1] for w in windows) == 0 and max(w[3] for w in windows) >= 100
+    # Neighbouring tiles share a strip
+    assert windows[0][2] > windows[1][0]
+    assert accuracy_benchmark.tile_windows(100, 200, 1) == [(0, 0, 200, 100)]
+
+
+def test_pareto_front():
+    mae = [10.0, 5.0, 5.0, 20.0]
+    throughput = [10.0, 2.0, 1.0, 5.0]
+
+    assert accuracy_benchmark.pareto_front(mae, throughput).tolist() == [True, True, False, False]
+
+
+def test_peak_rss_without_resource_or_psutil(monkeypatch):
+    assert accuracy_benchmark.peak_rss_mb() > 0
+
+    # As on Windows without psutil installed
+    monkeypatch.setitem(sys.modules, "resource", None)
+    monkeypatch.setitem(sys.modules, "psutil", None)
+    assert accuracy_benchmark.peak_rss_mb() is None
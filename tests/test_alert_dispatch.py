@@ -0,0 +1,102 @@
+import asyncio
+import json
+import threading
+
+from src.alert_dispatch import AlertDispatcher, FileSink
+
+
+class FlakySink:
+
+    def __init__(self, failures, name="flaky"):
+        self.name = name
+        self.failures = failures
+        self.batches = []
+
+    async def send(self, batch):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("endpoint down")
+        self.batches.append(list(batch))
+
+    async def close(self):
+        pass
+
+
+class SlowSink(FlakySink):
+
+    async def send(self, batch):
+        await asyncio.sleep(10)
+
+
+def alerts(n):
+    return [{'zone': "Gate", 'frame': i, 'count': 30 + i} for i in range(n)]
+
+
+def test_alerts_reach_every_sink_in_batches(tmp_path):
+    flaky = FlakySink(failures=0)
+    dispatcher = AlertDispatcher([FileSink(tmp_path / "out.jsonl"), flaky], batch_size=5, batch_window=0.2,
+                                 dead_letter_dir=tmp_path / "dead", status_path=tmp_path / "status.json")
+    for alert in alerts(12):
+        assert dispatcher.submit(alert)
+    dispatcher.close(timeout=5)
+
+    lines = (tmp_path / "out.jsonl").read_text().splitlines()
+    assert [json.loads(line)['frame'] for line in lines] == list(range(12))
+    assert [a['frame'] for batch in flaky.batches for a in batch] == list(range(12))
+    assert max(len(batch) for batch in flaky.batches) <= 5
+
+    status = json.loads((tmp_path / "status.json").read_text())
+    assert status['sinks']['flaky']['sent'] == 12
+    assert not dispatcher.submit(alerts(1)[0])
+
+
+def test_retries_then_dead_letters(tmp_path):
+    recovering = FlakySink(failures=2, name="recovering")
+    broken = FlakySink(failures=100, name="broken")
+    dispatcher = AlertDispatcher([recovering, broken], batch_window=0.05, max_retries=2, backoff=0.01,
+                                 dead_letter_dir=tmp_path)
+    dispatcher.submit(alerts(1)[0])
+    dispatcher.close(timeout=5)
+
+    metrics = dispatcher.metrics()
+    assert metrics['recovering']['sent'] == 1 and metrics['recovering']['retries'] == 2
+    assert metrics['broken']['dead_lettered'] == 1
+    assert "ConnectionError" in metrics['broken']['last_error']
+
+    record = json.loads((tmp_path / "broken.jsonl").read_text())
+    assert record['alerts'][0]['frame'] == 0
+
+
+def test_full_queue_and_shutdown_dead_letter_instead_of_dropping(tmp_path):
+    dispatcher = AlertDispatcher([SlowSink(failures=0, name="slow")], batch_size=1, batch_window=0.0,
+                                 max_queue=2, dead_letter_dir=tmp_path)
+    for alert in alerts(5):
+        dispatcher.submit(alert)
+    dispatcher.close(timeout=0.2)
+
+    records = [json.loads(line) for line in (tmp_path / "slow.jsonl").read_text().splitlines()]
+    frames = sorted(a['frame'] for record in records for a in record['alerts'])
+    assert frames == list(range(5))
+    assert {record['reason'] for record in records} <= {"queue full", "shutdown"}
+
+
+def test_concurrent_status_writes(tmp_path):
+    # Each sink's drain writes the status file from its own worker thread
+    dispatcher = AlertDispatcher([FlakySink(0, name=f"s{i}") for i in range(4)], status_path=tmp_path / "status.json")
+    errors = []
+
+    def write():
+        try:
+            for _ in range(50):
+                dispatcher.write_status()
+        except OSError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert set(json.loads((tmp_path / "status.json").read_text())['sinks']) == {"s0", "s1", "s2", "s3"}
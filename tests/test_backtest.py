@@ -0,0 +1,94 @@
+import numpy as np
+
+from src.backtest import Backtester, expand_grid
+from src.density import DensityAnalyzer
+
+
+def series(counts, confidences=None):
+    counts = np.asarray(counts, dtype=float)
+    return {
+        'timestamp': np.arange(len(counts)) / 10.0,
+        'person_count': counts,
+        'global_density': counts / 1000.0,
+        'confidence': np.full(len(counts), 0.9) if confidences is None else np.asarray(confidences, dtype=float)
+    }
+
+
+def test_expand_grid_is_the_cartesian_product():
+    grid = expand_grid({'a': [1, 2], 'b': [10, 20, 30]})
+    assert len(grid['a']) == 6
+    assert set(zip(grid['a'], grid['b'])) == {(a, b) for a in (1, 2) for b in (10, 20, 30)}
+
+
+def test_peak_sweep_matches_a_frame_by_frame_replay():
+    rng = np.random.default_rng(1)
+    counts = rng.integers(10, 30, 400)
+    table = Backtester(series(counts)).sweep_peak({'baseline_frames': [15, 30, 60], 'margin': [0, 2]})
+
+    for row in table.itertuples():
+        n, margin = int(row.baseline_frames), row.margin
+        peak = counts[:n].max()
+        alerts = [i >= n - 1 and c >= peak + margin for i, c in enumerate(counts)]
+        episodes = sum(a and (i == 0 or not alerts[i - 1]) for i, a in enumerate(alerts))
+
+        assert row.peak == peak
+        assert row.alert_frames == sum(alerts)
+        assert row.episodes == episodes
+
+
+def test_baseline_longer_than_series_never_alerts():
+    table = Backtester(series([5, 6, 7])).sweep_peak({'baseline_frames': [10], 'margin': [0]})
+    assert table['alert_frames'].tolist() == [0]
+    assert np.isnan(table['first_alert_s'][0])
+
+
+def test_events_report_detection_and_time_to_alert():
+    counts = [10] * 30 + [10, 10, 25, 25, 10] + [10] * 5
+    backtester = Backtester(series(counts), events=[(3.0, 3.5)])
+    table = backtester.sweep_peak({'baseline_frames': [30], 'margin': [1]})
+
+    assert table['events_detected'].tolist() == [1]
+    assert np.isclose(table['mean_time_to_alert_s'][0], 0.2)
+
+
+def test_density_levels_match_density_analyzer():
+    rng = np.random.default_rng(2)
+    counts = rng.integers(0, 40, 300)
+    grid = {
+        'k': [2.0], 'medium_cut': [1.5], 'high_cut': [2.0], 'min_confidence': [0.0],
+        'medium_factor': [1.1, 1.2, 1.6], 'high_factor': [1.5, 2.0]
+    }
+    table = Backtester(series(counts)).sweep_anomaly(grid)
+
+    for row in table.itertuples():
+        analyzer = DensityAnalyzer()
+        levels = []
+        for count in counts:
+            analyzer.add(count)
+            avg = sum(analyzer.recent) / len(analyzer.recent)
+            if analyzer.frames < 3:
+                levels.append("low")
+            elif count > avg * row.high_factor:
+                levels.append("high")
+            elif count > avg * row.medium_factor:
+                levels.append("medium")
+            else:
+                levels.append("low")
+
+        assert row.high_density_frames == levels.count("high")
+        assert row.medium_density_frames == levels.count("medium")
+        assert row.low_density_frames == levels.count("low")
+
+
+def test_default_factors_reproduce_analyze():
+    counts = [10, 10, 10, 10, 30, 10, 13, 10, 10, 20]
+    table = Backtester(series(counts)).sweep_anomaly({
+        'k': [2.0], 'medium_cut': [1.5], 'high_cut': [2.0], 'min_confidence': [0.0],
+        'medium_factor': [1.2], 'high_factor': [1.5]
+    })
+
+    analyzer = DensityAnalyzer()
+    levels = [analyzer.analyze(c) for c in counts]
+
+    assert table['high_density_frames'][0] == levels.count("high")
+    assert table['medium_density_frames'][0] == levels.count("medium")
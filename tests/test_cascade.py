@@ -0,0 +1,99 @@
+import numpy as np
+
+from src.cascade import CascadeAnalyzer
+from src.frame_record import Detection
+
+
+class FakeAnalyzer:
+
+    def __init__(self, count, confidence=0.8):
+        self.count = count
+        self.confidence = confidence
+        self.calls = 0
+
+    def analyze_frame(self, frame, frame_idx=0, timestamp=0.0):
+        self.calls += 1
+        boxes = np.tile(np.array([[0, 0, 4, 4]], dtype=np.float32), (self.count, 1))
+        return Detection.from_boxes(boxes, np.full(self.count, self.confidence), frame.shape[:2], frame_idx, timestamp)
+
+
+def cascade(fast_count, accurate_count=50, confidence=0.8):
+    analyzer = CascadeAnalyzer()
+    analyzer.fast = FakeAnalyzer(fast_count, confidence)
+    analyzer.accurate = FakeAnalyzer(accurate_count)
+    return analyzer
+
+
+FRAME = np.zeros((64, 64, 3), dtype=np.uint8)
+
+
+def test_baseline_frames_always_escalate():
+    analyzer = cascade(fast_count=10)
+
+    assert analyzer.analyze_frame(FRAME).person_count == 50
+    assert analyzer.reasons['no_threshold'] == 1
+
+
+def test_only_frames_near_the_threshold_escalate():
+    analyzer = cascade(fast_count=10)
+    analyzer.set_threshold(40)
+    analyzer.last_count = 10
+
+    assert analyzer.analyze_frame(FRAME).person_count == 10
+    assert analyzer.accurate.calls == 0
+
+    analyzer.fast.count = 36
+    analyzer.last_count = 36
+    assert analyzer.analyze_frame(FRAME, frame_idx=1).person_count == 50
+    assert analyzer.reasons['near_threshold'] == 1
+
+    metrics = analyzer.metrics()
+    assert metrics['escalated'] == 1 and metrics['frames'] == 2
+    assert metrics['mean_disagreement'] == 14
+
+
+def test_low_confidence_and_count_jump_escalate():
+    analyzer = cascade(fast_count=10, confidence=0.2)
+    analyzer.set_threshold(100)
+    assert analyzer.escalation_reason(FRAME, analyzer.fast.analyze_frame(FRAME)) == "low_confidence"
+
+    analyzer = cascade(fast_count=20)
+    analyzer.set_threshold(100)
+    analyzer.last_count = 10
+    assert analyzer.escalation_reason(FRAME, analyzer.fast.analyze_frame(FRAME)) == "count_jump"
+
+
+def test_scene_change_escalates():
+    analyzer = cascade(fast_count=10)
+    analyzer.set_threshold(100)
+    analyzer.last_count = 10
+
+    assert analyzer.escalation_reason(FRAME, analyzer.fast.analyze_frame(FRAME)) is None
+    bright = np.full_like(FRAME, 255)
+    assert analyzer.escalation_reason(bright, analyzer.fast.analyze_frame(bright)) == "scene_change"
+
+
+def test_nano_is_compared_in_large_model_units():
+    # Nano finds 30 where yolov8l finds 50; the peak comes from yolov8l counts
+    analyzer = cascade(fast_count=30, accurate_count=50)
+    for i in range(5):
+        analyzer.analyze_frame(FRAME, frame_idx=i)
+    assert analyzer.nano_scale == 50 / 30
+
+    analyzer.set_threshold(50)
+    assert analyzer.analyze_frame(FRAME, frame_idx=5).person_count == 50
+    assert analyzer.reasons['near_threshold'] == 1
+
+    # Quiet frames stay on nano, with last_count kept in large-model units
+    analyzer.fast.count = 12
+    analyzer.last_count = 20
+    assert analyzer.analyze_frame(FRAME, frame_idx=6).person_count == 12
+    assert analyzer.last_count == 20
+    assert analyzer.metrics()['nano_scale'] == 50 / 30
+
+
+def test_frames_above_the_line_escalate():
+    analyzer = cascade(fast_count=90)
+    analyzer.set_threshold(40)
+    analyzer.last_count = 90
+    assert analyzer.escalation_reason(FRAME, analyzer.fast.analyze_frame(FRAME)) == "near_threshold"
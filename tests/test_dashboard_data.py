@@ -0,0 +1,90 @@
+import json
+
+import numpy as np
+
+from src.dashboard_data import AlertStream, deviation_percent, load_timeline, lttb_indices
+
+
+def record(**kwargs):
+    return (json.dumps(kwargs) + "\n").encode()
+
+
+def alert(frame, count):
+    return {'frame': frame, 'timestamp': frame / 10, 'count': count, 'llm': "template", 'llm_source': 'template'}
+
+
+def test_lttb_keeps_endpoints_and_spikes():
+    x = np.arange(1000)
+    y = np.zeros(1000)
+    y[437] = 50.0
+
+    indices = lttb_indices(x, y, 50)
+
+    assert len(indices) == 50
+    assert indices[0] == 0 and indices[-1] == 999
+    assert np.all(np.diff(indices) > 0)
+    assert 437 in indices
+
+
+def test_lttb_passes_short_series_through():
+    assert lttb_indices([0, 1, 2], [1, 2, 3], 10).tolist() == [0, 1, 2]
+    assert lttb_indices(range(10), range(10), 2).tolist() == list(range(10))
+
+
+def test_deviation_percent():
+    assert deviation_percent([10, 15], 10).tolist() == [0.0, 50.0]
+    assert deviation_percent([10, 15], 0).tolist() == [0.0, 0.0]
+
+
+def test_stream_reads_incrementally_and_applies_updates(tmp_path):
+    path = tmp_path / "alerts_stream.jsonl"
+    path.write_bytes(record(run="a") + record(baseline=10.0, peak=15) + record(alert=alert(3, 16)))
+
+    stream = AlertStream(path)
+    assert stream.refresh()
+    assert not stream.refresh()
+
+    # A half-written line waits for the rest
+    line = record(alert=alert(4, 18))
+    with open(path, 'ab') as f:
+        f.write(line[:10])
+    stream.refresh()
+    assert len(stream.snapshot()['alerts']) == 1
+
+    with open(path, 'ab') as f:
+        f.write(line[10:] + record(update={'frame': 3, 'llm': "rewritten", 'llm_source': 'llm'}))
+    stream.refresh()
+
+    data = stream.snapshot()
+    assert (data['baseline'], data['peak']) == (10.0, 15)
+    assert data['counts'].tolist() == [16, 18]
+    assert data['alerts'][0]['llm'] == "rewritten"
+    assert data['alerts'][1]['llm'] == "template"
+
+
+def test_stream_resets_on_new_run(tmp_path):
+    path = tmp_path / "alerts_stream.jsonl"
+    path.write_bytes(record(run="a") + record(baseline=10.0, peak=15) + record(alert=alert(3, 16)))
+    stream = AlertStream(path)
+    stream.refresh()
+
+    path.write_bytes(record(run="b") + record(baseline=20.0, peak=30) + record(alert=alert(1, 31)) + record(alert=alert(2, 32)))
+    stream.refresh()
+
+    data = stream.snapshot()
+    assert data['baseline'] == 20.0
+    assert data['counts'].tolist() == [31, 32]
+
+    path.unlink()
+    assert not stream.refresh()
+    assert stream.snapshot()['alerts'] == []
+
+
+def test_load_timeline(tmp_path):
+    path = tmp_path / "alerts_timeline.json"
+    path.write_text(json.dumps({'baseline': None, 'peak': 15, 'alerts': [alert(3, 16)]}))
+
+    data = load_timeline(path)
+    assert data['baseline'] == 0
+    assert data['timestamps'].tolist() == [0.3]
+    assert data['flow'] is None
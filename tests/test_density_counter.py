@@ -0,0 +1,32 @@
+import numpy as np
+
+from src.density_counter import DensityCounter, points_to_density
+
+
+def test_density_integrates_to_point_count():
+    points = np.array([[20, 20], [50, 30], [80, 60]], dtype=np.float32)
+    density = points_to_density(points, (100, 100), sigma=3.0)
+
+    assert density.shape == (100, 100)
+    assert np.isclose(density.sum(), 3.0, atol=1e-3)
+
+
+def test_density_loses_mass_past_the_border_only():
+    density = points_to_density(np.array([[0, 0]], dtype=np.float32), (50, 50), sigma=4.0)
+    # A corner point keeps roughly a quarter of its mass
+    assert 0.2 < density.sum() < 0.4
+
+    assert points_to_density(None, (10, 20)).shape == (10, 20)
+    assert points_to_density(np.zeros((0, 2)), (10, 20)).sum() == 0
+
+
+def test_find_peaks_maps_back_to_frame_coordinates():
+    counter = DensityCounter("unused.pth", peak_threshold=0.01)
+    density = np.zeros((10, 20), dtype=np.float32)
+    density[2, 3] = 0.5
+    density[7, 15] = 0.9
+    density[5, 5] = 0.001
+
+    peaks = counter.find_peaks(density, (100, 200), limit=10)
+    assert peaks.tolist() == [[155.0, 75.0], [35.0, 25.0]]
+    assert len(counter.find_peaks(density, (100, 200), limit=1)) == 1
@@ -0,0 +1,140 @@
+import os
+import stat
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.detection_service import (
+    AUTHKEY_ENV, DetectionClient, DetectionServer, parse_address, resolve_authkey, write_key_file
+)
+
+
+class Array:
+
+    def __init__(self, values):
+        self.values = np.asarray(values, dtype=np.float32)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.values
+
+
+class FakeServer(DetectionServer):
+
+    def load(self):
+        # One person whose box width encodes the frame's first pixel, plus a low-confidence one
+        def model(frames, **kwargs):
+            return [
+                SimpleNamespace(boxes=SimpleNamespace(
+                    xyxy=Array([[0, 0, f[0, 0, 0], 10], [1, 1, 3, 3]]),
+                    conf=Array([0.9, 0.05]),
+                    cls=Array([0, 0])
+                ))
+                for f in frames
+            ]
+        self.model = model
+
+
+@pytest.fixture
+def server():
+    server = FakeServer(address=("127.0.0.1", 0), max_batch=4, max_latency_ms=5)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    while server.listener is None:
+        time.sleep(0.01)
+    yield server
+    server.stopping.set()
+    server.requests.put(None)
+
+
+def test_parse_address():
+    assert parse_address("127.0.0.1:9000") == ("127.0.0.1", 9000)
+    assert parse_address(":9000") == ("127.0.0.1", 9000)
+    assert parse_address("/tmp/detect.sock") == "/tmp/detect.sock"
+
+
+def test_servers_generate_distinct_keys():
+    assert DetectionServer().authkey != DetectionServer().authkey
+    assert len(DetectionServer().authkey) == 32
+
+
+def test_client_without_a_key_refuses_to_start(tmp_path, monkeypatch):
+    monkeypatch.delenv(AUTHKEY_ENV, raising=False)
+    with pytest.raises(ValueError):
+        DetectionClient(key_file=tmp_path / "missing.key")
+
+
+def test_key_resolution_order(tmp_path, monkeypatch):
+    key_file = write_key_file(b"\x01" * 16, tmp_path / "service.key")
+    assert stat.S_IMODE(os.stat(key_file).st_mode) == 0o600
+
+    monkeypatch.delenv(AUTHKEY_ENV, raising=False)
+    assert resolve_authkey(key_file=key_file) == b"\x01" * 16
+
+    monkeypatch.setenv(AUTHKEY_ENV, "02" * 16)
+    assert resolve_authkey(key_file=key_file) == b"\x02" * 16
+    assert resolve_authkey(b"\x03", key_file=key_file) == b"\x03"
+
+
+def test_client_with_the_run_key_gets_filtered_detections(server):
+    client = DetectionClient(server.listener.address, authkey=server.authkey, conf=0.25)
+    boxes, confidences = client.detect(np.full((8, 8, 3), 7, dtype=np.uint8))
+    client.close()
+
+    assert boxes.tolist() == [[0, 0, 7, 10]]
+    assert confidences.tolist() == pytest.approx([0.9])
+
+
+def test_client_with_another_key_is_rejected(server):
+    client = DetectionClient(server.listener.address, authkey=b"not the key")
+    with pytest.raises(AuthenticationError):
+        client.detect(np.zeros((8, 8, 3), dtype=np.uint8))
+
+
+def test_rejected_client_does_not_stop_the_service(server):
+    with pytest.raises(AuthenticationError):
+        DetectionClient(server.listener.address, authkey=b"not the key").connect()
+
+    client = DetectionClient(server.listener.address, authkey=server.authkey)
+    boxes, _ = client.detect(np.full((8, 8, 3), 5, dtype=np.uint8))
+    client.close()
+    assert boxes.tolist() == [[0, 0, 5, 10]]
+
+
+def test_malformed_request_only_fails_its_sender(server):
+    bad = Client(server.listener.address, authkey=server.authkey)
+    good = DetectionClient(server.listener.address, authkey=server.authkey)
+
+    for request in ({'conf': 0.5}, {'frame': np.zeros((8, 8)), 'conf': 0.5}, "frame", {'frame': np.zeros((8, 8, 3)), 'conf': "x"}):
+        bad.send(request)
+        assert bad.poll(2.0)
+        assert bad.recv()['error'].startswith("bad request")
+
+    boxes, _ = good.detect(np.full((8, 8, 3), 6, dtype=np.uint8))
+    assert boxes.tolist() == [[0, 0, 6, 10]]
+    assert server.metrics()['rejected'] == 4
+    bad.close()
+    good.close()
+
+
+def test_client_times_out_on_a_stalled_service():
+    listener = Listener(("127.0.0.1", 0), authkey=b"key")
+    accepted = []
+    thread = threading.Thread(target=lambda: accepted.append(listener.accept()), daemon=True)
+    thread.start()
+
+    client = DetectionClient(listener.address, authkey=b"key", timeout=0.1)
+    with pytest.raises(TimeoutError):
+        client.detect(np.zeros((8, 8, 3), dtype=np.uint8))
+    assert client.conn is None
+
+    thread.join()
+    accepted[0].close()
+    listener.close()
@@ -0,0 +1,121 @@
+import threading
+import time
+
+from src.rag import digest_prompt, parse_digest
+from src.summary_enricher import DigestEnricher
+
+
+def state(zone, count=40, alerts=0):
+    return {'zone': zone, 'person_count': count, 'baseline_mean': 20.0, 'density_level': 'high',
+            'z_score': 2.5, 'alerts': alerts}
+
+
+class FakeLLM:
+    api_key = "test"
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+
+    def generate_digest(self, zones):
+        self.calls.append(zones)
+        time.sleep(self.delay)
+        return {z['zone']: f"{z['zone']} is busy" for z in zones if z['alerts']}
+
+
+def test_parse_digest_json_and_lines():
+    zones = ["Gate", "Plaza"]
+
+    assert parse_digest('```json\n{"Z1": "Gate is busy.", "z2": " "}\n```', zones) == {"Gate": "Gate is busy."}
+    assert parse_digest('Z1: Gate is busy.\n- Z2 | "Plaza is calm."\nZ9: nope', zones) == {
+        "Gate": "Gate is busy.",
+        "Plaza": "Plaza is calm."
+    }
+    assert parse_digest("no structure here", zones) == {}
+
+
+def test_digest_prompt_rows():
+    prompt = digest_prompt([state("Gate", alerts=3), {**state("Plaza", count=5), 'baseline_mean': None}])
+
+    assert "2 zones" in prompt
+    assert "Z1 | Gate | 40 | 20 | high |" in prompt
+    assert prompt.splitlines()[3].startswith("Z2 | Plaza | 5 | - |")
+
+
+def test_flush_waits_for_own_ticket_only():
+    llm = FakeLLM(delay=0.05)
+    digest = DigestEnricher(llm, interval=60.0)
+    applied = []
+
+    ticket = digest.submit({'frame': 1}, state("Gate"), lambda alert, text: applied.append(text))
+
+    # Another camera keeps submitting while this one flushes
+    stop = threading.Event()
+
+    def other_camera():
+        while not stop.is_set():
+            digest.submit({'frame': 0}, state("Plaza"), lambda alert, text: None)
+            digest.flush()
+            time.sleep(0.005)
+
+    thread = threading.Thread(target=other_camera)
+    thread.start()
+    try:
+        started = time.monotonic()
+        assert digest.flush(ticket, timeout=5.0)
+        assert time.monotonic() - started < 1.0
+    finally:
+        stop.set()
+        thread.join()
+        digest.close()
+
+    assert applied == ["Gate is busy"]
+
+
+def test_flush_without_submissions_returns_at_once():
+    digest = DigestEnricher(FakeLLM())
+    assert digest.flush(0)
+    assert digest.flush()
+
+
+def test_idle_zones_are_evicted():
+    llm = FakeLLM()
+    digest = DigestEnricher(llm, interval=0.05)
+
+    digest.update(state("Old"))
+    time.sleep(0.1)
+    digest.submit({'frame': 1}, state("Gate"), lambda alert, text: None)
+    assert digest.flush(timeout=2.0)
+    digest.close()
+
+    assert [z['zone'] for z in llm.calls[0]] == ["Gate"]
+    assert digest.metrics()['evicted'] == 1
+
+
+def test_reply_after_close_is_discarded():
+    digest = DigestEnricher(FakeLLM(delay=0.3), interval=60.0)
+    applied = []
+    digest.submit({'frame': 1}, state("Gate"), lambda alert, text: applied.append(text))
+
+    digest.close(timeout=0.05)
+    time.sleep(0.4)
+
+    assert applied == []
+    assert digest.metrics()['discarded'] == 1
+
+
+def test_zones_with_waiting_alerts_are_not_evicted():
+    # The LLM is slower than the interval, so submitted zones look idle by the next digest
+    llm = FakeLLM(delay=0.3)
+    digest = DigestEnricher(llm, interval=0.05)
+    applied = []
+
+    for zone in ("Gate", "Plaza"):
+        digest.submit({'frame': 1}, state(zone), lambda alert, text: applied.append(text))
+    time.sleep(0.1)
+    assert digest.flush(timeout=5.0)
+    digest.close()
+
+    assert sorted(applied) == ["Gate is busy", "Plaza is busy"]
+    metrics = digest.metrics()
+    assert metrics['failed'] == 0 and metrics['enriched'] == 2
@@ -0,0 +1,107 @@
+import json
+from datetime import datetime
+
+import numpy as np
+
+from src.episode_index import EpisodeIndex, EpisodeTracker, build_episodes, count_stats
+from src.frame_record import Detection
+from src.rag_integration import RAGIntegration
+
+
+def alerts(*pairs):
+    return [{'timestamp': t, 'count': c} for t, c in pairs]
+
+
+def test_tracker_splits_on_gaps():
+    tracker = EpisodeTracker(gap_seconds=2.0)
+    for t, c in [(1.0, 10), (1.5, 14), (3.0, 12), (10.0, 20), (10.1, 22)]:
+        tracker.add(t, c)
+
+    assert tracker.episodes() == [
+        {'start': 1.0, 'end': 3.0, 'peak': 14, 'sum': 36.0, 'frames': 3},
+        {'start': 10.0, 'end': 10.1, 'peak': 22, 'sum': 42.0, 'frames': 2},
+    ]
+
+
+def test_build_episodes_matches_tracker():
+    episodes = build_episodes(alerts((0.0, 5), (5.0, 6), (5.5, 9)))
+    assert [(e['start'], e['end'], e['frames']) for e in episodes] == [(0.0, 0.0, 1), (5.0, 5.5, 2)]
+    assert build_episodes([]) == []
+
+
+def test_count_stats():
+    assert count_stats([1, 2, 3]) == {'frames': 3, 'sum': 6.0, 'sum_sq': 14.0, 'min': 1.0, 'max': 3.0}
+    assert count_stats([])['frames'] == 0
+
+
+def test_add_run_records_episodes_and_zone_stats(tmp_path):
+    index = EpisodeIndex(tmp_path / "index", tmp_path / "patterns.json")
+    episodes = build_episodes(alerts((1.0, 30), (1.5, 34), (20.0, 31)))
+
+    added = index.add_run("Gate", episodes, [20, 30, 34, 31], baseline=20.0, started_at=datetime(2026, 1, 1, 18))
+
+    assert added == 2
+    assert index.episodes[0]['peak_count'] == 34
+    assert index.episodes[0]['mean_count'] == 32
+    assert index.episodes[0]['peak_deviation'] == 70
+    assert index.zone_stats("Gate")['mean'] == 28.75
+    assert index.zone_stats("Gate")['episodes'] == 2
+
+
+def test_no_baseline_adds_no_episodes(tmp_path):
+    index = EpisodeIndex(tmp_path / "index", tmp_path / "patterns.json")
+    assert index.add_run("Gate", build_episodes(alerts((1.0, 30))), [30], baseline=None) == 0
+    assert index.episodes == []
+
+
+def test_zone_stats_merge_across_runs_and_reload(tmp_path):
+    index = EpisodeIndex(tmp_path / "index", tmp_path / "patterns.json")
+    index.add_run("Gate", [], [10, 20], baseline=10.0)
+    index.add_run("Gate", [], count_stats([30]), baseline=10.0)
+    index.save()
+
+    stats = EpisodeIndex(tmp_path / "index", tmp_path / "patterns.json").zone_stats("Gate")
+    assert stats['frames'] == 3
+    assert stats['mean'] == 20
+    assert np.isclose(stats['std'], np.std([10, 20, 30]))
+    assert (stats['min'], stats['max'], stats['runs']) == (10, 30, 2)
+
+
+def test_query_prefers_similar_episodes_in_the_same_zone(tmp_path):
+    index = EpisodeIndex(tmp_path / "index", tmp_path / "patterns.json")
+    when = datetime(2026, 1, 1, 18)
+    index.add_run("Gate", build_episodes(alerts((0.0, 25))), [], 20.0, when)
+    index.add_run("Gate", build_episodes(alerts((0.0, 60))), [], 20.0, when)
+    index.add_run("Plaza", build_episodes(alerts((0.0, 26))), [], 20.0, when)
+
+    nearest = index.query(26, 20.0, zone="Gate", when=when, k=1)
+    assert nearest[0]['zone'] == "Gate"
+    assert nearest[0]['peak_count'] == 25
+
+
+def test_alert_context_matches_on_footage_time(tmp_path):
+    index = EpisodeIndex(tmp_path / "index", tmp_path / "patterns.json")
+    index.add_run("Gate", build_episodes(alerts((0.0, 30))), [], 20.0, datetime(2026, 1, 1, 6))
+    index.add_run("Gate", build_episodes(alerts((0.0, 30))), [], 20.0, datetime(2026, 1, 1, 18))
+
+    # An evening recording processed at any hour still recalls the evening episode
+    rag = RAGIntegration(load_model=False, index=index, recorded_at=datetime(2026, 1, 2, 17, 30))
+    detection = Detection.from_boxes(np.zeros((30, 4), dtype=np.float32), np.full(30, 0.9), (64, 64))
+    result = rag.process_detection(detection, "Gate", timestamp=1800.0, summarize=False)
+
+    context = rag.summary_inputs(result, "Gate")['context']
+    assert context.splitlines()[-2].startswith("Similar episode 2026-01-01T18:00:00")
+
+
+def test_ingest_timeline_uses_recording_time(tmp_path):
+    timeline = tmp_path / "alerts_timeline.json"
+    timeline.write_text(json.dumps({
+        'processed': "2026-03-01T09:00:00",
+        'recorded_at': "2026-02-27T21:00:00",
+        'baseline': 20.0,
+        'alerts': alerts((5.0, 30))
+    }))
+    index = EpisodeIndex(tmp_path / "index", tmp_path / "patterns.json")
+
+    assert index.ingest_timeline(timeline, "Gate") == 1
+    assert index.episodes[0]['time'] == "2026-02-27T21:00:05"
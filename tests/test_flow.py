@@ -0,0 +1,112 @@
+import json
+
+import numpy as np
+
+from src.dashboard_data import AlertStream
+from src.flow import FlowAnalyzer
+
+
+GATE = {'name': 'gate', 'start': (50, 0), 'end': (50, 100)}
+
+
+def run(analyzer, frames):
+    return [analyzer.update(tracks) for tracks in frames]
+
+
+def test_crossings_count_in_and_out():
+    flow = FlowAnalyzer((100, 100), fps=10, lines=[GATE])
+    # Track 1 walks left to right, track 2 right to left
+    run(flow, [{1: (40, 50), 2: (60, 20)}, {1: (60, 50), 2: (40, 20)}])
+
+    counts = flow.crossing_counts()['gate']
+    assert counts['in'] + counts['out'] == 2
+    assert counts['in'] == 1 and counts['out'] == 1
+
+
+def test_touching_the_line_counts_once():
+    flow = FlowAnalyzer((100, 100), fps=10, lines=[GATE])
+    run(flow, [{1: (40, 50)}, {1: (50, 50)}, {1: (60, 50)}])
+
+    counts = flow.crossing_counts()['gate']
+    assert counts['in'] + counts['out'] == 1
+
+
+def test_step_past_the_segment_end_is_not_a_crossing():
+    flow = FlowAnalyzer((200, 100), fps=10, lines=[GATE])
+    run(flow, [{1: (40, 150)}, {1: (60, 150)}])
+
+    assert flow.crossing_counts()['gate'] == {'in': 0, 'out': 0}
+
+
+def test_velocity_and_speed():
+    flow = FlowAnalyzer((100, 100), fps=10, grid_size=1, smoothing=1.0)
+    snapshot = run(flow, [{1: (10, 10)}, {1: (13, 14)}])[-1]
+
+    assert snapshot.mean_speed == 50.0
+    np.testing.assert_allclose(snapshot.velocity[0, 0], [30.0, 40.0])
+
+
+def test_updates_spanning_skipped_frames():
+    # 4 people walking 150 px/s at 30 fps, seen on every third frame (stride or motion-gate reuse)
+    flow = FlowAnalyzer((400, 400), fps=30, grid_size=2, smoothing=1.0)
+    frames = [{i: (10 + 5 * t, 50 + 40 * i) for i in range(4)} for t in range(0, 30, 3)]
+    snapshot = [flow.update(tracks, frames=3) for tracks in frames][-1]
+
+    assert np.isclose(snapshot.mean_speed, 150.0)
+    assert snapshot.stationary_share == 0.0
+    assert snapshot.congested_cells == 0
+    np.testing.assert_allclose(snapshot.velocity[0, 0], [150.0, 0.0])
+
+
+def test_dwell_counts_skipped_frames():
+    flow = FlowAnalyzer((100, 100), fps=10)
+    for _ in range(4):
+        snapshot = flow.update({1: (50, 50)}, frames=5)
+
+    assert snapshot.max_dwell_s == 1.5
+
+
+def test_dwell_and_congestion():
+    flow = FlowAnalyzer((100, 100), fps=10, grid_size=2, congestion_people=3)
+    crowd = {i: (10 + i, 10) for i in range(3)}
+    snapshots = run(flow, [crowd] * 6)
+
+    assert snapshots[-1].stationary_share == 1.0
+    assert snapshots[-1].max_dwell_s == 0.5
+    assert snapshots[-1].congested_cells == 1
+    assert snapshots[0].congested_cells == 0
+
+
+def test_record_and_summary_are_json():
+    flow = FlowAnalyzer((100, 100), fps=10, lines=[GATE])
+    run(flow, [{1: (40, 50)}, {1: (60, 50)}, {1: (60, 50)}])
+
+    record = flow.last.to_record()
+    summary = flow.summary()
+    json.dumps(record), json.dumps(summary)
+
+    assert np.array(record['velocity']).shape == (5, 5, 2)
+    assert summary['frames'] == 3
+    assert summary['crossings'] == record['crossings']
+    assert summary['avg_speed'] == round((0 + 200 + 0) / 3, 2)
+
+
+def test_summary_before_any_frame():
+    summary = FlowAnalyzer((100, 100), lines=[GATE]).summary()
+    assert summary['frames'] == 0
+    assert summary['crossings'] == {'gate': {'in': 0, 'out': 0}}
+
+
+def test_stream_keeps_latest_flow(tmp_path):
+    path = tmp_path / "alerts_stream.jsonl"
+    records = [
+        {'baseline': 10.0, 'peak': 15.0, 'location': 'Gate'},
+        {'flow': {'zone': 'Gate', 'frame': 0, 'mean_speed': 1.0}},
+        {'flow': {'zone': 'Gate', 'frame': 30, 'mean_speed': 2.0}},
+    ]
+    path.write_text("".join(json.dumps(r) + "\n" for r in records))
+
+    stream = AlertStream(path)
+    stream.refresh()
+    data = stream.snapshot()
+    assert data['flow']['frame'] == 30
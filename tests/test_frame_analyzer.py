@@ -0,0 +1,66 @@
+import threading
+import time
+
+import numpy as np
+
+from src.frame_analyzer import FrameAnalyzer
+
+
+class Boxes:
+
+    def __init__(self):
+        self.xyxy = self.conf = self.cls = self
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return np.zeros(0, dtype=np.float32)
+
+
+class Result:
+    boxes = Boxes()
+
+
+class SlowModel:
+    # Records whether two calls ever overlap, as a shared ultralytics predictor must not
+
+    def __init__(self):
+        self.active = 0
+        self.overlapped = False
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, frame, **kwargs):
+        with self.lock:
+            self.active += 1
+            self.calls += 1
+            self.overlapped |= self.active > 1
+        time.sleep(0.1)
+        with self.lock:
+            self.active -= 1
+        return [Result()]
+
+
+def test_first_detection_waits_for_background_warmup():
+    analyzer = FrameAnalyzer()
+    analyzer._model = model = SlowModel()
+
+    analyzer.warmup(background=True, imgsz=32)
+    detection = analyzer.analyze_frame(np.zeros((32, 32, 3), dtype=np.uint8))
+
+    assert model.calls == 2
+    assert not model.overlapped
+    assert detection.person_count == 0
+
+
+def test_stride_reuses_last_detection():
+    analyzer = FrameAnalyzer()
+    analyzer._model = model = SlowModel()
+    analyzer.configure(stride=3)
+
+    frames = [analyzer.analyze_frame(np.zeros((32, 32, 3), dtype=np.uint8), frame_idx=i) for i in range(6)]
+
+    assert model.calls == 2
+    assert [d.reused for d in frames] == [False, True, True, False, True, True]
+    assert [d.frame_idx for d in frames] == list(range(6))
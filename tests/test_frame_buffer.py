@@ -0,0 +1,48 @@
+import queue
+
+import numpy as np
+import pytest
+
+from src.frame_buffer import SharedFrameBuffer
+
+
+@pytest.fixture
+def buffer():
+    buffer = SharedFrameBuffer(2, (4, 6, 3))
+    yield buffer
+    buffer.close()
+    buffer.unlink()
+
+
+def test_slots_are_recycled_after_release(buffer):
+    first = buffer.acquire(timeout=1)
+    second = buffer.acquire(timeout=1)
+    assert {first, second} == {0, 1}
+    assert buffer.in_use() == 2
+
+    buffer.release(first)
+    assert buffer.acquire(timeout=1) == first
+
+
+def test_acquire_times_out_when_every_slot_is_in_flight(buffer):
+    buffer.acquire(timeout=1)
+    buffer.acquire(timeout=1)
+
+    with pytest.raises(queue.Empty):
+        buffer.acquire(timeout=0.1)
+
+
+def test_double_release_is_an_error(buffer):
+    slot = buffer.acquire(timeout=1)
+    buffer.release(slot)
+
+    with pytest.raises(ValueError):
+        buffer.release(slot)
+
+
+def test_view_writes_through_to_shared_memory(buffer):
+    slot = buffer.acquire(timeout=1)
+    buffer.view(slot)[:] = 7
+
+    assert np.all(buffer.frames[slot] == 7)
+    assert buffer.view(slot).shape == (4, 6, 3)
@@ -0,0 +1,82 @@
+from src.latency_controller import QUALITY_LEVELS, LatencyController, counts_comparable
+
+
+def test_degrades_after_sustained_overrun_and_recovers():
+    controller = LatencyController(fps=10, degrade_after=3, recover_after=4, smoothing=1.0)
+    assert controller.budget_ms == 100.0
+
+    steps = [controller.observe(150.0, i) for i in range(3)]
+    assert steps[:2] == [None, None]
+    assert steps[2]['from'] == 0 and steps[2]['to'] == 1
+    assert controller.level == 1
+
+    steps = [controller.observe(10.0, i) for i in range(4)]
+    assert steps[-1]['to'] == 0
+
+
+def test_max_level_caps_degradation():
+    controller = LatencyController(fps=10, degrade_after=1, smoothing=1.0, max_level=1)
+    for i in range(10):
+        controller.observe(500.0, i)
+
+    assert controller.level == 1
+    assert controller.metrics()['max_level'] == 1
+
+
+def test_counts_comparable_follows_detector_knobs():
+    # The default ladder spends every count-neutral step before touching imgsz / conf
+    comparable = [counts_comparable(QUALITY_LEVELS, level) for level in range(len(QUALITY_LEVELS))]
+    assert comparable == sorted(comparable, reverse=True)
+    assert comparable[:4] == [True] * 4 and not comparable[-1]
+
+    levels = (
+        {'imgsz': 640, 'conf': 0.1, 'stride': 1},
+        {'imgsz': 640, 'conf': 0.1, 'stride': 2},
+    )
+    assert counts_comparable(levels, 1)
+
+
+def test_step_judges_the_new_level_on_its_own_frames():
+    # Level 0 costs 2x the budget, every other level 0.9x: one step is enough
+    controller = LatencyController(fps=30, degrade_after=5)
+    for i in range(300):
+        controller.observe(controller.budget_ms * (2.0 if controller.level == 0 else 0.9), i)
+
+    assert controller.level == 1
+    assert controller.adjustment_count == 1
+
+
+def test_warmup_spike_costs_at_most_one_level():
+    controller = LatencyController(fps=30, degrade_after=5)
+    controller.observe(3000.0, 0)
+    for i in range(1, 200):
+        controller.observe(20.0, i)
+
+    assert controller.level <= 1
+    assert max(a['to'] for a in controller.adjustments) <= 1
+
+
+def test_adjustments_and_metrics_flag_the_level():
+    levels = (
+        {'imgsz': 640, 'conf': 0.1, 'stride': 1, 'heatmap_scale': 1.0, 'overlay': True},
+        {'imgsz': 320, 'conf': 0.25, 'stride': 1, 'heatmap_scale': 1.0, 'overlay': True},
+        {'imgsz': 320, 'conf': 0.25, 'stride': 2, 'heatmap_scale': 1.0, 'overlay': True},
+    )
+    controller = LatencyController(fps=10, degrade_after=1, smoothing=1.0, levels=levels)
+
+    # Per frame the processor records the count, then reports the frame time
+    controller.record(40, True)
+    adjustment = controller.observe(500.0, 0)
+    assert adjustment['counts_comparable'] is False
+    assert not controller.comparable
+
+    for i, count in enumerate([25, 27], start=1):
+        controller.record(count, count > 26)
+        controller.observe(50.0, i)
+
+    metrics = controller.metrics()
+    assert metrics['frames_per_level'][:2] == [1, 2]
+    assert metrics['alerts_per_level'][:2] == [1, 1]
+    assert metrics['mean_count_per_level'][:2] == [40.0, 26.0]
+    assert metrics['mean_count_per_level'][2] is None
+    assert metrics['comparable_levels'][:2] == [True, False]
@@ -0,0 +1,64 @@
+import numpy as np
+
+from src.frame_analyzer import FrameAnalyzer
+from src.motion_gate import MotionGate
+
+
+class StubAnalyzer(FrameAnalyzer):
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = 0
+
+    def detect_persons(self, frame):
+        self.calls += 1
+        return np.array([[0, 0, 10, 10]], dtype=np.float32), np.array([0.9], dtype=np.float32)
+
+
+def frame(value, shape=(120, 160)):
+    return np.full((*shape, 3), value, dtype=np.uint8)
+
+
+def test_static_frames_are_skipped_and_counted():
+    gate = MotionGate(threshold=0.01, refresh_every=100)
+    analyzer = StubAnalyzer(motion_gate=gate)
+
+    for i in range(5):
+        analyzer.analyze_frame(frame(50), frame_idx=i)
+
+    assert analyzer.calls == 1
+    assert gate.metrics() == {'frames': 5, 'detected': 1, 'skipped': 4, 'skip_rate': 0.8}
+
+
+def test_changed_frame_runs_detection():
+    gate = MotionGate(threshold=0.01, refresh_every=100)
+    analyzer = StubAnalyzer(motion_gate=gate)
+
+    analyzer.analyze_frame(frame(50))
+    analyzer.analyze_frame(frame(200))
+
+    assert analyzer.calls == 2
+    assert gate.metrics()['skipped'] == 0
+
+
+def test_skip_without_cached_result_is_not_counted():
+    gate = MotionGate(threshold=0.01, refresh_every=100)
+    gate.should_detect(frame(50))
+    analyzer = StubAnalyzer(motion_gate=gate)
+
+    # The gate says static, but there is nothing to reuse, so detection runs
+    analyzer.analyze_frame(frame(50))
+
+    assert analyzer.calls == 1
+    assert gate.metrics()['skipped'] == 0
+    assert gate.metrics()['detected'] == 2
+
+
+def test_refresh_forces_detection():
+    gate = MotionGate(threshold=0.01, refresh_every=3)
+    analyzer = StubAnalyzer(motion_gate=gate)
+
+    for i in range(7):
+        analyzer.analyze_frame(frame(50), frame_idx=i)
+
+    assert analyzer.calls == 3
@@ -0,0 +1,22 @@
+from src.offline_processor import split_segments
+
+
+def test_fixed_length_segments_cover_the_video():
+    assert split_segments(100, 30) == [(0, 30), (30, 60), (60, 90), (90, None)]
+
+
+def test_short_video_is_one_segment():
+    assert split_segments(20, 30) == [(0, None)]
+
+
+def test_unknown_frame_count_is_one_open_segment():
+    assert split_segments(0, 30) == [(0, None)]
+
+
+def test_cuts_snap_forward_to_keyframes():
+    keyframes = [0, 25, 34, 70, 95]
+    assert split_segments(100, 30, keyframes) == [(0, 34), (34, 70), (70, None)]
+
+
+def test_no_keyframe_after_target_keeps_one_segment():
+    assert split_segments(100, 30, [0, 10]) == [(0, None)]
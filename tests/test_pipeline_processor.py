@@ -0,0 +1,66 @@
+import multiprocessing
+import queue
+import threading
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+
+from src.frame_buffer import SharedFrameBuffer
+from src.pipeline_processor import PipelinedVideoProcessor, _decode_worker, _put
+
+
+def write_video(path, frames=3, size=(160, 120)):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), 10, size)
+    for i in range(frames):
+        writer.write(np.full((size[1], size[0], 3), 60 * (i + 1), dtype=np.uint8))
+    writer.release()
+
+
+def decode(video, frame_shape):
+    buffer = SharedFrameBuffer(4, frame_shape)
+    infer_queue = queue.Queue()
+    try:
+        _decode_worker(str(video), buffer, infer_queue, 1, threading.Event())
+        items = []
+        while (item := infer_queue.get_nowait()) is not None:
+            items.append((item[0], int(buffer.view(item[1]).mean())))
+        return items
+    finally:
+        buffer.close()
+        buffer.unlink()
+
+
+def test_check_workers_raises_on_failed_worker():
+    running = SimpleNamespace(name="decoder", exitcode=None)
+    done = SimpleNamespace(name="inference-0", exitcode=0)
+    PipelinedVideoProcessor.check_workers(None, [running, done])
+
+    failed = SimpleNamespace(name="inference-1", exitcode=1)
+    with pytest.raises(RuntimeError, match="inference-1 \\(exit code 1\\)"):
+        PipelinedVideoProcessor.check_workers(None, [running, done, failed])
+
+
+def test_put_gives_up_on_a_full_queue_once_stopped():
+    full = queue.Queue(maxsize=1)
+    full.put("x")
+    stop = threading.Event()
+    threading.Timer(0.2, stop.set).start()
+
+    assert not _put(full, "y", stop)
+    assert _put(queue.Queue(), "y", multiprocessing.Event())
+
+
+def test_decoder_fills_shared_slots(tmp_path):
+    write_video(tmp_path / "v.avi")
+    items = decode(tmp_path / "v.avi", (120, 160, 3))
+
+    assert [idx for idx, _ in items] == [0, 1, 2]
+    assert [abs(mean - 60 * (i + 1)) < 5 for i, (_, mean) in enumerate(items)] == [True] * 3
+
+
+def test_decoder_rejects_frames_that_do_not_fit_the_slot(tmp_path):
+    write_video(tmp_path / "v.avi")
+    with pytest.raises(ValueError, match="does not fit the shared slot"):
+        decode(tmp_path / "v.avi", (160, 120, 3))
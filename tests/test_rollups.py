@@ -0,0 +1,112 @@
+import os
+from datetime import datetime
+
+import numpy as np
+
+from src.rollups import RollupStore, choose_resolution, merge_rows
+from src.video_processor import recording_start
+
+
+# Hour-aligned, so every resolution buckets from T0
+T0 = 1_699_999_200.0
+
+
+def test_buckets_and_query(tmp_path):
+    store = RollupStore(tmp_path)
+    for i in range(120):
+        # Two frames per second for a minute
+        store.add("Gate A", T0 + i * 0.5, i % 10, 'high' if i % 10 > 7 else 'low', i % 10 == 9)
+    store.close()
+
+    resolution, rows = store.query("Gate A", resolution='1s')
+    assert resolution == '1s'
+    assert len(rows) == 60
+    assert rows['frames'].sum() == 120
+    assert rows['alerts'].sum() == 12
+    assert rows['high'].sum() == 24
+
+    _, minute = store.query("Gate A", resolution='1min')
+    assert len(minute) == 1
+    assert minute[0]['min'] == 0 and minute[0]['max'] == 9
+    assert np.isclose(minute[0]['mean'], 4.5)
+    assert minute[0]['p95'] == 9
+
+    _, window = store.query("Gate A", T0 + 10, T0 + 20, resolution='1s')
+    assert window['start'].tolist() == [T0 + s for s in range(10, 20)]
+
+    # One writer keeps the file in order: no marker, and reads stay on the memmap
+    assert not (tmp_path / "Gate_A" / "1s.unsorted").exists()
+    assert isinstance(store.table("Gate A", '1s'), np.memmap)
+
+    assert store.zones() == {'Gate_A': "Gate A"}
+    assert store.earliest("Gate A") == T0
+    assert store.latest("Gate A") == T0 + 60
+
+
+def test_resumed_bucket_is_merged(tmp_path):
+    for counts in ([2, 4], [6]):
+        store = RollupStore(tmp_path)
+        for count in counts:
+            store.add("Gate", T0 + 0.25, count, 'low', False)
+        store.close()
+
+    _, rows = RollupStore(tmp_path).query("Gate", resolution='1s')
+    assert len(rows) == 1
+    assert rows[0]['frames'] == 3
+    assert np.isclose(rows[0]['mean'], 4.0)
+    assert rows[0]['min'] == 2 and rows[0]['max'] == 6
+
+
+def test_interleaved_writers_query_in_order(tmp_path):
+    # Two cameras on one zone, or a re-run of older footage, append out of order
+    later, earlier = RollupStore(tmp_path), RollupStore(tmp_path)
+    for i in range(5):
+        later.add("Gate", T0 + 100 + i, 10, 'low', False)
+        earlier.add("Gate", T0 + i, 1, 'low', False)
+    later.close()
+    earlier.close()
+
+    assert (tmp_path / "Gate" / "1s.unsorted").exists()
+
+    store = RollupStore(tmp_path)
+    _, rows = store.query("Gate", T0, T0 + 3, resolution='1s')
+    assert rows['start'].tolist() == [T0, T0 + 1, T0 + 2]
+    assert rows['mean'].tolist() == [1.0, 1.0, 1.0]
+
+    _, before = store.query("Gate", resolution='1s')
+    assert np.all(np.diff(before['start']) > 0)
+    assert store.earliest("Gate") == T0
+    assert store.latest("Gate") == T0 + 105
+
+    store.compact("Gate")
+    assert not list((tmp_path / "Gate").glob("*.unsorted"))
+    assert isinstance(store.table("Gate", '1s'), np.memmap)
+    _, after = store.query("Gate", resolution='1s')
+    assert after.tolist() == before.tolist()
+    assert store.latest("Gate") == T0 + 105
+
+
+def test_merge_rows_sorts_unordered_input(tmp_path):
+    store = RollupStore(tmp_path)
+    store.add("Gate", T0 + 5, 3, 'low', False)
+    store.add("Gate", T0 + 1, 7, 'low', False)
+    store.close()
+
+    rows = np.array(store.table("Gate", '1s'))
+    merged = merge_rows(rows[::-1].copy())
+    assert merged['start'].tolist() == sorted(merged['start'].tolist())
+
+
+def test_choose_resolution():
+    assert choose_resolution(600) == '1s'
+    assert choose_resolution(86400) == '1min'
+    assert choose_resolution(86400 * 30, max_points=1000) == '1h'
+
+
+def test_recording_start_is_stable_across_runs(tmp_path):
+    video = tmp_path / "cam.mp4"
+    video.write_bytes(b"")
+    os.utime(video, (T0, T0))
+
+    assert recording_start(video, 60.0) == datetime.fromtimestamp(T0 - 60.0)
+    assert recording_start(video, 60.0) == recording_start(video, 60.0)
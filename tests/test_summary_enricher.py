@@ -0,0 +1,53 @@
+import time
+
+from src.summary_enricher import LLMEnricher
+
+
+class FakeLLM:
+    api_key = "test"
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+
+    def generate_summary(self, zone, person_count, fallback=True, **kwargs):
+        if self.delay:
+            time.sleep(self.delay)
+        return f"{zone}: {person_count} people"
+
+
+def apply(alert, text):
+    alert['llm'] = text
+
+
+def test_client_is_only_built_when_an_alert_arrives():
+    built = []
+
+    def get_llm():
+        built.append(True)
+        return FakeLLM()
+
+    enricher = LLMEnricher(get_llm, apply, max_per_minute=6000)
+    enricher.close(timeout=1)
+    assert built == []
+
+    enricher = LLMEnricher(get_llm, apply, max_per_minute=6000)
+    alert = {}
+    enricher.submit(alert, {'zone': 'Z', 'person_count': 5})
+    enricher.close(timeout=2)
+
+    assert built == [True]
+    assert alert['llm'] == "Z: 5 people"
+    assert enricher.metrics()['enriched'] == 1
+
+
+def test_late_answer_after_close_is_discarded():
+    enricher = LLMEnricher(lambda: FakeLLM(delay=0.5), apply, max_per_minute=6000)
+    alert = {'llm': 'template'}
+    enricher.submit(alert, {'zone': 'Z', 'person_count': 5})
+
+    enricher.close(timeout=0.1)
+    time.sleep(0.7)
+
+    assert alert['llm'] == 'template'
+    assert enricher.metrics()['discarded'] == 1
+    assert enricher.metrics()['dropped'] == 0
@@ -0,0 +1,25 @@
+from src.template_summary import TemplateSummary, deviation_label
+
+
+def test_deviation_label_bands():
+    assert deviation_label(0.5) == "within normal range"
+    assert deviation_label(-2.0) == "moderately above normal"
+    assert deviation_label(3.0) == "significantly above normal"
+
+
+def test_summary_text():
+    summary = TemplateSummary().generate_summary(
+        zone="Gate", person_count=45.7, density_level="HIGH",
+        baseline_mean=30.0, baseline_std=5.0, z_score=3.5
+    )
+
+    assert summary == (
+        "Gate: 45 people observed (+52% vs baseline 30), high density, significantly above normal. "
+        "Recommend supervisor review of current deployment at this zone."
+    )
+
+
+def test_summary_before_baseline():
+    summary = TemplateSummary().generate_summary("Gate", 4, "low", None, None, 0.0)
+    assert "baseline not yet established" in summary
+    assert summary.endswith("Continue routine monitoring.")
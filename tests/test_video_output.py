@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.frame_record import Detection
+from src.video_output import ClipOutput, NullOutput, make_output
+from src.video_processor import VideoProcessor
+
+
+SIZE = (64, 48)
+
+
+def frame(value=0):
+    return np.full((SIZE[1], SIZE[0], 3), value, dtype=np.uint8)
+
+
+def detection(frame_idx):
+    return Detection.from_boxes(
+        np.array([[4, 4, 20, 20]], dtype=np.float32), np.array([0.8], dtype=np.float32),
+        (SIZE[1], SIZE[0]), frame_idx=frame_idx, timestamp=frame_idx / 10
+    )
+
+
+def run_clips(tmp_path, alerts, pre_roll=0.3, post_roll=0.2, copy_frames=False):
+    output = ClipOutput(tmp_path / "clips", 10, SIZE, pre_roll=pre_roll, post_roll=post_roll, copy_frames=copy_frames)
+    for i, is_alert in enumerate(alerts):
+        output.write(frame(i), detection(i), is_alert, i)
+    output.close()
+    return output.metrics()
+
+
+def test_clip_spans_pre_roll_alert_and_post_roll(tmp_path):
+    alerts = [False] * 10 + [True] * 2 + [False] * 10
+    metrics = run_clips(tmp_path, alerts)
+
+    # 3 frames of pre-roll, 2 alert frames, 2 frames of post-roll
+    assert [(c['start_frame'], c['end_frame']) for c in metrics['clips']] == [(7, 13)]
+    assert metrics['written'] == 7
+
+
+def test_alerts_within_post_roll_extend_one_clip(tmp_path):
+    alerts = [False] * 5 + [True] + [False] + [True] + [False] * 10
+    metrics = run_clips(tmp_path, alerts)
+
+    assert [(c['start_frame'], c['end_frame']) for c in metrics['clips']] == [(2, 9)]
+
+
+def test_separate_alerts_make_separate_clips(tmp_path):
+    alerts = [True] + [False] * 10 + [True] + [False] * 5
+    metrics = run_clips(tmp_path, alerts)
+
+    assert [(c['start_frame'], c['end_frame']) for c in metrics['clips']] == [(0, 2), (8, 13)]
+    assert all((tmp_path / "clips" / f"alert_{c['start_frame']:08d}.avi").exists() for c in metrics['clips'])
+
+
+def test_copy_frames_decouples_the_pre_roll_from_recycled_buffers(tmp_path):
+    output = ClipOutput(tmp_path / "clips", 10, SIZE, pre_roll=0.2, copy_frames=True)
+    shared = frame(1)
+    output.write(shared, detection(0), False, 0)
+    shared[:] = 99
+
+    assert output.ring[0][0].max() == 1
+
+
+def test_output_factory_accepts_copy_frames_in_options(tmp_path):
+    processor = SimpleNamespace(
+        output_mode="clips", output_dir=tmp_path, fps=10, width=SIZE[0], height=SIZE[1],
+        output_options={'copy_frames': False, 'pre_roll': 0.5}
+    )
+
+    output = VideoProcessor.output_factory(processor, copy_frames=True)()
+    assert output.copy_frames is True
+
+    output = VideoProcessor.output_factory(processor)()
+    assert output.copy_frames is False
+    assert output.ring.maxlen == 5
+
+
+def test_make_output_modes(tmp_path):
+    assert isinstance(make_output("none", tmp_path, 10, SIZE), NullOutput)
+    with pytest.raises(ValueError):
+        make_output("bogus", tmp_path, 10, SIZE)